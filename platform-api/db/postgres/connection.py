@@ -1,14 +1,38 @@
 import os
+import time
 import asyncio
 import logging
+import age
+import psycopg
+from psycopg import sql
 from contextlib import asynccontextmanager
+from contextvars import Context, ContextVar
+from typing import Callable, Dict, List
 from psycopg_pool import AsyncConnectionPool
+from ...metrics import REGISTRY
+
+ROUND_TRIPS_SAVED = REGISTRY.counter("db_round_trips_saved_total", "Round trips no longer sent on connection checkouts (session setup, BEGIN/COMMIT of read-only work)")
+# LOAD 'age' and SET search_path used to run on every checkout
+SESSION_SETUP_ROUND_TRIPS = 2
+# BEGIN and COMMIT, skipped by read-only checkouts
+TRANSACTION_ROUND_TRIPS = 2
+POOL_WAIT = REGISTRY.histogram("db_pool_wait_seconds", "Time spent waiting for a pooled connection")
+# Pause before the notification listener reconnects
+LISTEN_RETRY_SECONDS = float(os.getenv("DATABASE_LISTEN_RETRY_SECONDS", "1"))
+# Schema of the service's own tables (job queue, change log), the graph schema belongs to AGE
+APP_SCHEMA = os.getenv("DATABASE_APP_SCHEMA", "platform_api")
+
+# Connection of the unit of work running in the current task, if any
+_unit_of_work = ContextVar("unit_of_work", default=None)
 
 class DatabaseConnectionManager:
     _instance = None
     _pool = None
     _init_lock = asyncio.Lock()
     _initialized = False
+    # channel -> callbacks, and the task LISTENing to them on a dedicated connection
+    _subscribers: Dict[str, List[Callable[[str | None], None]]] = {}
+    _listen_task = None
 
     async def __new__(cls, graph_name=None):   
         if cls._instance is None:
@@ -32,16 +56,12 @@ class DatabaseConnectionManager:
         """Initialize the async database connection pool"""
         conn_string = cls.get_conn_string()
         # Create the pool without opening it in the constructor
-        cls._pool = AsyncConnectionPool(conn_string, min_size=1, max_size=10, open=False)
+        cls._pool = AsyncConnectionPool(conn_string, min_size=1, max_size=10, open=False, configure=cls._configure_connection)
         # Explicitly open the pool
         await cls._pool.open()
         # Make sure we create the graph if it doesn't exist
         async with cls._pool.connection() as conn:
             async with conn.cursor() as cursor:
-                # Load the AGE extension
-                await cursor.execute("LOAD 'age';")
-                # Set search path
-                await cursor.execute("SET search_path = ag_catalog, \"$user\", public;")
                 # Check if graph exists and create it if it doesn't
                 await cursor.execute("SELECT * FROM ag_catalog.ag_graph WHERE name = %s;", [graph_name])
                 result = await cursor.fetchall()
@@ -49,23 +69,124 @@ class DatabaseConnectionManager:
                     await cursor.execute("SELECT create_graph(%s);", [graph_name])
                     await conn.commit()
                     logging.info(f"Graph '{graph_name}' created")
+
+                try:
+                    await cursor.execute(sql.SQL("CREATE SCHEMA IF NOT EXISTS {}").format(sql.Identifier(APP_SCHEMA)))
+                    await conn.commit()
+                except Exception as ex:
+                    # Another process creating it at the same time, it is there now
+                    await conn.rollback()
+                    logging.error(f"Could not create schema '{APP_SCHEMA}': {ex}")
             
         logging.info("Async database connection pool initialized")
         
+    @classmethod
+    async def _configure_connection(cls, conn):
+        """
+        Session setup, run once per physical connection: load AGE, set the search path and
+        register the agtype loader, so agtype values come back as Vertex, Edge, dict, ...
+        """
+        await age.setUpAgeAsync(conn, None)
+        # The pool expects configured connections to be idle
+        await conn.commit()
+
     @asynccontextmanager
-    async def get_connection(self):
-        """Context manager for database connections"""
+    async def get_connection(self, read_only: bool = False):
+        """
+        Context manager for database connections.
+
+        The work runs in a transaction that is committed on exit (rolled back on errors).
+        Read-only work runs in autocommit mode instead, so no BEGIN/COMMIT is sent.
+        Inside a unit of work the unit's connection is reused and left for it to commit.
+        """
+        conn = _unit_of_work.get()
+        if conn is not None:
+            yield conn
+            return
+
+        started = time.monotonic()
         conn = await self._pool.getconn()
+        POOL_WAIT.observe(time.monotonic() - started)
+        saved = SESSION_SETUP_ROUND_TRIPS
         try:
-            async with conn.cursor() as cursor:
-                # Load the AGE extension
-                await cursor.execute("LOAD 'age';")
-                # Set search path
-                await cursor.execute("SET search_path = ag_catalog, \"$user\", public;")
+            if read_only:
+                await conn.set_autocommit(True)
+                saved += TRANSACTION_ROUND_TRIPS
             yield conn
+            if not read_only:
+                await conn.commit()
+        except BaseException:
+            if not read_only:
+                await conn.rollback()
+            raise
         finally:
-            # TODO: We don't need to commit read requests
-            await conn.commit()
-            await self._pool.putconn(conn)
-        
+            try:
+                # Fails on a broken connection, which the pool then discards rather than reuses
+                if read_only:
+                    await conn.set_autocommit(False)
+                ROUND_TRIPS_SAVED.inc(saved)
+            finally:
+                await self._pool.putconn(conn)
+
+    @asynccontextmanager
+    async def unit_of_work(self, read_only: bool = False):
+        """
+        Run every get_connection() of the current task on a single connection (and, unless
+        read_only, a single transaction committed when the block exits). Nested units of work
+        join the outer one.
+        """
+        conn = _unit_of_work.get()
+        if conn is not None:
+            yield conn
+            return
+
+        async with self.get_connection(read_only=read_only) as conn:
+            token = _unit_of_work.set(conn)
+            try:
+                yield conn
+            finally:
+                _unit_of_work.reset(token)
+
+    def subscribe(self, channel: str, callback: Callable[[str | None], None]):
+        """
+        Call `callback` with the payload of every NOTIFY on `channel`, from a background task
+        listening on its own connection (a LISTEN does not survive going back to the pool).
+        Notifications sent while the listener was disconnected are lost, the callback gets None
+        after every (re)connection to resynchronize.
+        """
+        new_channel = channel not in self._subscribers
+        self._subscribers.setdefault(channel, []).append(callback)
+
+        # The listener LISTENs when it connects, restart it to add a channel
+        if new_channel and self._listen_task is not None:
+            self._listen_task.cancel()
+            self._listen_task = None
+        if self._listen_task is None:
+            self._listen_task = asyncio.create_task(self._listen(), context=Context())
+
+    async def _listen(self):
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.get_conn_string(), autocommit=True) as conn:
+                    for channel in self._subscribers:
+                        await conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(channel)))
+
+                    for channel in self._subscribers:
+                        self._notify_subscribers(channel, None)
+
+                    async for notification in conn.notifies():
+                        self._notify_subscribers(notification.channel, notification.payload)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                logging.error(f"Notification listener disconnected, reconnecting: {ex}")
+
+            await asyncio.sleep(LISTEN_RETRY_SECONDS)
 
+    def _notify_subscribers(self, channel: str, payload: str | None):
+        for callback in self._subscribers.get(channel, ()):
+            try:
+                callback(payload)
+            except Exception as ex:
+                logging.error(f"Subscriber of '{channel}' failed: {ex}")
@@ -17,7 +17,7 @@ import psycopg.conninfo as conninfo
 from . import age
 from .age import *
 from .models import *
-from .builder import ResultHandler, DummyResultHandler, parseAgeValue, newResultHandler
+from .builder import ResultHandler, DummyResultHandler, FastResultHandler, Antlr4ResultHandler, parseAgeValue, newResultHandler, getResultHandler
 from . import VERSION 
 
 def version():
@@ -34,6 +34,16 @@ def connect(dsn=None, graph=None, connection_factory=None, cursor_factory=Client
                load_from_plugins=load_from_plugins, **kwargs)
     return ag
 
+async def connectAsync(dsn=None, graph=None, connection_factory=None, cursor_factory=AsyncClientCursor, load_from_plugins=False,
+            **kwargs):
+
+    dsn = conninfo.make_conninfo('' if dsn is None else dsn, **kwargs)
+
+    ag = AsyncAge()
+    await ag.connect(dsn=dsn, graph=graph, connection_factory=connection_factory, cursor_factory=cursor_factory,
+               load_from_plugins=load_from_plugins, **kwargs)
+    return ag
+
 # Dummy ResultHandler
 rawPrinter = DummyResultHandler()
 
@@ -14,34 +14,102 @@
 # under the License.
 
 import re
+import json
+import math
+import itertools
 import psycopg
+from contextlib import contextmanager, nullcontext
+from decimal import Decimal
+from collections.abc import Mapping
 from psycopg.types import TypeInfo
 from psycopg.adapt import Loader
+from psycopg.types.string import TextLoader
 from psycopg import sql
 from psycopg.client_cursor import ClientCursor
+from psycopg import AsyncClientCursor
 from .exceptions import *
-from .builder import parseAgeValue
+from .builder import parseAgeValue, FastResultHandler
 
 
 _EXCEPTION_NoConnection = NoConnection()
 _EXCEPTION_GraphNotSet = GraphNotSet()
 
 WHITESPACE = re.compile('\s')
+# Rows fetched per round trip by the server side cursors of the streaming functions
+STREAM_ITERSIZE = 2000
+
+# psycopg placeholders: %s, %(name)s (also the b/t formats) and the %% escape
+PLACEHOLDER = re.compile(r'%(?:\((\w+)\))?([sbt%])')
+
+
+# Serialize a python value as agtype text, the inverse of parseAgeValue for scalars, lists and maps
+def toAgtype(value) -> str:
+    if value is None:
+        return 'null'
+    elif isinstance(value, bool):
+        return 'true' if value else 'false'
+    elif isinstance(value, int):
+        return str(value)
+    elif isinstance(value, float):
+        if math.isnan(value):
+            return 'NaN'
+        elif math.isinf(value):
+            return 'Infinity' if value > 0 else '-Infinity'
+        return repr(value)
+    elif isinstance(value, Decimal):
+        return str(value) + '::numeric'
+    elif isinstance(value, str):
+        return json.dumps(value)
+    elif isinstance(value, Mapping):
+        return '{' + ', '.join(json.dumps(str(k)) + ': ' + toAgtype(v) for k, v in value.items()) + '}'
+    elif isinstance(value, (list, tuple)):
+        return '[' + ', '.join(toAgtype(v) for v in value) + ']'
+    raise AGTypeError("Cannot convert " + type(value).__name__ + " to agtype", None)
+
+
+# The parameter map of a cypher() call, sent as agtype
+class CypherParams(dict):
+    pass
 
 
 class AgeDumper(psycopg.adapt.Dumper):
+    # Subclassed by setUpAge with the oid of agtype in the connected database
+    oid = 0
+
     def dump(self, obj: Any) -> bytes | bytearray | memoryview:
-        pass    
+        return toAgtype(obj).encode('utf-8')
+
+
+def _registerAgtype(conn, ag_info):
+    # Known by name, see _resultCursor
+    ag_info.register(conn)
+    conn.adapters.register_loader(ag_info.oid, AgeLoader)
+    conn.adapters.register_loader(ag_info.array_oid, AgeLoader)
+    conn.adapters.register_dumper(CypherParams, type("AgtypeDumper", (AgeDumper,), {"oid": ag_info.oid}))
     
     
 class AgeLoader(psycopg.adapt.Loader):    
+    def __init__(self, oid: int, context: psycopg.abc.AdaptContext | None = None):
+        super().__init__(oid, context)
+        # psycopg creates loaders per cursor, so the handler is never shared between threads
+        self._context = context
+        self._pgresult = None
+        self._vertexCache = {}
+        self._resultHandler = FastResultHandler(self._vertexCache)
+
     def load(self, data: bytes | bytearray | memoryview) -> Any | None:
         if isinstance(data, memoryview):
             data_bytes = data.tobytes()
         else:
             data_bytes = data
 
-        return parseAgeValue(data_bytes.decode('utf-8'))
+        # Vertices are only shared within one result set
+        pgresult = getattr(self._context, "pgresult", None)
+        if pgresult is not self._pgresult:
+            self._pgresult = pgresult
+            self._vertexCache.clear()
+
+        return parseAgeValue(data_bytes.decode('utf-8'), resultHandler=self._resultHandler)
 
 
 def setUpAge(conn:psycopg.connection, graphName:str, load_from_plugins:bool=False):
@@ -58,8 +126,7 @@ def setUpAge(conn:psycopg.connection, graphName:str, load_from_plugins:bool=Fals
         if not ag_info:
             raise AgeNotSet()
 
-        conn.adapters.register_loader(ag_info.oid, AgeLoader)
-        conn.adapters.register_loader(ag_info.array_oid, AgeLoader)
+        _registerAgtype(conn, ag_info)
 
         # Check graph exists
         if graphName != None:
@@ -74,16 +141,48 @@ def checkGraphCreated(conn:psycopg.connection, graphName:str):
             conn.commit()
 
 
+async def setUpAgeAsync(conn:psycopg.AsyncConnection, graphName:str, load_from_plugins:bool=False):
+    async with conn.cursor() as cursor:
+        if load_from_plugins:
+            await cursor.execute("LOAD '$libdir/plugins/age';")
+        else:
+            await cursor.execute("LOAD 'age';")
+
+        await cursor.execute("SET search_path = ag_catalog, '$user', public;")
+
+        ag_info = await TypeInfo.fetch(conn, 'agtype')
+
+        if not ag_info:
+            raise AgeNotSet()
+
+        _registerAgtype(conn, ag_info)
+
+        # Check graph exists
+        if graphName != None:
+            await checkGraphCreatedAsync(conn, graphName)
+
+# Create the graph, if it does not exist
+async def checkGraphCreatedAsync(conn:psycopg.AsyncConnection, graphName:str):
+    async with conn.cursor() as cursor:
+        await cursor.execute(sql.SQL("SELECT count(*) FROM ag_graph WHERE name={graphName}").format(graphName=sql.Literal(graphName)))
+        if (await cursor.fetchone())[0] == 0:
+            await cursor.execute(sql.SQL("SELECT create_graph({graphName});").format(graphName=sql.Literal(graphName)))
+            await conn.commit()
+
+
 def deleteGraph(conn:psycopg.connection, graphName:str):
     with conn.cursor() as cursor:
         cursor.execute(sql.SQL("SELECT drop_graph({graphName}, true);").format(graphName=sql.Literal(graphName)))
         conn.commit()
 
 
-def buildCypher(graphName:str, cypherStmt:str, columns:list) ->str:
-    if graphName == None:
-        raise _EXCEPTION_GraphNotSet
-    
+async def deleteGraphAsync(conn:psycopg.AsyncConnection, graphName:str):
+    async with conn.cursor() as cursor:
+        await cursor.execute(sql.SQL("SELECT drop_graph({graphName}, true);").format(graphName=sql.Literal(graphName)))
+        await conn.commit()
+
+
+def buildColumns(columns:list) -> str:
     columnExp=[]
     if columns != None and len(columns) > 0:
         for col in columns:
@@ -96,11 +195,97 @@ def buildCypher(graphName:str, cypherStmt:str, columns:list) ->str:
     else:
         columnExp.append('v agtype')
 
-    stmtArr = []
-    stmtArr.append("SELECT * from cypher(NULL,NULL) as (")
-    stmtArr.append(','.join(columnExp))
-    stmtArr.append(");")
-    return "".join(stmtArr)
+    return ','.join(columnExp)
+
+
+def buildCypher(graphName:str, cypherStmt:str, columns:list) ->str:
+    if graphName == None:
+        raise _EXCEPTION_GraphNotSet
+
+    return "SELECT * from cypher(NULL,NULL) as (" + buildColumns(columns) + ");"
+
+
+RESULT_FORMATS = ("rows", "columnar")
+
+# Cursor for the results of execCypher: the columnar format reads the agtype text itself
+def _resultCursor(cursor, result_format:str):
+    if result_format not in RESULT_FORMATS:
+        raise ValueError("Unknown result format: " + str(result_format))
+    if result_format == "columnar":
+        # Checked before the query runs rather than once its result is read
+        try:
+            import numpy
+        except ImportError as cause:
+            raise ImportError('result_format="columnar" needs NumPy, install apache-age-python[columnar]') from cause
+        cursor.adapters.register_loader("agtype", TextLoader)
+    return cursor
+
+
+def _result(cursor, result_format:str, property_keys):
+    if result_format == "columnar":
+        # NumPy is only needed for columnar results
+        from .columnar import toColumns
+        return toColumns(cursor.description, cursor, property_keys)
+    return cursor
+
+
+# Rewrite the psycopg placeholders of a cypher statement into cypher parameters (%s into $p0, $p1...
+# and %(name)s into $name), returning the statement and the map of the parameter values.
+def toCypherParams(cypherStmt:str, params) -> tuple:
+    if params is None:
+        return cypherStmt, None
+
+    values = CypherParams()
+    positional = None if isinstance(params, Mapping) else iter(params)
+
+    def replace(match):
+        name, fmt = match.groups()
+        if fmt == '%':
+            return '%'
+        if name is None:
+            if positional is None:
+                raise psycopg.ProgrammingError("positional placeholder used with a mapping of parameters")
+            name = "p" + str(len(values))
+            try:
+                values[name] = next(positional)
+            except StopIteration:
+                raise psycopg.ProgrammingError("the statement has more placeholders than parameters") from None
+        elif positional is not None:
+            raise psycopg.ProgrammingError("named placeholder used with a sequence of parameters")
+        else:
+            values[name] = params[name]
+        return '$' + name
+
+    cypherStmt = PLACEHOLDER.sub(replace, cypherStmt)
+    if positional is not None and next(positional, PLACEHOLDER) is not PLACEHOLDER:
+        raise psycopg.ProgrammingError("the statement has fewer placeholders than parameters")
+    return cypherStmt, values
+
+
+# Single statement calling cypher() with the graph and query as constants and the parameters as $1,
+# the same text for every call of a (graph, query, columns), so the server can keep it prepared.
+def buildCypherStatement(graphName:str, cypherStmt:str, columns:list, params=None) -> tuple:
+    if graphName == None:
+        raise _EXCEPTION_GraphNotSet
+
+    cypherStmt, values = toCypherParams(cypherStmt, params)
+
+    # Dollar quote with a tag the statement does not contain: $$, then $q1$, $q2$, ...
+    tag = "$$"
+    counter = 0
+    while tag in cypherStmt:
+        counter += 1
+        tag = "$q" + str(counter) + "$"
+
+    rest = ", " + tag + cypherStmt + tag
+    columns = buildColumns(columns)
+    if values is not None:
+        # '%' is only special to psycopg when there are parameters
+        rest = rest.replace('%', '%%') + ", %s"
+        columns = columns.replace('%', '%%')
+
+    stmt = sql.Composed([sql.SQL("SELECT * from cypher("), sql.Literal(graphName), sql.SQL(rest + ") as (" + columns + ");")])
+    return stmt, None if values is None else (values,)
 
 def execSql(conn:psycopg.connection, stmt:str, commit:bool=False, params:tuple=None) -> psycopg.cursor :
     if conn == None or conn.closed:
@@ -128,10 +313,31 @@ def querySql(conn:psycopg.connection, stmt:str, params:tuple=None) -> psycopg.cu
 # If cypher statement changes data (create, set, remove),
 # You must commit session(ag.commit())
 # (Otherwise the execution cannot make any effect.)
-def execCypher(conn:psycopg.connection, graphName:str, cypherStmt:str, cols:list=None, params:tuple=None) -> psycopg.cursor :
+#
+# With prepare=True, the statement is sent once, as a single cypher() call with server side parameters,
+# and kept prepared by the server for the next calls of the same (graph, statement, columns).
+# Placeholders are then cypher parameters: they stand for values (not labels or property names).
+#
+# With result_format="columnar", the result is read into NumPy arrays by column instead, without building
+# a Vertex or Edge per row (see columnar.toColumns), with the properties of property_keys as arrays too.
+def execCypher(conn:psycopg.connection, graphName:str, cypherStmt:str, cols:list=None, params:tuple=None, prepare:bool=False,
+               result_format:str="rows", property_keys=None) -> psycopg.cursor :
     if conn == None or conn.closed:
         raise _EXCEPTION_NoConnection
 
+    if prepare:
+        # A client side binding cursor would inline the parameters, cypher() only takes them as $1
+        cursor = _resultCursor(psycopg.Cursor(conn), result_format)
+        try:
+            cypher(cursor, graphName, cypherStmt, cols=cols, params=params, prepare=True)
+        except SyntaxError as cause:
+            conn.rollback()
+            raise cause
+        except Exception as cause:
+            conn.rollback()
+            raise SqlExecutionError("Execution ERR[" + str(cause) +"](" + cypherStmt +")", cause)
+        return _result(cursor, result_format, property_keys)
+
     cursor = conn.cursor()
     #clean up the string for mogrification
     cypherStmt = cypherStmt.replace("\n", "")
@@ -153,19 +359,24 @@ def execCypher(conn:psycopg.connection, graphName:str, cypherStmt:str, cols:list
 
     stmt = buildCypher(graphName, cypher, cols)
 
-    cursor = conn.cursor()
+    cursor = _resultCursor(conn.cursor(), result_format)
     try:
         cursor.execute(stmt)
-        return cursor
     except SyntaxError as cause:
         conn.rollback()
         raise cause
     except Exception as cause:
         conn.rollback()
         raise SqlExecutionError("Execution ERR[" + str(cause) +"](" + stmt +")", cause)
+    return _result(cursor, result_format, property_keys)
 
 
-def cypher(cursor:psycopg.cursor, graphName:str, cypherStmt:str, cols:list=None, params:tuple=None) -> psycopg.cursor :
+def cypher(cursor:psycopg.cursor, graphName:str, cypherStmt:str, cols:list=None, params:tuple=None, prepare:bool=False) -> psycopg.cursor :
+    if prepare:
+        stmt, values = buildCypherStatement(graphName, cypherStmt, cols, params)
+        cursor.execute(stmt, values, prepare=True)
+        return cursor
+
     #clean up the string for mogrification
     cypherStmt = cypherStmt.replace("\n", "")
     cypherStmt = cypherStmt.replace("\t", "")
@@ -179,6 +390,258 @@ def cypher(cursor:psycopg.cursor, graphName:str, cypherStmt:str, cols:list=None,
     cursor.execute(stmt)
 
 
+async def execCypherAsync(conn:psycopg.AsyncConnection, graphName:str, cypherStmt:str, cols:list=None, params:tuple=None, prepare:bool=False,
+                          result_format:str="rows", property_keys=None) -> psycopg.AsyncCursor :
+    if conn == None or conn.closed:
+        raise _EXCEPTION_NoConnection
+
+    cursor = _resultCursor(psycopg.AsyncCursor(conn) if prepare else conn.cursor(), result_format)
+    try:
+        await cypherAsync(cursor, graphName, cypherStmt, cols=cols, params=params, prepare=prepare)
+    except SyntaxError as cause:
+        await conn.rollback()
+        raise cause
+    except Exception as cause:
+        await conn.rollback()
+        raise SqlExecutionError("Execution ERR[" + str(cause) +"](" + cypherStmt +")", cause)
+
+    if result_format == "columnar":
+        from .columnar import toColumns
+        return toColumns(cursor.description, await cursor.fetchall(), property_keys)
+    return cursor
+
+
+async def cypherAsync(cursor:psycopg.AsyncCursor, graphName:str, cypherStmt:str, cols:list=None, params:tuple=None, prepare:bool=False) -> psycopg.AsyncCursor :
+    if prepare:
+        stmt, values = buildCypherStatement(graphName, cypherStmt, cols, params)
+        await cursor.execute(stmt, values, prepare=True)
+        return cursor
+
+    #clean up the string for mogrification
+    cypherStmt = cypherStmt.replace("\n", "")
+    cypherStmt = cypherStmt.replace("\t", "")
+    cypher = str(AsyncClientCursor(cursor.connection).mogrify(cypherStmt, params))
+    cypher = cypher.strip()
+
+    preparedStmt = "SELECT * FROM age_prepare_cypher({graphName},{cypherStmt})"
+    await cursor.execute(sql.SQL(preparedStmt).format(graphName=sql.Literal(graphName),cypherStmt=sql.Literal(cypher)))
+
+    stmt = buildCypher(graphName, cypher, cols)
+    await cursor.execute(stmt)
+    return cursor
+
+
+_cursorIds = itertools.count()
+
+# Named (server side) cursor fetching itersize rows per round trip. It needs a transaction,
+# one is opened for the cursor when the connection is in autocommit.
+@contextmanager
+def serverCursor(conn:psycopg.connection, itersize:int=STREAM_ITERSIZE):
+    with (conn.transaction() if conn.autocommit else nullcontext()):
+        with conn.cursor(name="age_cursor_" + str(next(_cursorIds))) as cursor:
+            cursor.itersize = itersize
+            yield cursor
+
+
+# Generator of the rows of a cypher statement, fetched itersize rows at a time through a server side cursor:
+# only one batch of rows (and their parsed values) is held in memory, whatever the size of the result.
+# The cursor is closed when the generator is exhausted or closed.
+def streamCypher(conn:psycopg.connection, graphName:str, cypherStmt:str, cols:list=None, params:tuple=None,
+                 itersize:int=STREAM_ITERSIZE, prepare:bool=False):
+    if conn == None or conn.closed:
+        raise _EXCEPTION_NoConnection
+
+    try:
+        if prepare:
+            stmt, values = buildCypherStatement(graphName, cypherStmt, cols, params)
+        else:
+            with conn.cursor() as cursor:
+                cypherStmt = cypherStmt.replace("\n", "")
+                cypherStmt = cypherStmt.replace("\t", "")
+                cypher = str(ClientCursor(conn).mogrify(cypherStmt, params)).strip()
+
+                preparedStmt = "SELECT * FROM age_prepare_cypher({graphName},{cypherStmt})"
+                cursor.execute(sql.SQL(preparedStmt).format(graphName=sql.Literal(graphName),cypherStmt=sql.Literal(cypher)))
+            stmt, values = buildCypher(graphName, cypher, cols), None
+    except SyntaxError as cause:
+        conn.rollback()
+        raise cause
+    except Exception as cause:
+        conn.rollback()
+        raise SqlExecutionError("Execution ERR[" + str(cause) +"](" + cypherStmt +")", cause)
+
+    with serverCursor(conn, itersize) as cursor:
+        cursor.execute(stmt, values)
+        yield from cursor
+
+
+# Stream the rows of a cypher statement as they arrive from the server, instead of buffering the whole result.
+async def streamCypherAsync(conn:psycopg.AsyncConnection, graphName:str, cypherStmt:str, cols:list=None, params:tuple=None):
+    if conn == None or conn.closed:
+        raise _EXCEPTION_NoConnection
+
+    cypherStmt = cypherStmt.replace("\n", "")
+    cypherStmt = cypherStmt.replace("\t", "")
+
+    async with AsyncClientCursor(conn) as cursor:
+        cypher = str(cursor.mogrify(cypherStmt, params)).strip()
+
+        preparedStmt = "SELECT * FROM age_prepare_cypher({graphName},{cypherStmt})"
+        await cursor.execute(sql.SQL(preparedStmt).format(graphName=sql.Literal(graphName),cypherStmt=sql.Literal(cypher)))
+
+        async for row in cursor.stream(buildCypher(graphName, cypher, cols)):
+            yield row
+
+
+# Outcome of one statement of a batch: its rows once the batch ran, or the error it failed with.
+# Statements queued after a failing one are not run, their error is PipelineAborted.
+class CypherResult:
+    def __init__(self, cypherStmt:str, params=None):
+        self.cypherStmt = cypherStmt
+        self.params = params
+        self.rows = None
+        self.error = None
+
+    def __repr__(self) :
+        return 'CypherResult[' + self.cypherStmt + '](' + (repr(self.error) if self.error is not None else str(self.rows)) + ')'
+
+
+class _BaseCypherBatch:
+    def __init__(self, conn, graphName:str):
+        if conn == None or conn.closed:
+            raise _EXCEPTION_NoConnection
+
+        self.connection = conn
+        self.graphName = graphName
+        self.results = []
+        self._pending = []
+
+    # Queue a statement, run when the batch is flushed. Placeholders are cypher parameters, as with prepare=True.
+    def execCypher(self, cypherStmt:str, cols:list=None, params:tuple=None) -> CypherResult :
+        stmt, values = buildCypherStatement(self.graphName, cypherStmt, cols, params)
+        if values is not None:
+            # A value that can not be sent fails here rather than in the middle of the pipeline
+            toAgtype(values[0])
+
+        result = CypherResult(cypherStmt, params)
+        self._pending.append((stmt, values, result))
+        self.results.append(result)
+        return result
+
+    cypher = execCypher
+
+    def _attribute(self, pending, cursors, error):
+        # Statements run in order and a failing one aborts the rest: the first without a result is the one that failed
+        aborted = PipelineAborted("pipeline aborted")
+        failed = None
+        for i, (_, _, result) in enumerate(pending):
+            if i < len(cursors) and cursors[i].pgresult is not None:
+                continue
+            if failed is None:
+                failed = result
+                result.error = error
+            else:
+                result.error = aborted
+        return failed
+
+    def _error(self, failed) -> Exception :
+        return BatchExecutionError("Execution ERR[" + str(failed.error) + "](" + failed.cypherStmt + ")", failed.error,
+                                   self.results.index(failed), self.results)
+
+
+# Cypher statements queued by Age.batch(), sent together in pipeline mode: one round trip for the whole batch
+# instead of one per statement. Flushed when the block exits (unless it raised), or by flush().
+# When a statement fails, the ones after it are not run, the transaction is rolled back and BatchExecutionError
+# is raised, pointing at the failing statement. As with execCypher, changes must be committed.
+class CypherBatch(_BaseCypherBatch):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.flush()
+        else:
+            self._pending = []
+
+    # Run the queued statements, returning their results
+    def flush(self) -> list :
+        pending, self._pending = self._pending, []
+        if not pending:
+            return []
+
+        conn = self.connection
+        cursors = []
+        error = None
+        try:
+            with conn.pipeline() as pipeline:
+                try:
+                    for stmt, values, _ in pending:
+                        cursor = psycopg.Cursor(conn)
+                        cursors.append(cursor)
+                        cursor.execute(stmt, values, prepare=True)
+                    pipeline.sync()
+                except psycopg.Error as cause:
+                    error = cause
+        except psycopg.Error as cause:
+            error = error or cause
+
+        for cursor, (_, _, result) in zip(cursors, pending):
+            if cursor.pgresult is not None:
+                result.rows = cursor.fetchall()
+            cursor.close()
+
+        if error is not None:
+            failed = self._attribute(pending, cursors, error)
+            conn.rollback()
+            raise self._error(failed)
+
+        return [result for _, _, result in pending]
+
+
+class AsyncCypherBatch(_BaseCypherBatch):
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            await self.flush()
+        else:
+            self._pending = []
+
+    async def flush(self) -> list :
+        pending, self._pending = self._pending, []
+        if not pending:
+            return []
+
+        conn = self.connection
+        cursors = []
+        error = None
+        try:
+            async with conn.pipeline() as pipeline:
+                try:
+                    for stmt, values, _ in pending:
+                        cursor = psycopg.AsyncCursor(conn)
+                        cursors.append(cursor)
+                        await cursor.execute(stmt, values, prepare=True)
+                    await pipeline.sync()
+                except psycopg.Error as cause:
+                    error = cause
+        except psycopg.Error as cause:
+            error = error or cause
+
+        for cursor, (_, _, result) in zip(cursors, pending):
+            if cursor.pgresult is not None:
+                result.rows = await cursor.fetchall()
+            await cursor.close()
+
+        if error is not None:
+            failed = self._attribute(pending, cursors, error)
+            await conn.rollback()
+            raise self._error(failed)
+
+        return [result for _, _, result in pending]
+
+
 # def execCypherWithReturn(conn:psycopg.connection, graphName:str, cypherStmt:str, columns:list=None , params:tuple=None) -> psycopg.cursor :
 #     stmt = buildCypher(graphName, cypherStmt, columns)
 #     return execSql(conn, stmt, False, params)
@@ -215,11 +678,21 @@ class Age:
     def rollback(self):
         self.connection.rollback()
 
-    def execCypher(self, cypherStmt:str, cols:list=None, params:tuple=None) -> psycopg.cursor :
-        return execCypher(self.connection, self.graphName, cypherStmt, cols=cols, params=params)
+    def execCypher(self, cypherStmt:str, cols:list=None, params:tuple=None, prepare:bool=False,
+                   result_format:str="rows", property_keys=None) -> psycopg.cursor :
+        return execCypher(self.connection, self.graphName, cypherStmt, cols=cols, params=params, prepare=prepare,
+                          result_format=result_format, property_keys=property_keys)
+
+    def cypher(self, cursor:psycopg.cursor, cypherStmt:str, cols:list=None, params:tuple=None, prepare:bool=False) -> psycopg.cursor :
+        return cypher(cursor, self.graphName, cypherStmt, cols=cols, params=params, prepare=prepare)
+
+    # Iterate the parsed result rows, fetching them from the server itersize rows at a time.
+    def streamCypher(self, cypherStmt:str, cols:list=None, params:tuple=None, itersize:int=STREAM_ITERSIZE, prepare:bool=False):
+        return streamCypher(self.connection, self.graphName, cypherStmt, cols=cols, params=params, itersize=itersize, prepare=prepare)
 
-    def cypher(self, cursor:psycopg.cursor, cypherStmt:str, cols:list=None, params:tuple=None) -> psycopg.cursor :
-        return cypher(cursor, self.graphName, cypherStmt, cols=cols, params=params)
+    # Queue statements with batch.execCypher() in a `with` block, they are sent in one round trip when it exits.
+    def batch(self) -> CypherBatch :
+        return CypherBatch(self.connection, self.graphName)
 
     # def execSql(self, stmt:str, commit:bool=False, params:tuple=None) -> psycopg.cursor :
     #     return execSql(self.connection, stmt, commit, params)
@@ -233,3 +706,48 @@ class Age:
 
     # def queryCypher(self, cypherStmt:str, columns:list=None , params:tuple=None) -> psycopg.cursor :
     #     return queryCypher(self.connection, self.graphName, cypherStmt, columns, params)
+
+
+class AsyncAge:
+    def __init__(self):
+        self.connection = None    # psycopg async connection
+        self.graphName = None
+
+    # Connect to PostgreSQL Server and establish session and type extension environment.
+    async def connect(self, graph:str=None, dsn:str=None, connection_factory=None, cursor_factory=AsyncClientCursor,
+                load_from_plugins:bool=False, **kwargs):
+        conn = await psycopg.AsyncConnection.connect(dsn, cursor_factory=cursor_factory, **kwargs)
+        await setUpAgeAsync(conn, graph, load_from_plugins)
+        self.connection = conn
+        self.graphName = graph
+        return self
+
+    async def close(self):
+        await self.connection.close()
+
+    async def setGraph(self, graph:str):
+        await checkGraphCreatedAsync(self.connection, graph)
+        self.graphName = graph
+        return self
+
+    async def commit(self):
+        await self.connection.commit()
+
+    async def rollback(self):
+        await self.connection.rollback()
+
+    async def execCypher(self, cypherStmt:str, cols:list=None, params:tuple=None, prepare:bool=False,
+                         result_format:str="rows", property_keys=None) -> psycopg.AsyncCursor :
+        return await execCypherAsync(self.connection, self.graphName, cypherStmt, cols=cols, params=params, prepare=prepare,
+                                     result_format=result_format, property_keys=property_keys)
+
+    async def cypher(self, cursor:psycopg.AsyncCursor, cypherStmt:str, cols:list=None, params:tuple=None, prepare:bool=False) -> psycopg.AsyncCursor :
+        return await cypherAsync(cursor, self.graphName, cypherStmt, cols=cols, params=params, prepare=prepare)
+
+    # Iterate the result rows with `async for`, fetching them from the server as they are produced.
+    def streamCypher(self, cypherStmt:str, cols:list=None, params:tuple=None):
+        return streamCypherAsync(self.connection, self.graphName, cypherStmt, cols=cols, params=params)
+
+    # Queue statements with batch.execCypher() in an `async with` block, they are sent in one round trip when it exits.
+    def batch(self) -> AsyncCypherBatch :
+        return AsyncCypherBatch(self.connection, self.graphName)
@@ -21,30 +21,80 @@ from .exceptions import *
 from antlr4 import InputStream, CommonTokenStream, ParserRuleContext
 from antlr4.tree.Tree import TerminalNode
 from decimal import Decimal
+from json.decoder import scanstring
+import json
+import re
+import sys
+import threading
 
-resultHandler = None
+# Handlers are not shared between threads (the ANTLR one reuses its lexer and parser),
+# every thread lazily gets its own pair
+_threadLocal = threading.local()
 
 class ResultHandler:
     def parse(ageData):
         pass
 
-def newResultHandler(query=""):
-    resultHandler = Antlr4ResultHandler(None, query)
-    return resultHandler
+def newResultHandler(query="", useAntlr=False, lazyProperties=True):
+    if useAntlr:
+        return Antlr4ResultHandler(None, query)
+    return FastResultHandler(None, query, lazyProperties)
 
-def parseAgeValue(value, cursor=None):
+def getResultHandler(useAntlr=False):
+    handlers = getattr(_threadLocal, "handlers", None)
+    if handlers == None:
+        handlers = _threadLocal.handlers = {}
+
+    handler = handlers.get(useAntlr)
+    if handler == None:
+        handler = handlers[useAntlr] = newResultHandler(useAntlr=useAntlr)
+    return handler
+
+def parseAgeValue(value, cursor=None, resultHandler=None):
     if value is None:
         return None
 
-    global resultHandler
     if (resultHandler == None):
-        resultHandler = Antlr4ResultHandler(None)
+        resultHandler = getResultHandler()
     try:
         return resultHandler.parse(value)
+    except Exception:
+        pass
+
+    # Fall back to the ANTLR grammar for anything the fast parser rejects
+    try:
+        return getResultHandler(useAntlr=True).parse(value)
     except Exception as ex:
         raise AGTypeError(value, ex)
 
 
+def buildVertex(dict, vertexCache=None):
+    vid = dict["id"]
+    vertex = None
+    if vertexCache != None and vid in vertexCache :
+        vertex = vertexCache[vid]
+    else:
+        vertex = Vertex()
+        vertex.id = dict["id"]
+        vertex.label = dict["label"]
+        vertex.properties = dict["properties"]
+
+    if vertexCache != None:
+        vertexCache[vid] = vertex
+
+    return vertex
+
+def buildEdge(dict):
+    edge = Edge()
+    edge.id = dict["id"]
+    edge.label = dict["label"]
+    edge.end_id = dict["end_id"]
+    edge.start_id = dict["start_id"]
+    edge.properties = dict["properties"]
+
+    return edge
+
+
 class Antlr4ResultHandler(ResultHandler):
     def __init__(self, vertexCache, query=None):
         self.lexer = AgtypeLexer()
@@ -64,6 +114,170 @@ class Antlr4ResultHandler(ResultHandler):
         return parsed
 
 
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_NUMBER = re.compile(r'-?(?:0|[1-9][0-9]*)(\.[0-9]+)?([eE][-+]?[0-9]+)?')
+_ANNOTATION = re.compile(r'[ \t\n\r]*::[ \t\n\r]*([A-Za-z_][A-Za-z_0-9]*)')
+# How AGE prints a vertex and an edge, properties always come last
+_VERTEX_HEAD = re.compile(r'\{"id": (\d+), "label": "((?:[^"\\]|\\.)*)", "properties": ')
+_EDGE_HEAD = re.compile(r'\{"id": (\d+), "label": "((?:[^"\\]|\\.)*)", "end_id": (\d+), "start_id": (\d+), "properties": ')
+_CONSTANTS = (
+    ("true", True),
+    ("false", False),
+    ("null", None),
+    ("NaN", float("nan")),
+    ("Infinity", float("inf")),
+    ("-Infinity", float("-inf")),
+)
+
+# Label of a vertex or edge matched by _VERTEX_HEAD or _EDGE_HEAD
+def entityLabel(head) -> str:
+    label = head.group(2)
+    if '\\' in label:
+        label = scanstring(head.string, head.start(2))[0]
+    # Few distinct labels for many entities, share their strings
+    return sys.intern(label)
+
+# Single pass agtype parser. agtype is JSON plus NaN/Infinity floats and '::' type
+# annotations, so values without annotations are handed to json as a whole, a lone
+# vertex or edge has its suffix cut off first, and anything else is scanned once
+# with json's string decoder and a number pattern, without building a parse tree.
+# With lazyProperties, a lone vertex or edge only has its id, label and ends read, its properties
+# are kept as text and parsed on first use.
+class FastResultHandler(ResultHandler):
+    def __init__(self, vertexCache, query=None, lazyProperties=True):
+        self.vertexCache = vertexCache
+        self.lazyProperties = lazyProperties
+
+    def parse(self, ageData):
+        if not ageData:
+            return None
+
+        if self.lazyProperties:
+            if ageData.endswith("}::vertex"):
+                head = _VERTEX_HEAD.match(ageData)
+                if head and ageData[head.end()] == '{':
+                    return self.buildLazyVertex(head, ageData[head.end():-9])
+            elif ageData.endswith("}::edge"):
+                head = _EDGE_HEAD.match(ageData)
+                if head and ageData[head.end()] == '{':
+                    edge = Edge(int(head.group(1)), entityLabel(head), rawProperties=ageData[head.end():-7])
+                    edge.end_id = int(head.group(3))
+                    edge.start_id = int(head.group(4))
+                    return edge
+
+        annotations = ageData.count("::")
+        if annotations == 0:
+            return json.loads(ageData)
+        if annotations == 1:
+            if ageData.endswith("::vertex"):
+                return buildVertex(json.loads(ageData[:-8]), self.vertexCache)
+            if ageData.endswith("::edge"):
+                return buildEdge(json.loads(ageData[:-6]))
+
+        value, idx = self.parseValue(ageData, 0)
+        idx = _WHITESPACE.match(ageData, idx).end()
+        if idx != len(ageData):
+            raise ValueError(f"Unexpected data at position {idx}")
+        return value
+
+    def buildLazyVertex(self, head, rawProperties):
+        vid = int(head.group(1))
+        vertexCache = self.vertexCache
+        if vertexCache != None and vid in vertexCache:
+            return vertexCache[vid]
+
+        vertex = Vertex(vid, entityLabel(head), rawProperties=rawProperties)
+        if vertexCache != None:
+            vertexCache[vid] = vertex
+        return vertex
+
+    def parseValue(self, s, idx):
+        idx = _WHITESPACE.match(s, idx).end()
+        start = idx
+        char = s[idx:idx + 1]
+
+        if char == '"':
+            value, idx = scanstring(s, idx + 1)
+        elif char == '{':
+            value, idx = self.parseObject(s, idx + 1)
+        elif char == '[':
+            value, idx = self.parseArray(s, idx + 1)
+        else:
+            number = _NUMBER.match(s, idx)
+            if number:
+                fraction, exponent = number.groups()
+                value = float(number.group()) if fraction or exponent else int(number.group())
+                idx = number.end()
+            else:
+                value, idx = self.parseConstant(s, idx)
+
+        annotation = _ANNOTATION.match(s, idx)
+        if annotation:
+            value = self.handleAnnotatedValue(annotation.group(1), value, s[start:idx])
+            idx = annotation.end()
+
+        return value, idx
+
+    def parseObject(self, s, idx):
+        obj = dict()
+        idx = _WHITESPACE.match(s, idx).end()
+        if s[idx:idx + 1] == '}':
+            return obj, idx + 1
+
+        while True:
+            if s[idx:idx + 1] != '"':
+                raise ValueError(f"Expected property name at position {idx}")
+            name, idx = scanstring(s, idx + 1)
+            idx = _WHITESPACE.match(s, idx).end()
+            if s[idx:idx + 1] != ':':
+                raise ValueError(f"Expected ':' at position {idx}")
+            obj[name], idx = self.parseValue(s, idx + 1)
+
+            idx = _WHITESPACE.match(s, idx).end()
+            char = s[idx:idx + 1]
+            if char == '}':
+                return obj, idx + 1
+            if char != ',':
+                raise ValueError(f"Expected ',' or '}}' at position {idx}")
+            idx = _WHITESPACE.match(s, idx + 1).end()
+
+    def parseArray(self, s, idx):
+        li = list()
+        idx = _WHITESPACE.match(s, idx).end()
+        if s[idx:idx + 1] == ']':
+            return li, idx + 1
+
+        while True:
+            val, idx = self.parseValue(s, idx)
+            li.append(val)
+
+            idx = _WHITESPACE.match(s, idx).end()
+            char = s[idx:idx + 1]
+            if char == ']':
+                return li, idx + 1
+            if char != ',':
+                raise ValueError(f"Expected ',' or ']' at position {idx}")
+            idx += 1
+
+    def parseConstant(self, s, idx):
+        for text, value in _CONSTANTS:
+            if s.startswith(text, idx):
+                return value, idx + len(text)
+        raise ValueError(f"Unexpected character at position {idx}")
+
+    def handleAnnotatedValue(self, anno:str, value, text:str):
+        if anno == "numeric":
+            return Decimal(text)
+        elif anno == "vertex":
+            return buildVertex(value, self.vertexCache)
+        elif anno == "edge":
+            return buildEdge(value)
+        elif anno == "path":
+            return Path(value)
+
+        return value
+
+
 # print raw result String
 class DummyResultHandler(ResultHandler):
     def parse(self, ageData):
@@ -174,32 +388,10 @@ class ResultVisitor(AgtypeVisitor):
         if anno == "numeric":
             return Decimal(ctx.getText())
         elif anno == "vertex":
-            dict = ctx.accept(self)
-            vid = dict["id"]
-            vertex = None
-            if self.vertexCache != None and vid in self.vertexCache :
-                vertex = self.vertexCache[vid]
-            else:
-                vertex = Vertex()
-                vertex.id = dict["id"]
-                vertex.label = dict["label"]
-                vertex.properties = dict["properties"]
-            
-            if self.vertexCache != None:
-                self.vertexCache[vid] = vertex
-
-            return vertex
+            return buildVertex(ctx.accept(self), self.vertexCache)
         
         elif anno == "edge":
-            edge = Edge()
-            dict = ctx.accept(self)
-            edge.id = dict["id"]
-            edge.label = dict["label"]
-            edge.end_id = dict["end_id"]
-            edge.start_id = dict["start_id"]
-            edge.properties = dict["properties"]
-            
-            return edge
+            return buildEdge(ctx.accept(self))
 
         elif anno == "path":
             arr = ctx.accept(self)
@@ -0,0 +1,140 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+# Columnar results: the agtype text of each column turned straight into NumPy arrays,
+# without building a Vertex or Edge per row.
+
+import numpy as np
+from .models import Vertex, Edge
+from .builder import parseAgeValue, entityLabel, _VERTEX_HEAD, _EDGE_HEAD
+from .exceptions import AGTypeError
+
+# Id (and start_id, end_id) of a null entity, or of the ends of a vertex in a column also holding edges
+NO_ID = -1
+
+
+class ColumnBuilder:
+    def __init__(self, keys:list):
+        self.keys = keys
+        self.ids = []
+        self.labels = []
+        self.start_ids = []
+        self.end_ids = []
+        self.properties = {key: [] for key in keys}
+        self.values = []
+        # Whether the column holds vertices and edges, decided by its first non null value
+        self.entities = None
+        self.leadingNulls = 0
+        self.edges = False
+
+    def add(self, text:str):
+        if text is None:
+            if self.entities:
+                self.addEntity(NO_ID, "", NO_ID, NO_ID, None)
+            elif self.entities is None:
+                self.leadingNulls += 1
+            else:
+                self.values.append(None)
+            return
+
+        if self.entities is not False:
+            if text.endswith("}::vertex"):
+                head = _VERTEX_HEAD.match(text)
+                if head and text[head.end()] == '{':
+                    self.addEntity(int(head.group(1)), entityLabel(head), NO_ID, NO_ID, text[head.end():-9])
+                    return
+            elif text.endswith("}::edge"):
+                head = _EDGE_HEAD.match(text)
+                if head and text[head.end()] == '{':
+                    self.edges = True
+                    self.addEntity(int(head.group(1)), entityLabel(head), int(head.group(4)), int(head.group(3)), text[head.end():-7])
+                    return
+
+        value = parseAgeValue(text)
+        if isinstance(value, Edge) and self.entities is not False:
+            self.edges = True
+            self.addEntity(value.id, value.label, value.start_id, value.end_id, value.properties)
+        elif isinstance(value, Vertex) and self.entities is not False:
+            self.addEntity(value.id, value.label, NO_ID, NO_ID, value.properties)
+        elif self.entities:
+            raise AGTypeError("Column of vertices and edges holding " + text, None)
+        else:
+            if self.entities is None:
+                self.entities = False
+                self.values = [None] * self.leadingNulls
+            self.values.append(value)
+
+    def addEntity(self, id:int, lbl:str, start_id:int, end_id:int, properties):
+        if self.entities is None:
+            self.entities = True
+            for _ in range(self.leadingNulls):
+                self.addEntity(NO_ID, "", NO_ID, NO_ID, None)
+
+        self.ids.append(id)
+        self.labels.append(lbl)
+        self.start_ids.append(start_id)
+        self.end_ids.append(end_id)
+        if self.keys:
+            if isinstance(properties, str):
+                properties = parseAgeValue(properties)
+            for key in self.keys:
+                self.properties[key].append(properties.get(key) if properties else None)
+
+    def build(self) -> dict:
+        if not self.entities:
+            return {"value": toArray(self.values if self.entities is False else [None] * self.leadingNulls)}
+
+        column = {
+            "id": np.array(self.ids, dtype=np.int64),
+            "label": np.array(self.labels, dtype=object),
+        }
+        if self.edges:
+            column["start_id"] = np.array(self.start_ids, dtype=np.int64)
+            column["end_id"] = np.array(self.end_ids, dtype=np.int64)
+        column["properties"] = {key: toArray(values) for key, values in self.properties.items()}
+        return column
+
+
+# Values as an array of the narrowest type holding them all: bool, int64, float64 (None as NaN), str, or object
+def toArray(values:list) -> np.ndarray:
+    types = set(map(type, values))
+    if types == {bool}:
+        return np.array(values, dtype=bool)
+    if types == {int}:
+        try:
+            return np.array(values, dtype=np.int64)
+        except OverflowError:
+            return np.array(values, dtype=object)
+    if types and types <= {int, float, type(None)} and types != {type(None)}:
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+    if types == {str}:
+        return np.array(values, dtype=str)
+    return np.array(values + [None], dtype=object)[:-1]
+
+
+# Columns of a result from its description and rows, with agtype loaded as text. Vertex and edge columns become
+# {"id", "label", "properties": {key: array}} (plus "start_id" and "end_id" for edges), other columns {"value": array}.
+# properties are the keys to extract, a list for every column or a dict of lists by column name.
+def toColumns(description, rows, properties=None) -> dict:
+    names = [column.name for column in description]
+    if properties is None or isinstance(properties, (list, tuple)):
+        properties = {name: list(properties or []) for name in names}
+    builders = [ColumnBuilder(properties.get(name, [])) for name in names]
+
+    for row in rows:
+        for builder, text in zip(builders, row):
+            builder.add(text)
+
+    return {name: builder.build() for name, builder in zip(names, builders)}
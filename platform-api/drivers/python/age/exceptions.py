@@ -60,6 +60,16 @@ class SqlExecutionError(Exception):
     def __repr__(self) :
         return 'SqlExecution [' + self.msg + ']'
 
+class BatchExecutionError(SqlExecutionError):
+    def __init__(self, msg, cause, index, results):
+        super().__init__(msg, cause)
+        # Position of the failing statement in the batch, and the results of every statement
+        self.index = index
+        self.results = results
+
+    def __repr__(self) :
+        return 'BatchExecution [' + str(self.index) + ': ' + self.msg + ']'
+
 class AGTypeError(Exception):
     def __init__(self, msg, cause):
         self.msg = msg
@@ -54,13 +54,57 @@ class Graph():
             return None
 
 class AGObj:
+    __slots__ = ()
+
     @property
     def gtype(self):
         return TP_NONE
 
 
+# Vertices and edges keep their attributes in slots rather than a per-object dict. Their properties
+# can be given as raw agtype text, only parsed into a dict the first time they are used.
+class Entity(AGObj):
+    __slots__ = ('id', 'label', '_properties', '_rawProperties')
+
+    def __init__(self, id=None, label=None, properties=None, rawProperties=None) -> None:
+        self.id = id
+        self.label = label
+        self._properties = properties
+        self._rawProperties = rawProperties
+
+    @property
+    def properties(self):
+        if self._rawProperties is not None:
+            from .builder import parseAgeValue
+            self._properties = parseAgeValue(self._rawProperties)
+            self._rawProperties = None
+        return self._properties
+
+    @properties.setter
+    def properties(self, properties):
+        self._properties = properties
+        self._rawProperties = None
+
+    def __setitem__(self,name, value):
+        self.properties[name]=value
+        
+    def __getitem__(self,name):
+        properties = self.properties
+        if name in properties:
+            return properties[name]
+        else:
+            return None
+
+    def __str__(self) -> str:
+        return self.toString()
+
+    def __repr__(self) -> str:
+        return self.toString()
+
+
 class Path(AGObj):
-    entities = []
+    __slots__ = ('entities',)
+
     def __init__(self, entities=None) -> None:
         self.entities = entities
 
@@ -121,31 +165,13 @@ class Path(AGObj):
 
     
 
-class Vertex(AGObj):
-    def __init__(self, id=None, label=None, properties=None) -> None:
-        self.id = id
-        self.label = label
-        self.properties = properties
+class Vertex(Entity):
+    __slots__ = ()
 
     @property
     def gtype(self):
         return TP_VERTEX
 
-    def __setitem__(self,name, value):
-        self.properties[name]=value
-        
-    def __getitem__(self,name):
-        if name in self.properties:
-            return self.properties[name]
-        else:
-            return None
-
-    def __str__(self) -> str:
-        return self.toString()
-
-    def __repr__(self) -> str:
-        return self.toString()
-
     def toString(self) -> str: 
         return nodeToString(self)
 
@@ -159,33 +185,18 @@ class Vertex(AGObj):
         _nodeToJson(self, buf)
 
 
-class Edge(AGObj):
-    def __init__(self, id=None, label=None, properties=None) -> None:
-        self.id = id
-        self.label = label
+class Edge(Entity):
+    __slots__ = ('start_id', 'end_id')
+
+    def __init__(self, id=None, label=None, properties=None, rawProperties=None) -> None:
+        super().__init__(id, label, properties, rawProperties)
         self.start_id = None
         self.end_id = None
-        self.properties = properties
 
     @property
     def gtype(self):
         return TP_EDGE
 
-    def __setitem__(self,name, value):
-        self.properties[name]=value
-        
-    def __getitem__(self,name):
-        if name in self.properties:
-            return self.properties[name]
-        else:
-            return None
-
-    def __str__(self) -> str:
-        return self.toString()
-
-    def __repr__(self) -> str:
-        return self.toString()
-
     def extraStrFormat(node, buf):
         if node.start_id != None:
             buf.write(", start_id:")
@@ -23,7 +23,8 @@ from .lib import *
 def age_to_networkx(connection: psycopg.connect,
                     graphName: str,
                     G: None | nx.DiGraph = None,
-                    query: str | None = None
+                    query: str | None = None,
+                    itersize: int = STREAM_ITERSIZE
                     ) -> nx.DiGraph:
     """
     @params
@@ -32,6 +33,7 @@ def age_to_networkx(connection: psycopg.connect,
     graphName - (str) Name of the graph
     G - (networkx.DiGraph) Networkx directed Graph [optional]
     query - (str) Cypher query [optional]
+    itersize - (int) Rows fetched from the server at a time [optional]
 
         @returns
     ------------
@@ -75,13 +77,12 @@ def age_to_networkx(connection: psycopg.connect,
     age.setUpAge(connection, graphName)
 
     if (query == None):
-        addAllNodesIntoNetworkx(connection, graphName, G)
-        addAllEdgesIntoNetworkx(connection, graphName, G)
+        addAllNodesIntoNetworkx(connection, graphName, G, itersize)
+        addAllEdgesIntoNetworkx(connection, graphName, G, itersize)
     else:
-        with connection.cursor() as cursor:
+        with serverCursor(connection, itersize) as cursor:
             cursor.execute(query)
-            rows = cursor.fetchall()
-            for row in rows:
+            for row in cursor:
                 for x in row:
                     if type(x) == Path:
                         addPath(x)
@@ -223,36 +223,34 @@ def addAllEdgesIntoAGE(connection: psycopg.connect, graphName: str, G: nx.DiGrap
         raise Exception(e)
 
 
-def addAllNodesIntoNetworkx(connection: psycopg.connect, graphName: str, G: nx.DiGraph):
-    """Add all nodes to Networkx"""
+def addAllNodesIntoNetworkx(connection: psycopg.connect, graphName: str, G: nx.DiGraph, itersize: int = STREAM_ITERSIZE):
+    """Add all nodes to Networkx, fetching itersize rows at a time"""
     node_label_list = get_vlabel(connection, graphName)
     try:
         for label in node_label_list:
-            with connection.cursor() as cursor:
+            with serverCursor(connection, itersize) as cursor:
                 cursor.execute("""
                 SELECT id, CAST(properties AS VARCHAR) 
                 FROM %s."%s";
                 """ % (graphName, label))
-                rows = cursor.fetchall()
-                for row in rows:
+                for row in cursor:
                     G.add_node(int(row[0]), label=label,
                                properties=json.loads(row[1]))
     except Exception as e:
         print(e)
 
 
-def addAllEdgesIntoNetworkx(connection: psycopg.connect, graphName: str, G: nx.DiGraph):
-    """Add All edges to Networkx"""
+def addAllEdgesIntoNetworkx(connection: psycopg.connect, graphName: str, G: nx.DiGraph, itersize: int = STREAM_ITERSIZE):
+    """Add All edges to Networkx, fetching itersize rows at a time"""
     try:
         edge_label_list = get_elabel(connection, graphName)
         for label in edge_label_list:
-            with connection.cursor() as cursor:
+            with serverCursor(connection, itersize) as cursor:
                 cursor.execute("""
                                SELECT start_id, end_id, CAST(properties AS VARCHAR) 
                                FROM %s."%s";
                                """ % (graphName, label))
-                rows = cursor.fetchall()
-                for row in rows:
+                for row in cursor:
                     G.add_edge(int(row[0]), int(
                         row[1]), label=label, properties=json.loads(row[2]))
     except Exception as e:
@@ -0,0 +1,88 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+# Memory held by parsed vertices: the former dict-backed objects, slot-based ones with their
+# properties parsed, and slot-based ones keeping their properties as text until used.
+# No database needed, the agtype text is generated the way AGE prints it.
+#
+#   python benchmark_models.py [vertex count]
+
+import gc
+import sys
+import time
+import tracemalloc
+import age
+
+VERTEX_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+
+# The layout of Vertex before it had slots
+class DictVertex:
+    def __init__(self, id=None, label=None, properties=None) -> None:
+        self.id = id
+        self.label = label
+        self.properties = properties
+
+
+def dictVertices(rows):
+    handler = age.newResultHandler(lazyProperties=False)
+    vertices = []
+    for row in rows:
+        vertex = handler.parse(row)
+        vertices.append(DictVertex(vertex.id, vertex.label, vertex.properties))
+    return vertices
+
+
+def parsedVertices(rows):
+    handler = age.newResultHandler(lazyProperties=False)
+    return [handler.parse(row) for row in rows]
+
+
+def lazyVertices(rows):
+    handler = age.newResultHandler()
+    return [handler.parse(row) for row in rows]
+
+
+def measure(name, build, rows):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    vertices = build(rows)
+    elapsed = time.perf_counter() - started
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<26}{held / len(rows):>10.0f} B/vertex{held / 2**20:>10.1f} MiB{elapsed:>9.2f}s")
+    return vertices
+
+
+def main():
+    rows = ['{"id": %d, "label": "Business", "properties": {"name": "Business %d", "category": "Retail", "score": %d.5}}::vertex' % (844424930131969 + i, i, i)
+            for i in range(VERTEX_COUNT)]
+
+    print(f"{VERTEX_COUNT} vertices, memory held after parsing (the agtype text excluded)")
+    print(f"{'model':<26}{'per vertex':>17}{'total':>14}{'parse':>10}")
+    measure("dict-backed", dictVertices, rows)
+    measure("slots", parsedVertices, rows)
+    vertices = measure("slots, lazy properties", lazyVertices, rows)
+
+    started = time.perf_counter()
+    for vertex in vertices:
+        vertex.properties
+    print(f"decoding every lazy property afterwards: {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
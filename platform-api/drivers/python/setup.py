@@ -31,6 +31,8 @@ setup(
     download_url     = 'https://github.com/apache/age/releases' ,
     license          = 'Apache2.0',
     install_requires = [ 'psycopg', 'antlr4-python3-runtime==4.11.1'],
+    # result_format="columnar" reads results into NumPy arrays
+    extras_require   = { 'columnar': ['numpy'] },
     packages         = ['age', 'age.gen','age.networkx'],
     keywords         = ['Graph Database', 'Apache AGE', 'PostgreSQL'],
     python_requires  = '>=3.9',
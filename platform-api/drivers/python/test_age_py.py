@@ -18,6 +18,7 @@ from age.models import Vertex
 import unittest
 import decimal
 import age
+import psycopg
 import argparse
 
 TEST_HOST = "localhost"
@@ -273,6 +274,127 @@ class TestAgeBasic(unittest.TestCase):
 
         print("\nTest 4 Successful...")
 
+    def testPrepared(self):
+        print("\n------------------------------------------------")
+        print("Test 4.1: Testing single statement cypher calls.....")
+        print("------------------------------------------------\n")
+
+        ag = self.ag
+        for name, weight in [("Joe", 1.5), ("Jack", 2), ("Andy", None)]:
+            ag.execCypher(
+                "CREATE (n:Person {name: %s, weight: %s}) RETURN n",
+                params=(name, weight),
+                prepare=True,
+            )
+        ag.commit()
+
+        cursor = ag.execCypher(
+            "MATCH (n:Person) WHERE n.name = %(name)s RETURN n, n.weight",
+            cols=["n", "weight"],
+            params={"name": "Joe"},
+            prepare=True,
+        )
+        row = cursor.fetchone()
+        self.assertEqual(Vertex, type(row[0]))
+        self.assertEqual(1.5, row[1])
+
+        with psycopg.Cursor(ag.connection) as cursor:
+            ag.cypher(cursor, "MATCH (n:Person) RETURN count(n)", prepare=True)
+            self.assertEqual(3, cursor.fetchone()[0])
+
+        print("\nTest 4.1 Successful...")
+
+    def testStream(self):
+        print("\n----------------------------------------")
+        print("Test 4.2: Testing streamed results.....")
+        print("----------------------------------------\n")
+
+        ag = self.ag
+        for i in range(10):
+            ag.execCypher("CREATE (n:Person {name: %s, num: %s})", params=("P%d" % i, i))
+        ag.commit()
+
+        # Fewer rows per batch than rows in the result
+        nums = [row[0]["num"] for row in ag.streamCypher("MATCH (n:Person) RETURN n ORDER BY n.num", itersize=3)]
+        self.assertEqual(list(range(10)), nums)
+
+        rows = ag.streamCypher(
+            "MATCH (n:Person) WHERE n.num >= %s RETURN n.name, n.num ORDER BY n.num",
+            cols=["name", "num"],
+            params=(8,),
+            itersize=1,
+            prepare=True,
+        )
+        self.assertEqual([("P8", 8), ("P9", 9)], list(rows))
+
+        # Stopping early closes the server side cursor
+        rows = ag.streamCypher("MATCH (n:Person) RETURN n", itersize=2)
+        self.assertEqual(Vertex, type(next(rows)[0]))
+        rows.close()
+        self.assertEqual(10, ag.execCypher("MATCH (n:Person) RETURN count(n)").fetchone()[0])
+
+        print("\nTest 4.2 Successful...")
+
+    def testBatch(self):
+        print("\n----------------------------------------")
+        print("Test 4.3: Testing batched statements.....")
+        print("----------------------------------------\n")
+
+        ag = self.ag
+        with ag.batch() as batch:
+            for i in range(5):
+                batch.execCypher("CREATE (n:Person {name: %s, num: %s})", params=("P%d" % i, i))
+            count = batch.execCypher("MATCH (n:Person) RETURN count(n)")
+        ag.commit()
+
+        self.assertEqual(6, len(batch.results))
+        self.assertEqual([], batch.results[0].rows)
+        self.assertEqual(5, count.rows[0][0])
+
+        # The failing statement is reported, the ones after it are not run and the batch is rolled back
+        with self.assertRaises(age.BatchExecutionError) as context:
+            with ag.batch() as batch:
+                batch.execCypher("MATCH (n:Person {name: %s}) SET n.num = %s", params=("P0", 10))
+                batch.execCypher("MATCH (n:Person) RETURN n.num / 0")
+                batch.execCypher("MATCH (n:Person {name: %s}) SET n.num = %s", params=("P1", 11))
+
+        self.assertEqual(1, context.exception.index)
+        self.assertIsNone(batch.results[0].error)
+        self.assertIsNotNone(batch.results[1].error)
+        self.assertIsInstance(batch.results[2].error, age.PipelineAborted)
+        nums = [row[0] for row in ag.execCypher("MATCH (n:Person) RETURN n.num ORDER BY n.num")]
+        self.assertEqual(list(range(5)), nums)
+
+        print("\nTest 4.3 Successful...")
+
+    def testColumnar(self):
+        print("\n----------------------------------------")
+        print("Test 4.4: Testing columnar results.....")
+        print("----------------------------------------\n")
+
+        ag = self.ag
+        ag.execCypher("CREATE (:Person {name: 'Joe', age: 30})-[:worksWith {weight: 3}]->(:Person {name: 'Jack', age: 40})")
+        ag.execCypher("CREATE (:Person {name: 'Andy'})-[:worksWith {weight: 5}]->(:Person {name: 'Tom', age: 20})")
+        ag.commit()
+
+        columns = ag.execCypher(
+            "MATCH (a)-[r]->(b) RETURN a, r, b ORDER BY r.weight",
+            cols=["a", "r", "b"],
+            result_format="columnar",
+            property_keys={"a": ["name", "age"], "r": ["weight"]},
+        )
+        self.assertEqual(["Joe", "Andy"], list(columns["a"]["properties"]["name"]))
+        self.assertEqual([30.0], list(columns["a"]["properties"]["age"][:1]))
+        self.assertEqual([3, 5], list(columns["r"]["properties"]["weight"]))
+        self.assertEqual(list(columns["a"]["id"]), list(columns["r"]["start_id"]))
+        self.assertEqual(list(columns["b"]["id"]), list(columns["r"]["end_id"]))
+        self.assertEqual(["worksWith", "worksWith"], list(columns["r"]["label"]))
+
+        columns = ag.execCypher("MATCH (n:Person) RETURN count(n)", result_format="columnar", prepare=True)
+        self.assertEqual([4], list(columns["v"]["value"]))
+
+        print("\nTest 4.4 Successful...")
+
     def testMultipleEdges(self):
         print("\n------------------------------------")
         print("Test 5: Testing Multiple Edges.....")
@@ -449,6 +571,58 @@ class TestAgeBasic(unittest.TestCase):
         print("Vertex.toString() 'properties' field is formatted properly.")
 
 
+class TestAsyncAge(unittest.IsolatedAsyncioTestCase):
+    ag = None
+    args: argparse.Namespace = TestAgeBasic.args
+
+    async def asyncSetUp(self):
+        print("Connecting to Test Graph.....")
+        args = dict(
+            host=self.args.host,
+            port=self.args.port,
+            dbname=self.args.database,
+            user=self.args.user,
+            password=self.args.password,
+        )
+
+        dsn = "host={host} port={port} dbname={dbname} user={user} password={password}".format(
+            **args
+        )
+        self.ag = await age.connectAsync(dsn, graph=self.args.graphName, **args)
+
+    async def asyncTearDown(self):
+        # Clear test data
+        print("Deleting Test Graph.....")
+        await age.deleteGraphAsync(self.ag.connection, self.ag.graphName)
+        await self.ag.close()
+
+    async def testAsyncExec(self):
+        print("\n---------------------------------------------------")
+        print("Test 7: Checking async Returns and streaming.....")
+        print("---------------------------------------------------\n")
+
+        ag = self.ag
+        cursor = await ag.execCypher(
+            "CREATE (n:Person {name: %s, title: 'Developer'}) RETURN n",
+            params=("Andy",),
+        )
+        row = await cursor.fetchone()
+        self.assertEqual(Vertex, type(row[0]))
+        self.assertEqual("Andy", row[0]["name"])
+
+        await ag.execCypher("CREATE (n:Person {name: %s}) ", params=("Jack",))
+        await ag.commit()
+
+        names = []
+        async for row in ag.streamCypher(
+            "MATCH (n:Person) RETURN n.name ORDER BY n.name", cols=["name"]
+        ):
+            names.append(row[0])
+
+        self.assertEqual(["Andy", "Jack"], names)
+        print("\nTest 7 Successful...")
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
 
@@ -489,8 +663,14 @@ if __name__ == "__main__":
     suite.addTest(TestAgeBasic("testQuery"))
     suite.addTest(TestAgeBasic("testChangeData"))
     suite.addTest(TestAgeBasic("testCypher"))
+    suite.addTest(TestAgeBasic("testPrepared"))
+    suite.addTest(TestAgeBasic("testStream"))
+    suite.addTest(TestAgeBasic("testBatch"))
+    suite.addTest(TestAgeBasic("testColumnar"))
     suite.addTest(TestAgeBasic("testMultipleEdges"))
     suite.addTest(TestAgeBasic("testCollect"))
     suite.addTest(TestAgeBasic("testSerialization"))
+    suite.addTest(TestAsyncAge("testAsyncExec"))
     TestAgeBasic.args = args
+    TestAsyncAge.args = args
     unittest.TextTestRunner().run(suite)
@@ -13,10 +13,14 @@
 # specific language governing permissions and limitations
 # under the License.
 
+import sys
 import unittest
+from unittest.mock import patch
 from decimal import Decimal
 import math
 import age
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 
 class TestAgtype(unittest.TestCase):
@@ -128,5 +132,219 @@ class TestAgtype(unittest.TestCase):
         self.assertEqual(vertexEnd["name"],  "Joe")
 
 
+class TestAntlrAgtype(TestAgtype):
+    def __init__(self, methodName: str) -> None:
+        super().__init__(methodName=methodName)
+        self.resultHandler = age.newResultHandler(useAntlr=True)
+
+
+class TestFastAgtypeEquivalence(unittest.TestCase):
+    expressions = [
+        '',
+        'null',
+        '"abcd"',
+        '"a::b"',
+        '-1234',
+        '1234.56789',
+        '-6.45161290322581e+46',
+        'NaN',
+        'Infinity',
+        '-Infinity',
+        '12345678901234567890123456789123456789.789::numeric',
+        '[]',
+        '{}',
+        '[1, [2.5, {"a": [true, false, null]}], "x", -Infinity]',
+        '{"name": "Smith", "num":123, "yn":true, "bigInt":123456789123456789123456789123456789::numeric}',
+        '{"id": 844424930131969, "label": "Business", "properties": {"name": "Acme::vertex", "category": "Retail"}}::vertex',
+        '{"id": 1125899906842625, "label": "BusinessRelationship", "end_id": 844424930131970, "start_id": 844424930131969, "properties": {"type": "vendor", "transaction_volume": 1000}}::edge',
+        '''[{"id": 2251799813685425, "label": "Person", "properties": {"name": "Smith"}}::vertex, 
+            {"id": 2533274790396576, "label": "workWith", "end_id": 2251799813685425, "start_id": 2251799813685424, 
+                "properties": {"weight": 3, "bigFloat":123456789123456789123456789.12345::numeric}}::edge, 
+            {"id": 2251799813685424, "label": "Person", "properties": {"name": "Joe"}}::vertex]::path''',
+        '[{"id": 1, "label": "A", "properties": {}}::vertex, {"id": 2, "label": "A", "properties": {}}::vertex]',
+    ]
+
+    def plain(self, value):
+        if isinstance(value, age.Vertex):
+            return ("vertex", value.id, value.label, self.plain(value.properties))
+        if isinstance(value, age.Edge):
+            return ("edge", value.id, value.label, value.start_id, value.end_id, self.plain(value.properties))
+        if isinstance(value, age.Path):
+            return ("path", [self.plain(entity) for entity in value])
+        if isinstance(value, dict):
+            return {name: self.plain(val) for name, val in value.items()}
+        if isinstance(value, list):
+            return [self.plain(val) for val in value]
+        if isinstance(value, float) and math.isnan(value):
+            return "NaN"
+        return (type(value), value)
+
+    def test_equivalence(self):
+        print("\nTesting fast parser equivalence. Result : ",  end='')
+
+        fast = age.newResultHandler()
+        antlr = age.newResultHandler(useAntlr=True)
+        for exp in self.expressions:
+            with self.subTest(exp=exp):
+                self.assertEqual(self.plain(fast.parse(exp)), self.plain(antlr.parse(exp)))
+
+    def test_lazy_properties(self):
+        print("\nTesting lazy property parsing. Result : ",  end='')
+
+        lazy = age.newResultHandler()
+        eager = age.newResultHandler(lazyProperties=False)
+        for exp in self.expressions:
+            with self.subTest(exp=exp):
+                self.assertEqual(self.plain(lazy.parse(exp)), self.plain(eager.parse(exp)))
+
+        vertex = lazy.parse('{"id": 1, "label": "Business", "properties": {"name": "Acme", "big": 1.5::numeric}}::vertex')
+        self.assertEqual(vertex._rawProperties, '{"name": "Acme", "big": 1.5::numeric}')
+        self.assertEqual(vertex["big"], Decimal("1.5"))
+        self.assertIsNone(vertex._rawProperties)
+        vertex["name"] = "Acme Inc"
+        self.assertEqual(vertex.properties, {"name": "Acme Inc", "big": Decimal("1.5")})
+
+        edge = lazy.parse('{"id": 2, "label": "A\\"B", "end_id": 4, "start_id": 3, "properties": {}}::edge')
+        self.assertEqual((edge.id, edge.label, edge.start_id, edge.end_id, edge.properties), (2, 'A"B', 3, 4, {}))
+
+        # Slots only, no per-object dict
+        for entity in (vertex, edge, age.Path([vertex])):
+            self.assertFalse(hasattr(entity, "__dict__"))
+
+    def test_invalid(self):
+        fast = age.newResultHandler()
+        for exp in ['{"a": }', '[1, 2', '{"id": 1}::vertex', 'nul']:
+            with self.subTest(exp=exp):
+                self.assertRaises(Exception, fast.parse, exp)
+
+
+class TestConcurrentAgtype(unittest.TestCase):
+    def test_threads(self):
+        print("\nTesting concurrent parsing. Result : ",  end='')
+
+        exps = ['{"id": %d, "label": "A", "properties": {"n": %d, "big": %d.5::numeric}}::vertex' % (i, i, i) for i in range(200)]
+
+        def parseAll(useAntlr):
+            handler = age.getResultHandler(useAntlr=useAntlr)
+            return threading.get_ident(), handler, [handler.parse(exp) for exp in exps]
+
+        for useAntlr in (False, True):
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                results = list(executor.map(parseAll, [useAntlr] * 8))
+
+            for _, _, vertices in results:
+                for i, vertex in enumerate(vertices):
+                    self.assertEqual(vertex.id, i)
+                    self.assertEqual(vertex["n"], i)
+                    self.assertEqual(vertex["big"], Decimal(i) + Decimal("0.5"))
+            # Every worker thread parsed with its own handler
+            handlers = {thread: id(handler) for thread, handler, _ in results}
+            self.assertEqual(len(set(handlers.values())), len(handlers))
+
+
+class TestCypherParams(unittest.TestCase):
+    def test_round_trip(self):
+        print("\nTesting agtype parameter serialization. Result : ",  end='')
+
+        values = [None, True, -12, 2.5, 1e+300, "a \"quoted\" 'string'\n", Decimal("123456789123456789.0001"),
+                  [1, [2.5, {"a": [True, False, None]}], "x"], {"name": "Smith", "big": Decimal("1.10"), "tags": []}]
+        for value in values:
+            with self.subTest(value=value):
+                self.assertEqual(age.parseAgeValue(age.toAgtype(value)), value)
+
+        self.assertTrue(math.isnan(age.parseAgeValue(age.toAgtype(float("nan")))))
+        self.assertEqual(age.parseAgeValue(age.toAgtype(float("-inf"))), float("-inf"))
+        self.assertRaises(age.AGTypeError, age.toAgtype, object())
+
+    def test_placeholders(self):
+        stmt, values = age.toCypherParams("MATCH (n {name: %s}) WHERE n.n %% 2 = %s RETURN n", ("Smith", 1))
+        self.assertEqual(stmt, "MATCH (n {name: $p0}) WHERE n.n % 2 = $p1 RETURN n")
+        self.assertEqual(values, {"p0": "Smith", "p1": 1})
+
+        stmt, values = age.toCypherParams("MATCH (n {name: %(name)s}) RETURN n", {"name": "Smith"})
+        self.assertEqual(stmt, "MATCH (n {name: $name}) RETURN n")
+        self.assertEqual(values, {"name": "Smith"})
+
+        # Without parameters the statement is sent as it is
+        self.assertEqual(age.toCypherParams("RETURN 5 %% 2", None), ("RETURN 5 %% 2", None))
+
+        for stmt, params in [("RETURN %s, %s", (1,)), ("RETURN %s", (1, 2)), ("RETURN %(a)s", (1,)), ("RETURN %s", {"a": 1})]:
+            with self.subTest(stmt=stmt, params=params):
+                self.assertRaises(age.ProgrammingError, age.toCypherParams, stmt, params)
+
+    def test_statement(self):
+        stmt, values = age.buildCypherStatement("g", "MATCH (n {name: %s}) RETURN n.n % 2, '$$'", ["a", "b numeric"], ("Smith",))
+        self.assertEqual(stmt.as_string(None),
+                         "SELECT * from cypher('g', $q1$MATCH (n {name: $p0}) RETURN n.n %% 2, '$$'$q1$, %s) as (a agtype,b numeric);")
+        self.assertEqual(values, ({"p0": "Smith"},))
+
+        # Same text for different values, so the server side prepared statement is reused
+        self.assertEqual(stmt.as_string(None), age.buildCypherStatement("g", "MATCH (n {name: %s}) RETURN n.n % 2, '$$'", ["a", "b numeric"], ("Joe",))[0].as_string(None))
+
+        stmt, values = age.buildCypherStatement("g", "MATCH (n) RETURN n % 2", None)
+        self.assertEqual(stmt.as_string(None), "SELECT * from cypher('g', $$MATCH (n) RETURN n % 2$$) as (v agtype);")
+        self.assertIsNone(values)
+
+    def test_dollar_quote_tag(self):
+        # The first tag the statement does not contain, whatever tags it does
+        stmt, _ = age.buildCypherStatement("g", "RETURN '$$', '$q2$', '$q4$'", None)
+        self.assertEqual(stmt.as_string(None), "SELECT * from cypher('g', $q1$RETURN '$$', '$q2$', '$q4$'$q1$) as (v agtype);")
+
+        stmt, _ = age.buildCypherStatement("g", "RETURN '$$', '$q1$', '$q2$', '$q4$'", None)
+        self.assertEqual(stmt.as_string(None), "SELECT * from cypher('g', $q3$RETURN '$$', '$q1$', '$q2$', '$q4$'$q3$) as (v agtype);")
+
+
+class TestColumnar(unittest.TestCase):
+    class Column:
+        def __init__(self, name):
+            self.name = name
+
+    def test_columns(self):
+        print("\nTesting columnar results. Result : ",  end='')
+        import numpy as np
+        from age.columnar import toColumns, NO_ID
+
+        description = [self.Column(name) for name in ("a", "r", "b", "n")]
+        rows = [
+            ('{"id": 1, "label": "Business", "properties": {"name": "Acme", "score": 1.5}}::vertex',
+             '{"id": 10, "label": "Supplies", "end_id": 2, "start_id": 1, "properties": {"volume": 100}}::edge',
+             '{"id": 2, "label": "Business", "properties": {"name": "Bolt", "score": 2}}::vertex', '3'),
+            ('{"id": 2, "label": "Business", "properties": {"name": "Bolt", "score": 2}}::vertex',
+             '{"id": 11, "label": "Supplies", "end_id": 3, "start_id": 2, "properties": {}}::edge',
+             None, '4'),
+        ]
+        columns = toColumns(description, rows, {"a": ["name", "score"], "r": ["volume"], "b": ["name"]})
+
+        np.testing.assert_array_equal(columns["a"]["id"], [1, 2])
+        self.assertEqual(columns["a"]["id"].dtype, np.int64)
+        self.assertEqual(list(columns["a"]["label"]), ["Business", "Business"])
+        self.assertNotIn("start_id", columns["a"])
+        np.testing.assert_array_equal(columns["a"]["properties"]["name"], ["Acme", "Bolt"])
+        np.testing.assert_array_equal(columns["a"]["properties"]["score"], [1.5, 2.0])
+
+        np.testing.assert_array_equal(columns["r"]["start_id"], [1, 2])
+        np.testing.assert_array_equal(columns["r"]["end_id"], [2, 3])
+        # Missing properties are NaN in numeric columns
+        np.testing.assert_array_equal(columns["r"]["properties"]["volume"], [100.0, np.nan])
+
+        # A null entity has no id
+        np.testing.assert_array_equal(columns["b"]["id"], [2, NO_ID])
+        self.assertEqual(list(columns["b"]["properties"]["name"]), ["Bolt", None])
+
+        np.testing.assert_array_equal(columns["n"]["value"], [3, 4])
+        self.assertEqual(columns["n"]["value"].dtype, np.int64)
+
+    def test_mixed_column(self):
+        from age.columnar import toColumns
+        rows = [('{"id": 1, "label": "A", "properties": {}}::vertex',), ('1',)]
+        self.assertRaises(age.AGTypeError, toColumns, [self.Column("v")], rows)
+
+    def test_without_numpy(self):
+        # A None entry fails the import like NumPy not being installed, before any query is sent
+        with patch.dict(sys.modules, {"numpy": None}):
+            with self.assertRaisesRegex(ImportError, r"apache-age-python\[columnar\]"):
+                age.age._resultCursor(None, "columnar")
+
+
 if __name__ == '__main__':
     unittest.main()
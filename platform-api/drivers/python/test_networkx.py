@@ -215,6 +215,28 @@ class TestAgeToNetworkx(unittest.TestCase):
             self.assertIn('weight', G.edges[edge]['properties'])
             self.assertEqual(int, type(G.edges[edge]['properties']['weight']))
 
+    def test_streamed_graph(self):
+        print('Testing AGE to Networkx fetching one row at a time')
+        ag = self.ag
+        for name in ('Jack', 'Andy', 'Smith'):
+            ag.execCypher("CREATE (n:Person {name: %s}) ", params=(name,))
+        ag.execCypher("""MATCH (a:Person), (b:Person)
+                    WHERE a.name = 'Andy' AND b.name <> 'Andy'
+                    CREATE (a)-[r:workWith {weight: 3}]->(b)""")
+        ag.commit()
+
+        G = age_to_networkx(ag.connection, TEST_GRAPH_NAME)
+        H = age_to_networkx(ag.connection, TEST_GRAPH_NAME, itersize=1)
+        self.assertEqual(len(H.nodes), 3)
+        self.assertEqual(len(H.edges), 2)
+        self.assertTrue(self.compare_networkX(G, H))
+
+        query = """SELECT * FROM cypher('%s', $$ MATCH (a:Person)-[r:workWith]->(b:Person)
+        RETURN a, r, b $$) AS (a agtype, r agtype, b agtype);
+        """ % (TEST_GRAPH_NAME)
+        H = age_to_networkx(ag.connection, graphName=TEST_GRAPH_NAME, query=query, itersize=1)
+        self.assertTrue(self.compare_networkX(G, H))
+
     def test_existing_graph(self):
         print("Testing AGE to NetworkX for non-existing graph")
         ag = self.ag
@@ -490,6 +512,7 @@ if __name__ == "__main__":
     suite.addTest(TestAgeToNetworkx('test_empty_graph'))
     suite.addTest(TestAgeToNetworkx('test_existing_graph_without_query'))
     suite.addTest(TestAgeToNetworkx('test_existing_graph_with_query'))
+    suite.addTest(TestAgeToNetworkx('test_streamed_graph'))
     suite.addTest(TestAgeToNetworkx('test_existing_graph'))
     TestAgeToNetworkx.args = args
 
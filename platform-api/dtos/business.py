@@ -1,5 +1,8 @@
 from pydantic import BaseModel, Field, validator
 from typing import List, Optional
+from datetime import datetime
+
+RELATIONSHIP_TYPES = ['vendor', 'client']
 
 class CreateBusinessInputDto(BaseModel):
     name: str
@@ -8,6 +11,11 @@ class CreateBusinessInputDto(BaseModel):
 class CreateBusinessOutputDto(BaseModel):
     id: str
 
+class BulkCreateBusinessesOutputDto(BaseModel):
+    # One id per input row, in input order
+    ids: List[str]
+    created: int
+
 class GetBusinessOutputDto(BaseModel):
     id: str
     name: str
@@ -20,16 +28,25 @@ class CreateRelationshipInputDto(BaseModel):
 
     @validator('relationship_type')
     def validate_relationship_type(cls, value):
-        valid_types = ['vendor', 'client']
-        if value not in valid_types:
-            raise ValueError(f"relationship_type must be one of {valid_types}")
+        if value not in RELATIONSHIP_TYPES:
+            raise ValueError(f"relationship_type must be one of {RELATIONSHIP_TYPES}")
         return value
 
 class CreateRelationshipOutputDto(BaseModel):
     id: str
 
+class BulkCreateRelationshipInputDto(CreateRelationshipInputDto):
+    source_business_id: str = Field(alias="sourceBusinessId")
+
+class BulkCreateRelationshipsOutputDto(BaseModel):
+    # One id per input row, in input order, None when one of its businesses does not exist
+    ids: List[Optional[str]]
+    created: int
+
 class RelationshipDto(BaseModel):
+    # id of the related business, relationship_id is the keyset pagination cursor
     id: str
+    relationship_id: Optional[str] = None
     type: str
     transaction_volume: int
     name: str
@@ -41,6 +58,8 @@ class GetRelationshipsOutputDto(BaseModel):
     name: str
     category: str
     relationships: List[RelationshipDto]
+    # Pass as cursor to get the next page, None on the last page
+    next_cursor: Optional[str] = None
 
 class DeleteRelationshipOutputDto(BaseModel):
     done: bool
@@ -51,3 +70,27 @@ class GetRelationshipOutputDto(BaseModel):
     relationship_type: Optional[str] = None
     transaction_volume: Optional[int] = None
 
+class PathSearchJobOutputDto(BaseModel):
+    id: str
+    # queued, running, done or failed
+    status: str
+    # Set once done, None when there is no path
+    result: Optional[GetRelationshipOutputDto] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class DistanceEstimateOutputDto(BaseModel):
+    # False when the businesses are provably not connected (bounds are then left out),
+    # True when a landmark reaches both, None when the landmarks can not tell
+    connected: Optional[bool] = None
+    lower_bound: Optional[int] = None
+    # None when no landmark reaches both businesses
+    upper_bound: Optional[int] = None
+    snapshot_version: int
+
+class GraphSnapshotOutputDto(BaseModel):
+    version: int
+    built_at: datetime
+    business_count: int
+    relationship_count: int
@@ -0,0 +1,191 @@
+import contextlib
+import json
+import os
+import statistics
+import sys
+import time
+import logging
+import psycopg
+
+# The service's own statements are benchmarked as they are, the platform-api directory (and its AGE
+# driver) must be importable
+PLATFORM_API_DIR = os.environ.get('PLATFORM_API_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path[:0] = [os.path.join(PLATFORM_API_DIR, 'services'), os.path.join(PLATFORM_API_DIR, 'drivers', 'python')]
+from relationship_lookup import insert_business_sql, find_business_sql
+
+# Configuration
+DATABASE_DSN = os.environ.get(
+    'DATABASE_DSN',
+    f"host={os.environ.get('DATABASE_HOST', 'localhost')} port={os.environ.get('DATABASE_PORT', '5432')} "
+    f"dbname={os.environ.get('DATABASE_NAME', 'platform_api_db')} user={os.environ.get('DATABASE_USER', 'demo')} "
+    f"password={os.environ.get('DATABASE_PASSWORD', 'password')}"
+)
+GRAPH_NAME = os.environ.get('DATABASE_GRAPH', 'business_graph')
+ITERATIONS = int(os.environ.get('ITERATIONS', '1000'))
+SAMPLE_SIZE = int(os.environ.get('SAMPLE_SIZE', '100'))
+
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s', handlers=[logging.StreamHandler(sys.stdout)])
+logger = logging.getLogger(__name__)
+
+NAME_SQL = """ag_catalog.agtype_access_operator(properties, '"name"'::ag_catalog.agtype)::text"""
+CATEGORY_SQL = """ag_catalog.agtype_access_operator(properties, '"category"'::ag_catalog.agtype)::text"""
+
+
+# Each query comes in two flavours: the values inlined in the query text (how the service used
+# to build them), and the parameterized statement the service now prepares once per connection
+def get_by_id_inline(business):
+    return f"""SELECT id, properties FROM {GRAPH_NAME}."Business" WHERE id = '{business['id']}'""", None
+
+def get_by_id_prepared(business):
+    return f"""SELECT id, properties FROM {GRAPH_NAME}."Business" WHERE id = %s::graphid""", [business['id']]
+
+def fuzzy_lookup_inline(business):
+    return f"""
+        SELECT id, properties FROM {GRAPH_NAME}."Business" WHERE
+        ({NAME_SQL} % '{business['name']}' AND {CATEGORY_SQL} % '{business['category']}')
+        OR (similarity({NAME_SQL}, '{business['name']}') > 0.3 AND similarity({CATEGORY_SQL}, '{business['category']}') > 0.3)
+    """, None
+
+def fuzzy_lookup_prepared(business):
+    return f"""
+        SELECT id, properties FROM {GRAPH_NAME}."Business" WHERE
+        ({NAME_SQL} %% %(name)s AND {CATEGORY_SQL} %% %(category)s)
+        OR (similarity({NAME_SQL}, %(name)s) > 0.3 AND similarity({CATEGORY_SQL}, %(category)s) > 0.3)
+    """, {"name": business['name'], "category": business['category']}
+
+def relationship_lookup_inline(business):
+    return f"""
+        SELECT * from cypher('{GRAPH_NAME}', $$
+            MATCH (a:Business)-[r:BusinessRelationship]->(b:Business)
+            WHERE id(a) = {business['id']} AND id(b) = {business['related_id']}
+            RETURN r
+        $$) as (relationship agtype)
+    """, None
+
+def relationship_lookup_prepared(business):
+    return f"""
+        SELECT * from cypher('{GRAPH_NAME}', $$
+            MATCH (a:Business)-[r:BusinessRelationship]->(b:Business)
+            WHERE id(a) = $source_business_id AND id(b) = $target_business_id
+            RETURN r
+        $$, %s) as (relationship agtype)
+    """, [json.dumps({"source_business_id": int(business['id']), "target_business_id": int(business['related_id'])})]
+
+def create_inline(business):
+    return f"""SELECT * from cypher('{GRAPH_NAME}', $$ CREATE (n:Business {{name: '{business['name']} copy', category: '{business['category']}'}}) RETURN n $$) as (node agtype)""", None
+
+def create_prepared(business):
+    return f"""SELECT * from cypher('{GRAPH_NAME}', $$ CREATE (n:Business {{name: $name, category: $category}}) RETURN n $$, %s) as (node agtype)""", \
+        [json.dumps({"name": f"{business['name']} copy", "category": business['category']})]
+
+# Find or create of a new business. Before the unique key index, create ran the fuzzy lookup of the
+# business and then the cypher() CREATE. Now it is the insert arbitrated by the index on the business key,
+# followed by the lookup of the existing business only when the insert returns nothing (see BusinessService._create).
+# A builder may return a list of (query, params, only if the previous statement returned no rows)
+def find_or_create_inline(business):
+    lookup, _ = fuzzy_lookup_inline({**business, "name": f"{business['name']} copy"})
+    create, _ = create_inline(business)
+    return [(lookup, None, False), (create, None, False)]
+
+def find_or_create_upsert(business):
+    params = {"name": f"{business['name']} copy", "category": business['category']}
+    return [(insert_business_sql(GRAPH_NAME), params, False), (find_business_sql(GRAPH_NAME), params, True)]
+
+def delete_inline(business):
+    return f"""
+        SELECT * from cypher('{GRAPH_NAME}', $$
+            MATCH (a:Business)-[r:BusinessRelationship]->(b:Business) WHERE id(r) = {business['relationship_id']}
+            DELETE r RETURN count(*) as deleted_count
+        $$) as (deleted_count agtype)
+    """, None
+
+def delete_prepared(business):
+    return f"""
+        SELECT * from cypher('{GRAPH_NAME}', $$
+            MATCH (a:Business)-[r:BusinessRelationship]->(b:Business) WHERE id(r) = $relationship_id
+            DELETE r RETURN count(*) as deleted_count
+        $$, %s) as (deleted_count agtype)
+    """, [json.dumps({"relationship_id": int(business['relationship_id'])})]
+
+# (name, inline, prepared, writes). The writes of every iteration are rolled back before the next one,
+# so e.g. every delete finds its relationship, however many iterations run over the samples
+QUERIES = [
+    ("get by id", get_by_id_inline, get_by_id_prepared, False),
+    ("fuzzy lookup", fuzzy_lookup_inline, fuzzy_lookup_prepared, False),
+    ("relationship lookup", relationship_lookup_inline, relationship_lookup_prepared, False),
+    ("create", create_inline, create_prepared, True),
+    ("find or create", find_or_create_inline, find_or_create_upsert, True),
+    ("delete", delete_inline, delete_prepared, True),
+]
+
+
+def load_samples(conn):
+    """Businesses with at least one outgoing relationship, used as query arguments"""
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT DISTINCT ON (b.id) b.id::text, b.properties::text, r.end_id::text, r.id::text
+            FROM {GRAPH_NAME}."Business" b JOIN {GRAPH_NAME}."BusinessRelationship" r ON r.start_id = b.id
+            LIMIT %s
+        """, [SAMPLE_SIZE])
+
+        samples = []
+        for business_id, properties, related_id, relationship_id in cursor.fetchall():
+            properties = json.loads(properties)
+            samples.append({
+                "id": business_id,
+                "name": properties['name'],
+                "category": properties['category'],
+                "related_id": related_id,
+                "relationship_id": relationship_id
+            })
+        return samples
+
+
+def percentile(latencies, percent):
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def run(conn, build_query, samples, prepare, writes):
+    latencies = []
+    # Writes are rolled back, the benchmark leaves the graph untouched
+    with conn.transaction(force_rollback=True):
+        for i in range(ITERATIONS):
+            statements = build_query(samples[i % len(samples)])
+            if isinstance(statements, tuple):
+                statements = [(*statements, False)]
+            # A savepoint per iteration for writes, not timed
+            with conn.transaction(force_rollback=True) if writes else contextlib.nullcontext():
+                start_time = time.perf_counter()
+                with conn.cursor() as cursor:
+                    rows = None
+                    for query, params, only_if_empty in statements:
+                        if only_if_empty and rows:
+                            break
+                        cursor.execute(query, params, prepare=prepare)
+                        rows = cursor.fetchall()
+                latencies.append((time.perf_counter() - start_time) * 1000)
+    return latencies
+
+
+def main():
+    with psycopg.connect(DATABASE_DSN, autocommit=True) as conn:
+        conn.execute("LOAD 'age'")
+        conn.execute("SET search_path = ag_catalog, \"$user\", public")
+
+        samples = load_samples(conn)
+        if not samples:
+            logger.error("No businesses with relationships found, load some data first (generate_data.py)")
+            return
+
+        logger.info(f"Running {ITERATIONS} iterations per query over {len(samples)} sample businesses")
+        print(f"{'query':<22}{'inline p50':>12}{'inline p99':>12}{'prepared p50':>14}{'prepared p99':>14}")
+        for name, inline, prepared, writes in QUERIES:
+            before = run(conn, inline, samples, prepare=False, writes=writes)
+            after = run(conn, prepared, samples, prepare=True, writes=writes)
+            print(f"{name:<22}{statistics.median(before):>10.3f}ms{percentile(before, 99):>10.3f}ms"
+                  f"{statistics.median(after):>12.3f}ms{percentile(after, 99):>12.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,9 @@ SKIP_BUSINESSES = os.environ.get('SKIP_BUSINESSES', 'false').lower() == 'true'
 SKIP_RELATIONSHIPS = os.environ.get('SKIP_RELATIONSHIPS', 'false').lower() == 'true'
 # Add option to save/load businesses
 BUSINESSES_FILE = os.environ.get('BUSINESSES_FILE', 'businesses.json')
+# Create relationships through POST /relationships:bulk, BULK_SIZE relationships per request
+USE_BULK_API = os.environ.get('USE_BULK_API', 'false').lower() == 'true'
+BULK_SIZE = int(os.environ.get('BULK_SIZE', '10000'))
 
 # Categories for random business generation
 CATEGORIES = [
@@ -318,6 +321,72 @@ async def create_all_relationships(businesses):
         duration = time.time() - start_time
         logger.info(f"Ran for {duration:.2f} seconds, created {total_relationships} relationships")
 
+# Create relationships for all businesses through the bulk API
+async def create_all_relationships_bulk(businesses):
+    if len(businesses) < 2:
+        logger.error("Not enough businesses available to create relationships")
+        return
+
+    logger.info(f"Starting bulk relationship creation phase for {len(businesses)} businesses")
+    logger.info(f"Each business will have up to {RELATIONSHIPS_PER_BUSINESS} relationships, {BULK_SIZE} per request")
+
+    start_time = time.time()
+    total_relationships = 0
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    async def post_bulk(session, rows):
+        async with semaphore:
+            for attempt in range(3):  # Try up to 3 times
+                try:
+                    async with session.post(f"{BASE_URL}/relationships:bulk", json=rows) as response:
+                        if response.status == 200:
+                            data = await response.json()
+                            return data['created']
+                        text = await response.text()
+                        logger.error(f"Failed to create relationships, status: {response.status}, response: {text}")
+                except Exception as e:
+                    logger.error(f"Failed to create relationships: {str(e)}")
+                await asyncio.sleep(1)  # Wait before retry
+            return 0
+
+    def generate_rows():
+        for business in businesses:
+            count = min(RELATIONSHIPS_PER_BUSINESS, len(businesses) - 1)
+            # One extra candidate in case the business picks itself
+            targets = [b for b in random.sample(businesses, count + 1) if b['id'] != business['id']][:count]
+            for target in targets:
+                yield {
+                    "sourceBusinessId": business['id'],
+                    "businessId": target['id'],
+                    "relationshipType": random.choice(RELATIONSHIP_TYPES),
+                    "transactionVolume": generate_transaction_volume()
+                }
+
+    # Bulk requests take much longer than single creates
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT * 60)
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENT_REQUESTS)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        tasks = []
+        rows = []
+        for row in generate_rows():
+            rows.append(row)
+            if len(rows) == BULK_SIZE:
+                tasks.append(asyncio.create_task(post_bulk(session, rows)))
+                rows = []
+            # Keep a bounded number of requests in flight
+            if len(tasks) >= MAX_CONCURRENT_REQUESTS * 2:
+                total_relationships += sum(await asyncio.gather(*tasks))
+                tasks = []
+                logger.info(f"Total relationships created: {total_relationships}")
+        if rows:
+            tasks.append(asyncio.create_task(post_bulk(session, rows)))
+        total_relationships += sum(await asyncio.gather(*tasks))
+
+    duration = time.time() - start_time
+    logger.info(f"Bulk relationship creation completed in {duration:.2f} seconds")
+    logger.info(f"Total relationships created: {total_relationships}")
+
 # Main execution function
 async def main():
     logger.info(f"Starting data generation with the following parameters:")
@@ -330,6 +399,7 @@ async def main():
     logger.info(f"SKIP_BUSINESSES: {SKIP_BUSINESSES}")
     logger.info(f"SKIP_RELATIONSHIPS: {SKIP_RELATIONSHIPS}")
     logger.info(f"BUSINESSES_FILE: {BUSINESSES_FILE}")
+    logger.info(f"USE_BULK_API: {USE_BULK_API}")
     
     # Check API health before starting
     is_healthy = await check_api_health()
@@ -357,7 +427,10 @@ async def main():
     
     # Phase 2: Create relationships
     if not SKIP_RELATIONSHIPS:
-        await create_all_relationships(businesses)
+        if USE_BULK_API:
+            await create_all_relationships_bulk(businesses)
+        else:
+            await create_all_relationships(businesses)
     else:
         logger.info(f"Skipping relationship creation phase")
     
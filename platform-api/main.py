@@ -1,6 +1,7 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from .routes import business, relationship  # Import your router modules
+from .routes import business, relationship, graph, jobs, metrics  # Import your router modules
+from .metrics import HTTP_REQUESTS
 
 app = FastAPI()
 
@@ -16,6 +17,14 @@ app.add_middleware(
 # Include the routers
 app.include_router(business.router)
 app.include_router(relationship.router)
+app.include_router(graph.router)
+app.include_router(jobs.router)
+app.include_router(metrics.router)
+
+@app.middleware("http")
+async def count_requests(request: Request, call_next):
+    HTTP_REQUESTS.inc()
+    return await call_next(request)
 
 @app.get("/")
 async def read_root():
@@ -1,8 +1,12 @@
 # routes/business.py
-from fastapi import APIRouter, Response, status, Query
+from fastapi import APIRouter, Request, Response, status, Query
+from fastapi.responses import StreamingResponse
+import os
 import json
-from ..services.business import BusinessService
-from ..dtos.business import CreateBusinessInputDto, CreateBusinessOutputDto, GetBusinessOutputDto, DeleteRelationshipOutputDto, CreateRelationshipInputDto, CreateRelationshipOutputDto, GetRelationshipsOutputDto, GetRelationshipOutputDto
+from typing import List, Literal, Optional
+from pydantic import ValidationError
+from ..services.business import BusinessService, RELATIONSHIPS_PAGE_SIZE
+from ..dtos.business import CreateBusinessInputDto, CreateBusinessOutputDto, BulkCreateBusinessesOutputDto, GetBusinessOutputDto, DeleteRelationshipOutputDto, CreateRelationshipInputDto, CreateRelationshipOutputDto, GetRelationshipsOutputDto, GetRelationshipOutputDto, DistanceEstimateOutputDto
 
 router = APIRouter(prefix="/businesses", tags=["businesses"])
 
@@ -33,6 +37,66 @@ async def create(input: CreateBusinessInputDto) -> CreateBusinessOutputDto | dic
         )
     return CreateBusinessOutputDto(**result)
 
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+# A bulk request is created in one transaction, and all its rows (and ids) are held in memory until it
+# commits. Larger loads are sent as several requests
+BULK_MAX_BODY_BYTES = int(os.getenv("BULK_MAX_BODY_BYTES", str(64 * 1024 * 1024)))
+
+async def read_bulk_rows(request: Request) -> List[dict]:
+    """
+    Rows of a bulk request, sent either as NDJSON (one object per line) or as a JSON array.
+    Every row is buffered (see BULK_MAX_BODY_BYTES), raises ValueError past that size.
+    """
+    if int(request.headers.get("content-length") or 0) > BULK_MAX_BODY_BYTES:
+        raise ValueError(f"Request body larger than {BULK_MAX_BODY_BYTES} bytes")
+
+    received = 0
+    ndjson = request.headers.get("content-type", "").split(";")[0].strip() in NDJSON_MEDIA_TYPES
+    rows = []
+    buffer = b""
+    async for chunk in request.stream():
+        # Chunked bodies have no content length to check up front
+        received += len(chunk)
+        if received > BULK_MAX_BODY_BYTES:
+            raise ValueError(f"Request body larger than {BULK_MAX_BODY_BYTES} bytes")
+        buffer += chunk
+        if ndjson:
+            # Decode line by line as the body streams in
+            *lines, buffer = buffer.split(b"\n")
+            rows.extend(json.loads(line) for line in lines if line.strip())
+
+    if ndjson:
+        if buffer.strip():
+            rows.append(json.loads(buffer))
+        return rows
+
+    rows = json.loads(buffer)
+    if not isinstance(rows, list):
+        raise ValueError("Expected a JSON array or NDJSON")
+    return rows
+
+def bulk_error(message: str) -> Response:
+    return Response(
+        content=json.dumps({"error": message}),
+        media_type="application/json",
+        status_code=status.HTTP_400_BAD_REQUEST
+    )
+
+@router.post(":bulk")
+async def create_bulk(request: Request) -> BulkCreateBusinessesOutputDto | dict:
+    try:
+        inputs = [CreateBusinessInputDto(**row) for row in await read_bulk_rows(request)]
+    except (ValueError, TypeError, ValidationError) as ex:
+        return bulk_error(f"Invalid businesses: {ex}")
+
+    if not inputs:
+        return bulk_error("No businesses to create")
+
+    result = await BusinessService.create_bulk(inputs)
+    if not result:
+        return bulk_error("Failed to create businesses")
+    return BulkCreateBusinessesOutputDto(**result)
+
 @router.get("/{business_id}")
 async def get(business_id: str) -> GetBusinessOutputDto | dict:
     result = await BusinessService.get(business_id)
@@ -57,9 +121,28 @@ async def create_relationship(business_id: str, input: CreateRelationshipInputDt
 
 @router.get("/{business_id}/relationships")
 async def get_relationships(
-    business_id: str
+    request: Request,
+    business_id: str,
+    limit: int = Query(RELATIONSHIPS_PAGE_SIZE, ge=1, le=10000, description="Relationships per page"),
+    cursor: Optional[str] = Query(None, pattern=r"^\d+$", description="next_cursor of the previous page"),
+    relationship_type: Optional[str] = Query(None, alias="type", description="Only relationships of this type"),
+    min_volume: Optional[int] = Query(None, alias="minVolume", description="Only relationships with at least this transaction volume")
 ) -> GetRelationshipsOutputDto | dict:
-    result = await BusinessService.get_relationships(business_id)
+    # NDJSON clients get every relationship (after the cursor), one per line as they are read
+    if request.headers.get("accept", "").split(";")[0].strip() in NDJSON_MEDIA_TYPES:
+        relationships = await BusinessService.stream_relationships(business_id, relationship_type, min_volume, cursor)
+        if relationships is None:
+            return Response(
+                content=json.dumps({"error": "Business not found"}),
+                media_type="application/json",
+                status_code=status.HTTP_404_NOT_FOUND
+            )
+        return StreamingResponse(
+            (relationship.model_dump_json() + "\n" async for relationship in relationships),
+            media_type="application/x-ndjson"
+        )
+
+    result = await BusinessService.get_relationships(business_id, limit, relationship_type, min_volume, cursor)
     if not result:
         return Response(
             content=json.dumps({"error": "No relationships found"}),
@@ -72,14 +155,33 @@ async def get_relationships(
 async def get_relationship(
     business_id: str, 
     other_business_id: str, 
-    based_on_max_transaction_volume: bool = Query(False, alias="maxTransactionVolume", description="Filter relationships by transaction volume")
+    based_on_max_transaction_volume: bool = Query(False, alias="maxTransactionVolume", description="Filter relationships by transaction volume"),
+    volume_strategy: Literal["widest", "cumulative"] = Query("cumulative", alias="volumeStrategy", description="With maxTransactionVolume, maximize the total (cumulative, the default) or the smallest (widest) transaction volume of the path")
 ) -> GetRelationshipOutputDto | dict:
-    result = await BusinessService.get_relationship(business_id, other_business_id, based_on_max_transaction_volume)
+    result = await BusinessService.get_relationship(business_id, other_business_id, based_on_max_transaction_volume, volume_strategy)
     if not result:
         return Response(
             content=json.dumps({"error": "Could not get relationship"}),
             media_type="application/json",
             status_code=status.HTTP_400_BAD_REQUEST
         )
+    # Too deep to search within the request, poll the job for the answer
+    if "job_id" in result:
+        return Response(
+            content=json.dumps({"job_id": result["job_id"], "status": result["status"]}),
+            media_type="application/json",
+            status_code=status.HTTP_202_ACCEPTED,
+            headers={"Location": f"/jobs/{result['job_id']}"}
+        )
     return GetRelationshipOutputDto(**result)
 
+@router.get("/{business_id}/distance/{other_business_id}")
+async def get_distance_estimate(business_id: str, other_business_id: str) -> DistanceEstimateOutputDto | dict:
+    result = await BusinessService.get_distance_estimate(business_id, other_business_id)
+    if not result:
+        return Response(
+            content=json.dumps({"error": "Distance estimate not available"}),
+            media_type="application/json",
+            status_code=status.HTTP_404_NOT_FOUND
+        )
+    return DistanceEstimateOutputDto(**result)
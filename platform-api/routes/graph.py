@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Response, status
+import json
+from ..services.business import BusinessService
+from ..dtos.business import GraphSnapshotOutputDto
+
+router = APIRouter(prefix="/graph", tags=["graph"])
+
+@router.get("/snapshot")
+async def get_snapshot() -> GraphSnapshotOutputDto | dict:
+    result = await BusinessService.get_graph_snapshot()
+    if not result:
+        return Response(
+            content=json.dumps({"error": "Graph snapshot not loaded"}),
+            media_type="application/json",
+            status_code=status.HTTP_404_NOT_FOUND
+        )
+    return GraphSnapshotOutputDto(**result)
+
+@router.post("/snapshot/refresh")
+async def refresh_snapshot() -> GraphSnapshotOutputDto | dict:
+    result = await BusinessService.refresh_graph_snapshot()
+    if not result:
+        return Response(
+            content=json.dumps({"error": "Could not refresh graph snapshot"}),
+            media_type="application/json",
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
+    return GraphSnapshotOutputDto(**result)
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Response, status, Query
+import json
+from ..services.business import BusinessService
+from ..dtos.business import PathSearchJobOutputDto
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+@router.get("/{job_id}")
+async def get_job(
+    job_id: int,
+    wait: float = Query(0, ge=0, le=60, description="Seconds to wait for the job to finish (long poll)")
+) -> PathSearchJobOutputDto | dict:
+    result = await BusinessService.get_path_search_job(job_id, wait)
+    if not result:
+        return Response(
+            content=json.dumps({"error": "Job not found"}),
+            media_type="application/json",
+            status_code=status.HTTP_404_NOT_FOUND
+        )
+    return PathSearchJobOutputDto(**result)
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from ..metrics import REGISTRY, HTTP_REQUESTS
+from ..db.postgres.connection import ROUND_TRIPS_SAVED
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics")
+async def get_metrics() -> dict:
+    metrics = REGISTRY.collect()
+    requests = HTTP_REQUESTS.value
+    metrics["db_round_trips_saved_per_request"] = ROUND_TRIPS_SAVED.value / requests if requests else 0.0
+    return metrics
@@ -1,11 +1,28 @@
 
-from fastapi import APIRouter, Response, status
+from fastapi import APIRouter, Request, Response, status
 import json
+from pydantic import ValidationError
 from ..services.business import BusinessService
-from ..dtos.business import DeleteRelationshipOutputDto
+from ..dtos.business import DeleteRelationshipOutputDto, BulkCreateRelationshipInputDto, BulkCreateRelationshipsOutputDto
+from .business import read_bulk_rows, bulk_error
 
 router = APIRouter(prefix="/relationships", tags=["relationships"])
 
+@router.post(":bulk")
+async def create_bulk(request: Request) -> BulkCreateRelationshipsOutputDto | dict:
+    try:
+        inputs = [BulkCreateRelationshipInputDto(**row) for row in await read_bulk_rows(request)]
+    except (ValueError, TypeError, ValidationError) as ex:
+        return bulk_error(f"Invalid relationships: {ex}")
+
+    if not inputs:
+        return bulk_error("No relationships to create")
+
+    result = await BusinessService.create_relationships_bulk(inputs)
+    if not result:
+        return bulk_error("Failed to create relationships")
+    return BulkCreateRelationshipsOutputDto(**result)
+
 @router.delete("/{relationship_id}")
 async def delete_relationship(relationship_id: str) -> DeleteRelationshipOutputDto | dict:
     result = await BusinessService.delete_relationship(relationship_id)
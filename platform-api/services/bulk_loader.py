@@ -0,0 +1,211 @@
+import json
+from typing import Dict, List, Optional
+from .relationship_lookup import BUSINESS_KEY, business_key, lock_business_keys_sql
+
+# Rows matched or created per statement, keeps temporary tables and COPY buffers bounded
+BULK_BATCH_SIZE = 10000
+
+
+class BusinessBulkLoader:
+    """
+    Set-based ingestion into the label tables.
+
+    Rows are staged with COPY into a temporary table and resolved against the graph with
+    a handful of statements per batch, instead of one lookup and one cypher() CREATE per row.
+    Businesses are upserted from the staging table on their unique key, new relationships are
+    written with COPY straight into the label table, using graphids allocated from the label's
+    own sequence.
+    """
+
+    def __init__(self, graph_name: str, batch_size: int = BULK_BATCH_SIZE):
+        self._graph_name = graph_name
+        self._batch_size = batch_size
+
+    async def create_businesses(self, conn, businesses: List[tuple[str, str]], keyed: bool = True) -> tuple[List[str], int]:
+        """
+        Find or create every (name, category), with the semantics of BusinessService.create:
+        a business with the same normalized key (BUSINESS_KEY) resolves to the existing id.
+        Rows repeated in the input resolve to the same business. Unless `keyed` (the unique key
+        index is valid), creates are serialized by the same lock as single creates.
+        Returns the ids in input order and the number of businesses created.
+        """
+        # In-batch dedupe, first occurrence wins
+        positions: Dict[tuple[str, str], int] = {}
+        unique = []
+        for business in businesses:
+            if business not in positions:
+                positions[business] = len(unique)
+                unique.append(business)
+
+        ids: List[str] = []
+        created = 0
+        for start in range(0, len(unique), self._batch_size):
+            batch_ids, batch_created = await self._create_batch(conn, unique[start:start + self._batch_size], keyed)
+            ids.extend(batch_ids)
+            created += batch_created
+
+        return [ids[positions[business]] for business in businesses], created
+
+    async def _create_batch(self, conn, businesses: List[tuple[str, str]], keyed: bool = True) -> tuple[List[str], int]:
+        graph_name = self._graph_name
+
+        async with conn.cursor() as cursor:
+            await cursor.execute("CREATE TEMPORARY TABLE IF NOT EXISTS bulk_businesses (ord int, properties ag_catalog.agtype) ON COMMIT DROP")
+            await cursor.execute("TRUNCATE bulk_businesses")
+            async with cursor.copy("COPY bulk_businesses (ord, properties) FROM STDIN") as copy:
+                for ord, (name, category) in enumerate(businesses):
+                    await copy.write_row((ord, json.dumps({"name": name, "category": category})))
+
+            # One upsert for the whole batch, arbitrated by the same unique key index as single creates.
+            # Rows differing only in case share a key, DISTINCT ON keeps the first one (an INSERT can
+            # not touch the same row twice). WHERE false locks the existing rows without writing a new
+            # version of them (or notifying a change), only the inserted ones are returned.
+            if keyed:
+                await cursor.execute(
+                    f"""
+                    INSERT INTO {graph_name}.\"Business\" (properties)
+                    SELECT DISTINCT ON ({BUSINESS_KEY}) properties FROM bulk_businesses
+                    ORDER BY {BUSINESS_KEY}, ord
+                    ON CONFLICT ({BUSINESS_KEY}) DO UPDATE SET properties = {graph_name}.\"Business\".properties WHERE false
+                    RETURNING id
+                    """
+                )
+            else:
+                # Without the index, only the keys missing once the lock is held are inserted
+                await cursor.execute(lock_business_keys_sql(graph_name))
+                await cursor.execute(
+                    f"""
+                    INSERT INTO {graph_name}.\"Business\" (properties)
+                    SELECT DISTINCT ON ({business_key("staged.properties")}) staged.properties FROM bulk_businesses staged
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM {graph_name}.\"Business\" business
+                        WHERE ({business_key("business.properties")}) = ({business_key("staged.properties")})
+                    )
+                    ORDER BY {business_key("staged.properties")}, staged.ord
+                    RETURNING id
+                    """
+                )
+            created = len(await cursor.fetchall())
+
+            # A statement of its own, which sees the existing rows committed by others, and every staged
+            # row joined back to its key's id (the oldest one, like single creates, when keys are not unique yet)
+            await cursor.execute(
+                f"""
+                SELECT DISTINCT ON (staged.ord) staged.ord, business.id::text
+                FROM bulk_businesses staged
+                JOIN {graph_name}.\"Business\" business ON ({business_key("business.properties")}) = ({business_key("staged.properties")})
+                ORDER BY staged.ord, business.id
+                """
+            )
+            ids: List[str | None] = [None] * len(businesses)
+            for ord, business_id in await cursor.fetchall():
+                ids[ord] = business_id
+
+        return ids, created
+
+    async def create_relationships(self, conn, relationships: List[tuple[str, str, str, int]]) -> tuple[List[Optional[str]], int]:
+        """
+        Find or create every (source id, target id, type, transaction volume), with the semantics of
+        BusinessService.create_relationship: an existing relationship of the same type between the same
+        businesses resolves to its id, and rows whose businesses do not exist resolve to None.
+        Rows repeated in the input (same source, target and type) resolve to the same relationship.
+        Returns the ids in input order and the number of relationships created.
+        """
+        unique = {}
+        for relationship in relationships:
+            unique.setdefault(relationship[:3], relationship)
+
+        # Batches lock their source businesses in turn, and keep them locked until the transaction ends.
+        # Sorted by source id, every batch locks ids above the ones already held, the same order as
+        # any other bulk request, so that requests sharing businesses can not deadlock
+        unique = sorted(unique.values(), key=lambda relationship: self._lock_order(relationship[0]))
+        positions: Dict[tuple[str, str, str], int] = {relationship[:3]: position for position, relationship in enumerate(unique)}
+
+        ids: List[Optional[str]] = []
+        created = 0
+        for start in range(0, len(unique), self._batch_size):
+            batch_ids, batch_created = await self._create_relationship_batch(conn, unique[start:start + self._batch_size])
+            ids.extend(batch_ids)
+            created += batch_created
+
+        return [ids[positions[relationship[:3]]] for relationship in relationships], created
+
+    async def _create_relationship_batch(self, conn, relationships: List[tuple[str, str, str, int]]) -> tuple[List[Optional[str]], int]:
+        graph_name = self._graph_name
+        ids: List[Optional[str]] = [None] * len(relationships)
+
+        async with conn.cursor() as cursor:
+            await cursor.execute("CREATE TEMPORARY TABLE IF NOT EXISTS bulk_relationships (ord int, source graphid, target graphid, type text) ON COMMIT DROP")
+            await cursor.execute("TRUNCATE bulk_relationships")
+            async with cursor.copy("COPY bulk_relationships (ord, source, target, type) FROM STDIN") as copy:
+                for ord, (source, target, relationship_type, _) in enumerate(relationships):
+                    # Anything but a graphid can not match a business, and would fail the COPY
+                    if source.isdigit() and target.isdigit():
+                        await copy.write_row((ord, source, target, relationship_type))
+
+            # Source businesses stay locked until the transaction ends, taken in id order within the batch
+            # (and across batches, see create_relationships). This serializes with other bulk requests and
+            # with single relationship creates, which lock their source business the same way.
+            await cursor.execute(
+                f"""
+                SELECT source.id FROM {graph_name}.\"Business\" source
+                WHERE source.id IN (SELECT staged.source FROM bulk_relationships staged)
+                ORDER BY source.id
+                FOR UPDATE
+                """
+            )
+
+            # A statement of its own, run once the locks are held: its snapshot sees the relationships
+            # committed by whoever held them before. Rows whose businesses both exist, with the id of the
+            # matching relationship if there is one.
+            await cursor.execute(
+                f"""
+                SELECT staged.ord, existing.id
+                FROM bulk_relationships staged
+                JOIN {graph_name}.\"Business\" source ON source.id = staged.source
+                JOIN {graph_name}.\"Business\" target ON target.id = staged.target
+                LEFT JOIN LATERAL (
+                    SELECT relationship.id FROM {graph_name}.\"BusinessRelationship\" relationship
+                    WHERE relationship.start_id = staged.source AND relationship.end_id = staged.target
+                    AND ag_catalog.agtype_access_operator(relationship.properties, '"type"'::ag_catalog.agtype)::text = '"' || staged.type || '"'
+                    LIMIT 1
+                ) existing ON true
+                """
+            )
+            missing = []
+            for ord, relationship_id in await cursor.fetchall():
+                if relationship_id is None:
+                    missing.append(ord)
+                else:
+                    ids[ord] = str(relationship_id)
+
+            if not missing:
+                return ids, 0
+
+            new_ids = await self._allocate_ids(cursor, "BusinessRelationship", len(missing))
+            async with cursor.copy(f"""COPY {graph_name}.\"BusinessRelationship\" (id, start_id, end_id, properties) FROM STDIN""") as copy:
+                for ord, relationship_id in zip(missing, new_ids):
+                    source, target, relationship_type, transaction_volume = relationships[ord]
+                    await copy.write_row((relationship_id, source, target, json.dumps({"type": relationship_type, "transaction_volume": transaction_volume})))
+                    ids[ord] = relationship_id
+
+        return ids, len(missing)
+
+    @staticmethod
+    def _lock_order(business_id: str) -> tuple[int, str]:
+        """Sort key of graphids in id order, anything else (never locked) goes last"""
+        return (int(business_id), "") if business_id.isdigit() else (1 << 63, business_id)
+
+    async def _allocate_ids(self, cursor, label: str, count: int) -> List[str]:
+        """Server assigned graphids, from the same sequence the label table's id default uses"""
+        await cursor.execute(
+            """
+            SELECT ag_catalog._graphid(label.id, nextval(format('%%I.%%I', graph.name, label.seq_name)::regclass))::text
+            FROM ag_catalog.ag_label label
+            JOIN ag_catalog.ag_graph graph ON graph.graphid = label.graph
+            CROSS JOIN generate_series(1, %s)
+            WHERE graph.name = %s AND label.name = %s
+            """,
+            [count, self._graph_name, label]
+        )
+        return [row[0] for row in await cursor.fetchall()]
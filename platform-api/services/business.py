@@ -1,16 +1,52 @@
 import asyncio
+import contextvars
 import os
 import json
 import logging
 from ..db.postgres.connection import DatabaseConnectionManager
-from ..dtos.business import CreateBusinessInputDto, CreateBusinessOutputDto, GetBusinessOutputDto, CreateRelationshipInputDto, CreateRelationshipOutputDto, GetRelationshipsOutputDto, RelationshipDto, DeleteRelationshipOutputDto, GetRelationshipOutputDto
-from typing import List
+from ..metrics import REGISTRY
+from ..dtos.business import CreateBusinessInputDto, CreateBusinessOutputDto, BulkCreateBusinessesOutputDto, GetBusinessOutputDto, CreateRelationshipInputDto, CreateRelationshipOutputDto, BulkCreateRelationshipInputDto, BulkCreateRelationshipsOutputDto, GetRelationshipsOutputDto, RelationshipDto, DeleteRelationshipOutputDto, GetRelationshipOutputDto, PathSearchJobOutputDto, DistanceEstimateOutputDto, GraphSnapshotOutputDto
+from .path_finder import BidirectionalPathFinder, TransactionVolumePathFinder, SearchBudgetExceeded
+from .graph_snapshot import GraphSnapshotManager, SNAPSHOT_ENABLED
+from .landmarks import NOT_CONNECTED
+from .path_jobs import PathSearchJobQueue, PATH_JOB_MAX_HOPS, PATH_JOB_MAX_VISITED, PATH_JOB_MAX_VOLUME_HOPS, PATH_JOB_RESULT_TTL_SECONDS
+from .relationship_lookup import RelationshipLookup, BUSINESS_LABEL, RELATIONSHIP_LABEL, NEW_BUSINESS_PROPERTIES, insert_business_sql, find_business_sql, lock_business_keys_sql
+from .bulk_loader import BusinessBulkLoader
+from .cache import LookupCache, MISSING
+from .single_flight import SingleFlight
+from .component_index import ComponentIndexManager, COMPONENT_INDEX_ENABLED
+from .change_feed import ensure_change_triggers, notify_change, parse_change, change_channel
+from typing import AsyncIterator, List
+
+# Relationships per page of GET /businesses/{id}/relationships, unless the request asks for fewer
+RELATIONSHIPS_PAGE_SIZE = int(os.getenv("RELATIONSHIPS_PAGE_SIZE", "1000"))
+# How long path results are served to later requests of the same pair, 0 only shares results between concurrent requests
+PATH_RESULT_TTL_SECONDS = float(os.getenv("PATH_RESULT_TTL_SECONDS", "0"))
+
+PATHS_RULED_OUT = REGISTRY.counter("path_search_ruled_out_total", "Path queries answered without a search, the businesses being in different components")
 
 class BusinessService:
     _instance = None
     _init_lock = asyncio.Lock()
     _initialized = False
     _database_manager = None
+    _path_finder = None
+    _volume_path_finder = None
+    _deep_path_finder = None
+    _deep_volume_path_finder = None
+    _path_jobs = None
+    _deep_pairs = None
+    _graph_snapshot = None
+    _relationship_lookup = None
+    _bulk_loader = None
+    _business_cache = None
+    _relationships_cache = None
+    _edge_cache = None
+    _path_flight = None
+    _component_index = None
+    _index_task = None
+    # Whether the unique key index can arbitrate business creates, see _create
+    _business_key_ready = False
     _graph_name = os.getenv("DATABASE_GRAPH", "business_graph")
     
     async def __new__(cls):
@@ -30,7 +66,96 @@ class BusinessService:
     async def _initialize(cls):
         """Initialize the database connection"""
         cls._instance._database_manager = await DatabaseConnectionManager(cls._graph_name)
+        cls._instance._path_finder = BidirectionalPathFinder(cls._graph_name)
+        cls._instance._volume_path_finder = TransactionVolumePathFinder(cls._graph_name)
+        # Budgets of the background searches, for the queries the request budgets can not answer
+        cls._instance._deep_path_finder = BidirectionalPathFinder(cls._graph_name, max_hops=PATH_JOB_MAX_HOPS, max_visited=PATH_JOB_MAX_VISITED)
+        cls._instance._deep_volume_path_finder = TransactionVolumePathFinder(cls._graph_name, max_hops=PATH_JOB_MAX_HOPS, max_volume_hops=PATH_JOB_MAX_VOLUME_HOPS, max_visited=PATH_JOB_MAX_VISITED)
+        cls._instance._path_jobs = PathSearchJobQueue(cls._graph_name, cls._instance._database_manager, cls._instance._search_path_in_background)
+        # Pairs known to exceed the request budgets go straight to the queue
+        cls._instance._deep_pairs = LookupCache("deep_path_pairs", ttl=PATH_JOB_RESULT_TTL_SECONDS)
+        await cls._instance._path_jobs.start()
+        cls._instance._graph_snapshot = GraphSnapshotManager(cls._graph_name, cls._instance._database_manager)
+        cls._instance._relationship_lookup = RelationshipLookup(cls._graph_name)
+        cls._instance._bulk_loader = BusinessBulkLoader(cls._graph_name)
+        # Business records by id, relationship pages and direct edge lookups, tagged with their source business
+        cls._instance._business_cache = LookupCache("business")
+        cls._instance._relationships_cache = LookupCache("relationships")
+        cls._instance._edge_cache = LookupCache("relationship_edge")
+        # Concurrent requests of the same path share one search
+        cls._instance._path_flight = SingleFlight("path_search", ttl=PATH_RESULT_TTL_SECONDS)
+        # Connected components, to answer "no path" without searching. Built once the change feed
+        # listener connects, it relies on the feed for the relationships other workers create
+        if COMPONENT_INDEX_ENABLED:
+            cls._instance._component_index = ComponentIndexManager(cls._graph_name, cls._instance._database_manager)
+        # Other workers write too, their changes come in through the label table triggers
+        cls._instance._database_manager.subscribe(change_channel(cls._graph_name), cls._instance._on_change)
+        # Building the indexes of a large graph takes a while. Queries work (slower) in the meantime, and
+        # business creates are serialized by a lock until the unique key index is valid
+        try:
+            async with cls._instance._database_manager.get_connection(read_only=True) as conn:
+                cls._instance._business_key_ready = await cls._instance._relationship_lookup.business_key_ready(conn)
+        except Exception as ex:
+            logging.error(f"Could not check the business key index: {ex}")
+        cls._instance._index_task = asyncio.create_task(cls._ensure_label_indexes(), context=contextvars.Context())
+        if SNAPSHOT_ENABLED:
+            cls._instance._graph_snapshot.start()
     
+    @classmethod
+    async def _ensure_label_indexes(cls):
+        try:
+            # read_only gives an autocommit connection, which CREATE INDEX CONCURRENTLY needs
+            async with cls._instance._database_manager.get_connection(read_only=True) as conn:
+                await cls._instance._relationship_lookup.ensure_indexes(conn)
+                # Still False when existing businesses share a key, until they are merged
+                cls._instance._business_key_ready = await cls._instance._relationship_lookup.business_key_ready(conn)
+                await ensure_change_triggers(conn, cls._graph_name)
+        except Exception as ex:
+            logging.error(f"Could not create the label indexes: {ex}")
+
+    def _on_change(self, payload: str | None):
+        """Drop the cache entries a write (of any worker) affected, see change_feed"""
+        if payload is None:
+            # The listener (re)connected, changes may have been missed
+            self._business_cache.clear()
+            self._relationships_cache.clear()
+            self._edge_cache.clear()
+            self._path_flight.clear()
+            self._graph_snapshot.mark_dirty()
+            if self._component_index:
+                self._component_index.mark_stale()
+            return
+
+        change = parse_change(payload)
+        label, ids = change["label"], change["ids"]
+        if label == RELATIONSHIP_LABEL:
+            self._graph_snapshot.mark_dirty()
+        if label == RELATIONSHIP_LABEL and self._component_index:
+            if change["op"] == "INSERT":
+                if change["edges_log"] is not None:
+                    self._component_index.add_logged_relationships(change["edges_log"])
+                elif change["edges"] is None:
+                    self._component_index.mark_stale()
+                else:
+                    self._component_index.add_relationships(change["edges"])
+            elif change["op"] == "DELETE":
+                self._component_index.relationships_deleted()
+
+        if label == BUSINESS_LABEL:
+            if ids is None:
+                self._business_cache.clear()
+            else:
+                for business_id in ids:
+                    self._business_cache.invalidate(business_id)
+        elif label == RELATIONSHIP_LABEL:
+            if ids is None:
+                self._relationships_cache.clear()
+                self._edge_cache.clear()
+                self._path_flight.clear()
+            else:
+                for source_business_id in ids:
+                    self._invalidate_relationships(source_business_id)
+
     @classmethod
     async def get(cls, business_id: str) -> GetBusinessOutputDto | None:
         service = await cls()
@@ -40,19 +165,42 @@ class BusinessService:
 
         return result
 
+    @staticmethod
+    def _cypher_params(**params) -> str:
+        """
+        agtype map for the params argument of cypher(), referenced as $name in the query.
+        Keeping values out of the query text lets each statement be prepared once per connection.
+        """
+        return json.dumps(params)
+
     async def _get_by_id(self, business_id: str) -> dict | None:
         if not business_id:
             return None
-        
-        async with self._database_manager.get_connection() as conn:
+
+        business = self._business_cache.get(business_id)
+        if business is not MISSING:
+            return business
+
+        version = self._business_cache.version
+        business = await self._get_by_id_from_database(business_id)
+        # Unknown ids are not cached, they may be created any time
+        if business:
+            self._business_cache.set(business_id, business, version)
+
+        return business
+
+    async def _get_by_id_from_database(self, business_id: str) -> dict | None:
+        async with self._database_manager.get_connection(read_only=True) as conn:
             graph_name = self._graph_name
 
             try:
                 async with conn.cursor() as cursor:
                     await cursor.execute(
                         f"""
-                        SELECT * FROM {graph_name}.\"Business\" WHERE id = '{business_id}'
-                        """
+                        SELECT id, properties FROM {graph_name}.\"Business\" WHERE id = %s::graphid
+                        """,
+                        [business_id],
+                        prepare=True
                     )
 
                     result = await cursor.fetchall()
@@ -61,7 +209,7 @@ class BusinessService:
                         return None
                     
                     businessId = result[0][0]
-                    businessDetails = json.loads(result[0][1])
+                    businessDetails = result[0][1]
 
                     return {    
                         "id": businessId,
@@ -87,19 +235,23 @@ class BusinessService:
         if not name or not category:
             return None
         
-        async with self._database_manager.get_connection() as conn:
+        async with self._database_manager.get_connection(read_only=True) as conn:
             graph_name = self._graph_name
             
             async with conn.cursor() as cursor:
+                # %% is the pg_trgm similarity operator, escaped for the query parameters
                 await cursor.execute(
                     f"""
-                    SELECT * FROM {graph_name}.\"Business\" WHERE 
-                    (ag_catalog.agtype_access_operator(properties, '"name"'::ag_catalog.agtype)::text % '{name}' AND
-                    ag_catalog.agtype_access_operator(properties, '"category"'::ag_catalog.agtype)::text % '{category}')
+                    SELECT id, properties FROM {graph_name}.\"Business\" WHERE 
+                    (ag_catalog.agtype_access_operator(properties, '"name"'::ag_catalog.agtype)::text %% %(name)s AND
+                    ag_catalog.agtype_access_operator(properties, '"category"'::ag_catalog.agtype)::text %% %(category)s)
                     OR 
-                    (similarity(ag_catalog.agtype_access_operator(properties, '"name"'::ag_catalog.agtype)::text, '{name}') > 0.3 AND
-                    similarity(ag_catalog.agtype_access_operator(properties, '"category"'::ag_catalog.agtype)::text, '{category}') > 0.3);
-                    """)
+                    (similarity(ag_catalog.agtype_access_operator(properties, '"name"'::ag_catalog.agtype)::text, %(name)s) > 0.3 AND
+                    similarity(ag_catalog.agtype_access_operator(properties, '"category"'::ag_catalog.agtype)::text, %(category)s) > 0.3);
+                    """,
+                    {"name": name, "category": category},
+                    prepare=True
+                )
 
                 result = await cursor.fetchall()
                 
@@ -107,7 +259,7 @@ class BusinessService:
                 if not result or len(result) == 0:
                     return None
                 
-                entity = json.loads(result[0][1])
+                entity = result[0][1]
 
                 return {
                     "id": str(result[0][0]),
@@ -115,46 +267,78 @@ class BusinessService:
                     "category": entity["category"]
                 }
     
-    async def _create(self, name: str, category: str) -> dict | None:
+    async def _create(self, name: str, category: str) -> str | None:
+        """
+        Insert the business, or return the id of the business with the same normalized
+        (name, category) key. The unique key index settles concurrent creates. Until it is
+        valid (see _ensure_label_indexes) they are serialized by a lock instead.
+        """
         async with self._database_manager.get_connection() as conn:
             graph_name = self._graph_name
+            params = {"name": name, "category": category}
             
             async with conn.cursor() as cursor:
                 try:
-                    await cursor.execute(f"SELECT * from cypher('{graph_name}', $$ CREATE (n:Business {{name: '{name}', category: '{category}'}}) RETURN n $$) as (node agtype);")
-
-                    # Fetch the result
-                    result = await cursor.fetchall()
-
-                    # Get the string from the nested structure
-                    data = json.loads(result[0][0].split('::vertex')[0])
+                    if self._business_key_ready:
+                        await cursor.execute(insert_business_sql(graph_name), params, prepare=True)
+                        result = await cursor.fetchone()
+                        if result is None:
+                            # The existing row is committed, visible to this new statement
+                            await cursor.execute(find_business_sql(graph_name), params, prepare=True)
+                            result = await cursor.fetchone()
+                    else:
+                        await cursor.execute(lock_business_keys_sql(graph_name))
+                        await cursor.execute(find_business_sql(graph_name), params, prepare=True)
+                        result = await cursor.fetchone()
+                        if result is None:
+                            await cursor.execute(
+                                f"""INSERT INTO {graph_name}.\"Business\" (properties) VALUES ({NEW_BUSINESS_PROPERTIES}) RETURNING id""",
+                                params,
+                                prepare=True
+                            )
+                            result = await cursor.fetchone()
+
+                    if result is None:
+                        # Deleted in between
+                        return None
 
-                    return data
-                
                 except Exception as ex:
                     logging.error(type(ex), ex)
                     # if exception occurs, rollback the transaction
                     await conn.rollback()
                     return None
+
+        business_id = str(result[0])
+        # After the commit, see _invalidate_relationships
+        self._business_cache.invalidate(business_id)
+        return business_id
             
     @classmethod
     async def create(cls, input: CreateBusinessInputDto) -> CreateBusinessOutputDto | None:
         service = await cls()
-        async with service._database_manager.get_connection() as conn:
-            
-            async with conn.cursor() as cursor:
-                # Check if the business already exists
-                business = await service._get_by_name_and_category(input.name, input.category)
+        # Businesses are matched on their exact (case insensitive) name and category,
+        # similar names are distinct businesses
+        business_id = await service._create(input.name, input.category)
+        if not business_id:
+            return None
 
-                if business:
-                    return {"id":str(business["id"])}
-                
-                # Create the business if it doesn't exist
-                data = await service._create(input.name, input.category)
-                if not data:
-                    return None
+        return {"id":business_id}
+
+    @classmethod
+    async def create_bulk(cls, inputs: List[CreateBusinessInputDto]) -> BulkCreateBusinessesOutputDto | None:
+        service = await cls()
+        try:
+            # All or nothing, the whole batch is one transaction
+            async with service._database_manager.unit_of_work() as conn:
+                ids, created = await service._bulk_loader.create_businesses(conn, [(input.name, input.category) for input in inputs], service._business_key_ready)
+        except Exception as ex:
+            logging.error(type(ex), ex)
+            return None
+
+        for business_id in set(ids):
+            service._business_cache.invalidate(business_id)
 
-                return {"id":str(data["id"])}
+        return {"ids": ids, "created": created}
     
 
     async def _create_relationship(self, source_business_id: str, target_business_id: str, relationship_type: str, transaction_volume: int) -> dict | None:
@@ -166,274 +350,464 @@ class BusinessService:
                     await cursor.execute(f"""
                         SELECT * from cypher('{graph_name}', $$
                             MATCH (a:Business), (b:Business) 
-                            WHERE id(a) = {source_business_id} AND id(b) = {target_business_id}
+                            WHERE id(a) = $source_business_id AND id(b) = $target_business_id
                             CREATE (a)-[r:BusinessRelationship {{
-                                type: '{relationship_type}',
-                                transaction_volume: {transaction_volume}
+                                type: $relationship_type,
+                                transaction_volume: $transaction_volume
                             }}]->(b)
                             RETURN a, r, b
-                        $$) as (source agtype, relationship agtype, target agtype);
-                    """)
+                        $$, %s) as (source agtype, relationship agtype, target agtype);
+                    """,
+                    [self._cypher_params(
+                        source_business_id=int(source_business_id),
+                        target_business_id=int(target_business_id),
+                        relationship_type=relationship_type,
+                        transaction_volume=transaction_volume
+                    )],
+                    prepare=True)
 
                     result = await cursor.fetchall()
 
                     if not result or len(result) == 0:
                         return None
 
-                    # Get the second element (edge) from the first tuple in results
-                    edge_data_str = result[0][1]
-                    
-                    # The data is a string in AGE format like: {"id": 1970324836974593, ...}::edge
-                    # Extract the JSON part by removing the ::edge suffix
-                    edge_data_str = edge_data_str.split('::edge')[0]
-                    
-                    # Parse the JSON
-                    return json.loads(edge_data_str)
+                    # Get the second element (Edge) from the first tuple in results
+                    return result[0][1]
 
                 except Exception as ex:
                     logging.error(type(ex), ex)
                     return None
     
     async def _get_relationship(self, source_business_id: str, target_business_id: str, relationship_type: str | None = None) -> dict | None:
-        async with self._database_manager.get_connection() as conn:
-            graph_name = self._graph_name
-
+        key = (source_business_id, target_business_id, relationship_type)
+        # "No direct relationship" is cached too, path queries ask for it first
+        relationship = self._edge_cache.get(key)
+        if relationship is not MISSING:
+            return relationship
+
+        version = self._edge_cache.version
+        async with self._database_manager.get_connection(read_only=True) as conn:
+            # Point lookup straight from the edge table
+            relationship = await self._relationship_lookup.get(conn, source_business_id, target_business_id, relationship_type)
+
+        self._edge_cache.set(key, relationship, version, tags=(source_business_id,))
+        return relationship
+
+    def _invalidate_relationships(self, source_business_id: str):
+        """
+        Drop the cached relationship pages and direct edge lookups of a business.
+        Writers call this after their transaction committed: a read between an earlier
+        invalidation and the commit would see, and cache, the old state.
+        """
+        self._relationships_cache.invalidate_tag(source_business_id)
+        self._edge_cache.invalidate_tag(source_business_id)
+        # Any path may go through the changed relationships
+        self._path_flight.clear()
+
+    async def _lock_relationship_endpoints(self, conn, source_business_id: str, target_business_id: str, relationship_type: str) -> tuple | None:
+        """
+        Check that both businesses exist, locking the source business row until the transaction ends,
+        then look for an existing relationship of the given type between them. The lookup is a statement
+        of its own, run once the lock is held: its snapshot sees what a concurrent create of the same
+        relationship committed, so such creates run one after the other and only the first one inserts.
+        Returns (source id, target id, existing relationship id or None), or None if a business is missing.
+        """
+        graph_name = self._graph_name
+
+        try:
             async with conn.cursor() as cursor:
-                await cursor.execute(f"""
-                    SELECT * from cypher('{graph_name}', $$
-                        MATCH (a:Business)-[r:BusinessRelationship]->(b:Business)
-                        WHERE id(a) = {source_business_id} AND id(b) = {target_business_id}
-                        {f"AND r.type = '{relationship_type}'" if relationship_type else ""}
-                        RETURN r
-                    $$) as (relationship agtype);
-                """)
-
-                result = await cursor.fetchall()
-
-                if not result or len(result) == 0:
+                await cursor.execute(
+                    f"""
+                    SELECT source.id, target.id
+                    FROM {graph_name}.\"Business\" source
+                    JOIN {graph_name}.\"Business\" target ON target.id = %(target)s::graphid
+                    WHERE source.id = %(source)s::graphid
+                    FOR UPDATE OF source
+                    """,
+                    {"source": source_business_id, "target": target_business_id}
+                )
+                row = await cursor.fetchone()
+                if not row:
                     return None
 
-                return json.loads(result[0][0].split('::edge')[0])
+                await cursor.execute(
+                    f"""
+                    SELECT relationship.id
+                    FROM {graph_name}.\"BusinessRelationship\" relationship
+                    WHERE relationship.start_id = %(source)s::graphid
+                        AND relationship.end_id = %(target)s::graphid
+                        AND ag_catalog.agtype_access_operator(relationship.properties, '"type"'::ag_catalog.agtype)::text = %(type)s
+                    LIMIT 1
+                    """,
+                    # agtype strings are compared with their quotes
+                    {"source": source_business_id, "target": target_business_id, "type": f'"{relationship_type}"'}
+                )
+                existing = await cursor.fetchone()
+
+        except Exception as ex:
+            logging.error(type(ex), ex)
+            return None
+
+        return str(row[0]), str(row[1]), None if existing is None else str(existing[0])
 
     @classmethod
     async def create_relationship(cls, business_id: str, input: CreateRelationshipInputDto) -> CreateRelationshipOutputDto | None:
         service = await cls()
 
-        source_business_id = await service._get_by_id(business_id)
-        if not source_business_id:
-            return None
+        # Lookups and creation share one connection and one transaction
+        async with service._database_manager.unit_of_work() as conn:
+            endpoints = await service._lock_relationship_endpoints(conn, business_id, input.business_id, input.relationship_type)
+            if not endpoints:
+                return None
 
-        target_business = await service._get_by_id(input.business_id)
-        if not target_business:
-            return None
-        
-        # Check if the relationship already exists
-        relationship = await service._get_relationship(source_business_id['id'], target_business['id'], input.relationship_type)
-        if relationship:
-           return {"id":str(relationship["id"])}
-        
-        relationship_type = input.relationship_type
-        transaction_volume = input.transaction_volume
+            source_business_id, target_business_id, relationship_id = endpoints
+            # Check if the relationship already exists
+            if relationship_id:
+                return {"id":relationship_id}
+            
+            relationship_type = input.relationship_type
+            transaction_volume = input.transaction_volume
 
-        result = await service._create_relationship(source_business_id['id'], target_business['id'], relationship_type, transaction_volume)
-        if not result:
-            return None
+            result = await service._create_relationship(source_business_id, target_business_id, relationship_type, transaction_volume)
+            if not result:
+                return None
 
-        return {"id":str(result["id"])}
-    
-    async def _get_relationships(self, business_id: str) -> List[RelationshipDto] | None:
-        async with self._database_manager.get_connection() as conn:
-            graph_name = self._graph_name
+            # Created through Cypher, which fires no trigger
+            await notify_change(conn, service._graph_name, RELATIONSHIP_LABEL, "INSERT", [source_business_id], [(source_business_id, target_business_id)])
 
-            async with conn.cursor() as cursor:
-                await cursor.execute(f"""
-                    SELECT * from cypher('{graph_name}', $$
-                        MATCH (a:Business)-[r:BusinessRelationship]->(b:Business)
-                        WHERE id(a) = {business_id}
-                        RETURN r.type as relationship_type, 
-                            r.transaction_volume as volume,
-                            id(b) as related_business_id,
-                            b.name as related_business_name,
-                            b.category as related_business_category
-                    $$) as (relationship_type agtype, volume agtype, related_business_id agtype, related_business_name agtype, related_business_category agtype);
-                """)
+        service._invalidate_relationships(source_business_id)
+        if service._component_index:
+            service._component_index.add_relationships([(source_business_id, target_business_id)])
+        return {"id":str(result.id)}
 
-                result = await cursor.fetchall()
+    @classmethod
+    async def create_relationships_bulk(cls, inputs: List[BulkCreateRelationshipInputDto]) -> BulkCreateRelationshipsOutputDto | None:
+        service = await cls()
+        try:
+            # All or nothing, the whole batch is one transaction
+            async with service._database_manager.unit_of_work() as conn:
+                ids, created = await service._bulk_loader.create_relationships(conn, [
+                    (input.source_business_id, input.business_id, input.relationship_type, input.transaction_volume)
+                    for input in inputs
+                ])
+        except Exception as ex:
+            logging.error(type(ex), ex)
+            return None
 
-                if not result or len(result) == 0:
-                    return None
-            
-                relationships = []
-                for row in result:
-                    relationships.append(RelationshipDto(
-                        id=str(row[2]),
-                        type=row[0].strip('"'),  # Remove the surrounding quotes
-                        transaction_volume=int(row[1]),
-                        name=row[3].strip('"'),  # Remove the surrounding quotes
-                        category=row[4].strip('"')  # Remove the surrounding quotes
-                    ))
-
-                return relationships
+        if created:
+            for source_business_id in {input.source_business_id for input in inputs}:
+                service._invalidate_relationships(source_business_id)
+            if service._component_index:
+                service._component_index.add_relationships(
+                    (input.source_business_id, input.business_id) for input, relationship_id in zip(inputs, ids) if relationship_id
+                )
+
+        return {"ids": ids, "created": created}
+    
+    @staticmethod
+    def _to_relationship_dto(row) -> RelationshipDto:
+        relationship_id, relationship, related_business_id, related_business = row
+        return RelationshipDto(
+            id=str(related_business_id),
+            relationship_id=str(relationship_id),
+            type=relationship["type"],
+            transaction_volume=int(relationship["transaction_volume"]),
+            name=related_business["name"],
+            category=related_business["category"]
+        )
+
+    async def _get_relationships(self, business_id: str, limit: int, relationship_type: str | None = None, min_volume: int | None = None, cursor: str | None = None) -> tuple[List[RelationshipDto], str | None] | None:
+        key = (business_id, limit, relationship_type, min_volume, cursor)
+        page = self._relationships_cache.get(key)
+        if page is not MISSING:
+            return page
+
+        version = self._relationships_cache.version
+        page = await self._get_relationships_from_database(business_id, limit, relationship_type, min_volume, cursor)
+        if page is not None:
+            self._relationships_cache.set(key, page, version, tags=(business_id,))
+
+        return page
+
+    async def _get_relationships_from_database(self, business_id: str, limit: int, relationship_type: str | None, min_volume: int | None, cursor: str | None) -> tuple[List[RelationshipDto], str | None] | None:
+        async with self._database_manager.get_connection(read_only=True) as conn:
+            try:
+                # One row more than the page tells whether there is a next page
+                rows = await self._relationship_lookup.outgoing(conn, business_id, limit + 1, relationship_type, min_volume, cursor)
+            except Exception as ex:
+                logging.error(type(ex), ex)
+                return None
+
+        relationships = [self._to_relationship_dto(row) for row in rows[:limit]]
+        next_cursor = relationships[-1].relationship_id if len(rows) > limit else None
+        return relationships, next_cursor
 
     @classmethod
-    async def get_relationships(cls, business_id: str) -> GetRelationshipsOutputDto | None:
+    async def get_relationships(cls, business_id: str, limit: int = RELATIONSHIPS_PAGE_SIZE, relationship_type: str | None = None, min_volume: int | None = None, cursor: str | None = None) -> GetRelationshipsOutputDto | None:
         service = await cls()
-        business = await service._get_by_id(business_id)
-        if not business:
-            return None
+        async with service._database_manager.unit_of_work(read_only=True):
+            business = await service._get_by_id(business_id)
+            if not business:
+                return None
 
-        relationships = await service._get_relationships(business['id'])
-        if not relationships:
-            return None
+            page = await service._get_relationships(str(business['id']), limit, relationship_type, min_volume, cursor)
+            if page is None:
+                return None
+
+            relationships, next_cursor = page
+            # An empty page past the cursor is a valid (last) page, no relationships at all is not found
+            if not relationships and not cursor:
+                return None
 
         return {
             "id": business['id'],
             "name": business['name'],
             "category": business['category'],
-            "relationships": relationships
+            "relationships": relationships,
+            "next_cursor": next_cursor
         }
-    
-    async def _delete_relationship(self, relationship_id: str) -> bool:
-        async with self._database_manager.get_connection() as conn:
-            graph_name = self._graph_name
 
-            async with conn.cursor() as cursor:
-                try:
-                    await cursor.execute(f"""
-                        SELECT * from cypher('{graph_name}', $$
-                            MATCH (a:Business)-[r:BusinessRelationship]->(b:Business)
-                            WHERE id(r) = {relationship_id}
-                            DELETE r
-                            RETURN count(*) as deleted_count
-                        $$) as (deleted_count agtype);
-                    """)
-                    result = await cursor.fetchone()
-                    deleted_count = int(result[0]) if int(result[0]) > 0 else 0
-                    return deleted_count > 0
-                except Exception as ex:
-                    logging.error(type(ex), ex)
-                    return False    
-    
-    async def _get_relationship_by_id(self, relationship_id: str) -> dict | None:
-        async with self._database_manager.get_connection() as conn:
-            graph_name = self._graph_name
+    async def _stream_relationships(self, business_id: str, relationship_type: str | None, min_volume: int | None, cursor: str | None) -> AsyncIterator[RelationshipDto]:
+        async with self._database_manager.get_connection(read_only=True) as conn:
+            # The server-side cursor needs a transaction, on this otherwise autocommit connection
+            async with conn.transaction():
+                async for row in self._relationship_lookup.stream_outgoing(conn, business_id, relationship_type, min_volume, cursor):
+                    yield self._to_relationship_dto(row)
 
-            async with conn.cursor() as cursor:
-                await cursor.execute(f"""
-                    SELECT * from cypher('{graph_name}', $$
-                        MATCH (a:Business)-[r:BusinessRelationship]->(b:Business)
-                        WHERE id(r) = {relationship_id}
-                        RETURN r, a, b
-                    $$) as (relationship agtype, source_business agtype, target_business agtype);
-                """)
+    @classmethod
+    async def stream_relationships(cls, business_id: str, relationship_type: str | None = None, min_volume: int | None = None, cursor: str | None = None) -> AsyncIterator[RelationshipDto] | None:
+        """
+        Outgoing relationships of a business as they come off a server-side cursor, None if the business does not exist.
+        The connection is held until the iterator is exhausted or closed.
+        """
+        service = await cls()
+        business = await service._get_by_id(business_id)
+        if not business:
+            return None
 
-                result = await cursor.fetchall()
+        return service._stream_relationships(str(business['id']), relationship_type, min_volume, cursor)
+    
+    async def _delete_relationship(self, relationship_id: str) -> int | None:
+        try:
+            async with self._database_manager.get_connection() as conn:
+                # Point delete straight from the edge table
+                source_business_ids = await self._relationship_lookup.delete(conn, relationship_id)
+        except Exception as ex:
+            logging.error(type(ex), ex)
+            return None
 
-                if not result or len(result) == 0:
-                    return None
+        for source_business_id in source_business_ids:
+            self._invalidate_relationships(source_business_id)
+        # Deleting may split a component
+        if source_business_ids and self._component_index:
+            self._component_index.relationships_deleted()
 
-                return json.loads(result[0][0].split('::edge')[0])
+        return len(source_business_ids)
                 
     @classmethod
     async def delete_relationship(cls, relationship_id: str) -> DeleteRelationshipOutputDto | None:
         service = await cls()
-        relationship = await service._get_relationship_by_id(relationship_id)
-        if not relationship:
+        # The DELETE doubles as the existence check, nothing is deleted for unknown ids
+        deleted_count = await service._delete_relationship(relationship_id)
+        if not deleted_count:
             return None
 
-        result = await service._delete_relationship(relationship['id'])
-        return {"done": result}
+        return {"done": True}
     
-    async def _get_indirect_relationship_shortest_path(self, source_business_id: str, target_business_id: str, based_on_max_transaction_volume: bool = False) -> dict | None:
-        async with self._database_manager.get_connection() as conn:
-            graph_name = self._graph_name
-
-            async with conn.cursor() as cursor:
-                # 1) Find all paths from source to target
-                # await cursor.execute(f"""
-                #     SELECT * from cypher('{graph_name}', $$
-                #         MATCH path = (a:Business)-[r:BusinessRelationship*1..1000000]-(b:Business)
-                #         WHERE id(a) = {source_business_id} AND id(b) = {target_business_id}
-                #         RETURN path, length(path) as path_length
-                #     $$) as (path agtype, path_length agtype)
-                #     ORDER BY path_length
-                #     LIMIT 1;
-                # """)
-
-                # TODO: We should first try this indirect search with a max of 200 hops
-                # If we don't find a path, we should push this request to a background job queue (AWS SQS)
-                # The background job should try to find a path with a max of 1,000,000 hops
+    async def _get_business_names(self, conn, business_ids: List[str]) -> List[str]:
+        graph_name = self._graph_name
+
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                f"""
+                SELECT id, properties FROM {graph_name}.\"Business\" WHERE id = ANY(%s::graphid[])
+                """,
+                [business_ids]
+            )
+
+            names = {str(row[0]): row[1]["name"] for row in await cursor.fetchall()}
+
+        return [names[business_id] for business_id in business_ids]
+
+    async def _get_indirect_relationship_shortest_path(self, source_business_id: str, target_business_id: str, based_on_max_transaction_volume: bool = False, volume_strategy: str = "cumulative", deep: bool = False, deadline: float | None = None) -> dict | None:
+        """
+        Search a path within the request budgets (PATH_SEARCH_MAX_HOPS, ...), or the background job ones if `deep`.
+        Raises SearchBudgetExceeded when the budgets run out before the search could tell, and if `deep`
+        any other error too. The snapshot search gives up past `deadline` (a time.monotonic() value).
+        """
+        path_finder = self._deep_path_finder if deep else self._path_finder
+        volume_path_finder = self._deep_volume_path_finder if deep else self._volume_path_finder
+
+        async with self._database_manager.get_connection(read_only=True) as conn:
+            try:
                 if based_on_max_transaction_volume:
-
                     # 2) Find the path with maximum transaction volume from source to target
-                    # We are are considering transaction volume here (maximum transaction volume) between the source and target
-                    # So rather than finding the shortest path (fewest hops), it's finding the path 
-                    # with the maximum cumulative transaction volume between the source and target businesses, regardless of how many hops that path contains.
-                    # From 1 to 1,000,000 hops
-                    await cursor.execute(f"""
-                        SELECT * from cypher('{graph_name}', $$
-                            MATCH path = (a:Business)-[r:BusinessRelationship*1..1000000]-(b:Business)
-                            WHERE id(a) = {source_business_id} AND id(b) = {target_business_id}
-                            UNWIND relationships(path) AS rel
-                            WITH path, length(path) AS path_length, sum(rel.transaction_volume) AS total_weight
-                            WITH path, path_length, total_weight
-                            ORDER BY total_weight DESC
-                            LIMIT 1
-                            UNWIND nodes(path) AS node
-                            RETURN collect(node.name) AS business_names, path_length, total_weight AS transaction_volume
-                        $$) as (business_names agtype, path_length agtype, transaction_volume agtype);
-                    """)
-                else:
-                    # TODO: We should first try this indirect search with a max of 200 hops
-                    # If we don't find a path, we should push this request to a background job queue (AWS SQS)
-                    # The background job should try to find a path with a max of 1,000,000 hops
-
-                    # 3) Find the shortest path from source to target (e.g., Djikstra's algorithm)
-                    # This finds all paths between source and target businesses, orders them by path length (number of hops), 
-                    # and returns the shortest one which is effectively what Dijkstra's algorithm would do when all edge weights are equal.
-                    # We are not considering transaction volume here, the weight is 1 for all relationships
-                    # From 1 to 1,000,000 hops
-                    await cursor.execute(f"""
-                        SELECT * from cypher('{graph_name}', $$
-                            MATCH path = (a:Business)-[r:BusinessRelationship*1..1000000]-(b:Business)
-                            WHERE id(a) = {source_business_id} AND id(b) = {target_business_id}
-                            WITH path
-                            ORDER BY length(path)
-                            LIMIT 1
-                            UNWIND nodes(path) AS node
-                            RETURN collect(node.name) AS business_names, length(path) AS path_length
-                        $$) as (business_names agtype, path_length agtype);
-                    """)
-
+                    # "widest" finds the path whose smallest transaction volume is the largest (a modified Dijkstra).
+                    # "cumulative" finds the path with the largest total transaction volume. Without a hop limit that is a
+                    # longest path search that never finishes, so it only considers paths of up to PATH_SEARCH_MAX_VOLUME_HOPS hops.
+                    found = await volume_path_finder.find(conn, source_business_id, target_business_id, volume_strategy)
+                    if not found:
+                        return None
 
-                result = await cursor.fetchall()
+                    path, transaction_volume = found
+                    return {
+                        "distance_in_hops": len(path) - 1,
+                        "business_names": await self._get_business_names(conn, path),
+                        "transaction_volume": transaction_volume
+                    }
 
-                if not result or len(result) == 0:
+                # 3) Find the shortest path from source to target (fewest hops, every relationship weighs 1)
+                # The search grows frontiers from both businesses (in the graph snapshot, or one batched query
+                # at a time in Postgres) and stops as soon as they meet, or when it runs out of its hop/visited budget.
+                # Prefer the in-memory snapshot, businesses created after it was built are only known to Postgres.
+                # It may miss recent changes (up to GRAPH_SNAPSHOT_MAX_STALENESS_SECONDS of them), so a path found
+                # in it is checked against the edge table, and "no path" is searched in Postgres.
+                path = None
+                snapshot = self._graph_snapshot.fresh_snapshot
+                if snapshot is not None and snapshot.contains(source_business_id, target_business_id):
+                    path = await asyncio.to_thread(snapshot.shortest_path, source_business_id, target_business_id, path_finder.max_hops, path_finder.max_visited, deadline)
+                    if path and not await self._relationship_lookup.path_exists(conn, path):
+                        path = None
+                if not path:
+                    path = await path_finder.shortest_path(conn, source_business_id, target_business_id)
+
+                if not path:
                     return None
 
                 return {
-                    "distance_in_hops": int(result[0][1]),
-                    "business_names": json.loads(result[0][0])
+                    "distance_in_hops": len(path) - 1,
+                    "business_names": await self._get_business_names(conn, path)
                 }
+            except SearchBudgetExceeded:
+                raise
+            except Exception as ex:
+                if deep:
+                    # The job is marked failed rather than recorded (and served) as having no path
+                    raise
+                logging.error(type(ex), ex)
+                return None
                 
     @classmethod
-    async def get_relationship(cls, source_business_id: str, target_business_id: str, based_on_max_transaction_volume: bool = False) -> GetRelationshipOutputDto | None:
+    async def get_relationship(cls, source_business_id: str, target_business_id: str, based_on_max_transaction_volume: bool = False, volume_strategy: str = "cumulative") -> GetRelationshipOutputDto | None:
         service = await cls()
         relationship = await service._get_relationship(source_business_id, target_business_id)
         # We found a direct relationship
         if relationship:
             return {
                 "distance_in_hops": 1,
-                "relationship_type": relationship['properties']['type'],
-                "transaction_volume": relationship['properties']['transaction_volume']
+                "relationship_type": relationship['type'],
+                "transaction_volume": relationship['transaction_volume']
             }
 
-        indirect_relationship = await service._get_indirect_relationship_shortest_path(source_business_id, target_business_id, based_on_max_transaction_volume)
+        # Businesses in different components have no path, no need to search for one
+        if service._component_index and service._component_index.connected(source_business_id, target_business_id) is False:
+            PATHS_RULED_OUT.inc()
+            return None
+
+        pair = (source_business_id, target_business_id, based_on_max_transaction_volume, volume_strategy)
+        if service._deep_pairs.get(pair) is MISSING:
+            version = service._deep_pairs.version
+            try:
+                # No unit of work around this: the search takes a connection once, for all the requests waiting on it
+                indirect_relationship = await service._path_flight.do(
+                    pair,
+                    lambda: service._get_indirect_relationship_shortest_path(source_business_id, target_business_id, based_on_max_transaction_volume, volume_strategy)
+                )
+                return cls._to_relationship_output(indirect_relationship)
+            except SearchBudgetExceeded as ex:
+                logging.warning(f"Path search between {source_business_id} and {target_business_id} gave up, queueing it: {ex}")
+                service._deep_pairs.set(pair, True, version)
+
+        # Too deep to answer within the request, the job queue takes over (or already has the answer)
+        try:
+            job = await service._path_jobs.submit(*pair)
+        except Exception as ex:
+            logging.error(type(ex), ex)
+            return None
 
+        if job["status"] == "done":
+            return job["result"]
+        return {"job_id": job["id"], "status": job["status"]}
+
+    @staticmethod
+    def _to_relationship_output(indirect_relationship: dict | None) -> GetRelationshipOutputDto | None:
         if not indirect_relationship:
             return None
 
         return {
             "distance_in_hops": indirect_relationship['distance_in_hops'],
-            "business_names": "->".join(indirect_relationship['business_names'])
+            "business_names": "->".join(indirect_relationship['business_names']),
+            "transaction_volume": indirect_relationship.get('transaction_volume')
+        }
+
+    async def _search_path_in_background(self, source_business_id: str, target_business_id: str, based_on_max_transaction_volume: bool, volume_strategy: str, deadline: float) -> GetRelationshipOutputDto | None:
+        """Run by the job queue workers, with the deep budgets, until the job's deadline"""
+        indirect_relationship = await self._get_indirect_relationship_shortest_path(source_business_id, target_business_id, based_on_max_transaction_volume, volume_strategy, deep=True, deadline=deadline)
+        return self._to_relationship_output(indirect_relationship)
+
+    @classmethod
+    async def get_path_search_job(cls, job_id: int, wait: float = 0) -> PathSearchJobOutputDto | None:
+        service = await cls()
+        try:
+            return await service._path_jobs.get(job_id, wait)
+        except Exception as ex:
+            logging.error(type(ex), ex)
+            return None
+
+    @classmethod
+    async def get_distance_estimate(cls, source_business_id: str, target_business_id: str) -> DistanceEstimateOutputDto | None:
+        """
+        Hop distance bounds from the landmarks of the graph snapshot, without touching the database.
+        The snapshot may miss up to GRAPH_SNAPSHOT_MAX_STALENESS_SECONDS of relationship changes.
+        None when there is no snapshot (with landmarks), it is staler than that, or it does not
+        know one of the businesses.
+        """
+        service = await cls()
+        snapshot = service._graph_snapshot.fresh_snapshot
+        if snapshot is None or snapshot.landmarks is None:
+            return None
+
+        source = snapshot.index_of(source_business_id)
+        target = snapshot.index_of(target_business_id)
+        if source is None or target is None:
+            return None
+
+        lower, upper = snapshot.landmarks.bounds(source, target)
+        if lower >= NOT_CONNECTED:
+            return {"connected": False, "snapshot_version": snapshot.version}
+
+        return {
+            # Without an upper bound no landmark reaches both businesses, they may still be connected
+            "connected": None if upper is None else True,
+            "lower_bound": lower,
+            "upper_bound": upper,
+            "snapshot_version": snapshot.version
         }
+
+    @classmethod
+    def _to_graph_snapshot_output(cls, snapshot) -> GraphSnapshotOutputDto | None:
+        if snapshot is None:
+            return None
+
+        return {
+            "version": snapshot.version,
+            "built_at": snapshot.built_at,
+            "business_count": snapshot.business_count,
+            "relationship_count": snapshot.relationship_count
+        }
+
+    @classmethod
+    async def get_graph_snapshot(cls) -> GraphSnapshotOutputDto | None:
+        service = await cls()
+        return cls._to_graph_snapshot_output(service._graph_snapshot.snapshot)
+
+    @classmethod
+    async def refresh_graph_snapshot(cls) -> GraphSnapshotOutputDto | None:
+        service = await cls()
+        try:
+            snapshot = await service._graph_snapshot.refresh(force=True)
+        except Exception as ex:
+            logging.error(type(ex), ex)
+            return None
+
+        return cls._to_graph_snapshot_output(snapshot)
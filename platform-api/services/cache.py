@@ -0,0 +1,105 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Set, Tuple
+from ..metrics import REGISTRY
+
+CACHE_ENABLED = os.getenv("SERVICE_CACHE_ENABLED", "true").lower() == "true"
+# Entries per cache, the least recently used ones are evicted beyond this
+CACHE_MAX_ENTRIES = int(os.getenv("SERVICE_CACHE_MAX_ENTRIES", "10000"))
+# Upper bound on the staleness of an entry, for writes this process does not see
+CACHE_TTL_SECONDS = float(os.getenv("SERVICE_CACHE_TTL_SECONDS", "60"))
+
+# Returned by get() on a miss, None is a valid cached value (e.g. "no such relationship")
+MISSING = object()
+
+
+class LookupCache:
+    """
+    Bounded in-process cache of lookup results, with LRU eviction and a TTL.
+
+    Entries can carry tags (e.g. the business a relationship list belongs to), to invalidate
+    them together. Every invalidation bumps the version of the cache: a value read from the
+    database is only stored if no invalidation happened since the read started (take `version`
+    before the read, pass it to `set` after), so a read racing a write can not cache the old state.
+
+    Only used from the event loop, it is not thread safe.
+    """
+
+    def __init__(self, name: str, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS, enabled: bool = CACHE_ENABLED):
+        self.name = name
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._enabled = enabled and max_entries > 0
+        # key -> (expires at, value, tags), least recently used first
+        self._entries: OrderedDict[Hashable, Tuple[float, Any, Tuple[Hashable, ...]]] = OrderedDict()
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self._version = 0
+        self._hits = REGISTRY.counter(f"{name}_cache_hits_total", f"Lookups answered by the {name} cache")
+        self._misses = REGISTRY.counter(f"{name}_cache_misses_total", f"Lookups the {name} cache sent to the database")
+        self._evictions = REGISTRY.counter(f"{name}_cache_evictions_total", f"Entries of the {name} cache dropped for size or age")
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self, key: Hashable) -> Any:
+        if not self._enabled:
+            return MISSING
+
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses.inc()
+            return MISSING
+
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self._evictions.inc()
+            self._misses.inc()
+            return MISSING
+
+        self._entries.move_to_end(key)
+        self._hits.inc()
+        return value
+
+    def set(self, key: Hashable, value: Any, version: int, tags: Iterable[Hashable] = ()):
+        # Something was invalidated while the value was read, it may already be stale
+        if not self._enabled or version != self._version:
+            return
+
+        tags = tuple(tags)
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + self._ttl, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+        while len(self._entries) > self._max_entries:
+            self._remove(next(iter(self._entries)))
+            self._evictions.inc()
+
+    def invalidate(self, key: Hashable):
+        self._version += 1
+        self._remove(key)
+
+    def invalidate_tag(self, tag: Hashable):
+        self._version += 1
+        for key in self._tags.pop(tag, ()):
+            self._remove(key)
+
+    def clear(self):
+        self._version += 1
+        self._entries.clear()
+        self._tags.clear()
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
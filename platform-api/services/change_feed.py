@@ -0,0 +1,153 @@
+import json
+import time
+import logging
+from typing import List
+from ..metrics import REGISTRY
+from ..db.postgres.connection import APP_SCHEMA
+from .relationship_lookup import BUSINESS_LABEL, RELATIONSHIP_LABEL
+
+# Beyond this many ids a change is published as "everything of the label changed",
+# NOTIFY payloads are limited to 8000 bytes
+MAX_NOTIFIED_IDS = 300
+# Beyond this many created relationships their endpoints go to the change log, the payload only references them
+MAX_NOTIFIED_EDGES = 100
+
+INVALIDATION_LATENCY = REGISTRY.histogram(
+    "cache_invalidation_latency_seconds",
+    "Time from a write to a label table to the invalidation of the cache entries it affects, in this worker"
+)
+
+
+def change_channel(graph_name: str) -> str:
+    """NOTIFY channel of the changes to the label tables of a graph"""
+    return f"{graph_name}_changes"
+
+
+def change_log_table(graph_name: str) -> str:
+    """Endpoints of created relationships too many for their notification, one row per statement"""
+    return f'{APP_SCHEMA}."{graph_name}_relationship_changes"'
+
+
+async def ensure_change_triggers(conn, graph_name: str):
+    """
+    Statement level triggers on the label tables, publishing what changed on the graph's change
+    channel: the ids of the businesses written, and the source business ids of the relationships
+    written (what the service caches are keyed and tagged with), along with the (start, end) ids
+    of created relationships. The payload is sent when the transaction commits, once per statement
+    whatever the number of rows (bulk COPY included). Past MAX_NOTIFIED_EDGES the created relationships
+    are written to the change log in the same transaction, and the payload carries the id of that row.
+
+    AGE writes the tuples of cypher() CREATE/DELETE without firing triggers, writers going
+    through Cypher publish their changes with notify_change.
+    """
+    channel = change_channel(graph_name)
+    change_log = change_log_table(graph_name)
+
+    async with conn.cursor() as cursor:
+        await cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {change_log} (
+                id bigserial PRIMARY KEY,
+                edges text[] NOT NULL,
+                created_at timestamptz NOT NULL DEFAULT now()
+            )
+            """
+        )
+        await cursor.execute(
+            f"""
+            CREATE OR REPLACE FUNCTION {graph_name}.notify_label_change() RETURNS trigger
+            LANGUAGE plpgsql AS $function$
+            DECLARE
+                ids text[];
+                edges text[];
+                edges_log bigint;
+            BEGIN
+                -- Only the branch of the label's kind is planned, vertex tables have no start_id
+                IF TG_ARGV[0] = 'edge' THEN
+                    SELECT array_agg(DISTINCT start_id::text) INTO ids FROM changed;
+                    IF TG_OP = 'INSERT' THEN
+                        SELECT array_agg(ARRAY[start_id::text, end_id::text]) INTO edges FROM changed;
+                        IF array_length(edges, 1) > {MAX_NOTIFIED_EDGES} THEN
+                            INSERT INTO {change_log} (edges) VALUES (edges) RETURNING id INTO edges_log;
+                        END IF;
+                    END IF;
+                ELSE
+                    SELECT array_agg(id::text) INTO ids FROM changed;
+                END IF;
+
+                IF ids IS NOT NULL THEN
+                    PERFORM pg_notify('{channel}', json_build_object(
+                        'label', TG_TABLE_NAME,
+                        'op', TG_OP,
+                        'ids', CASE WHEN cardinality(ids) <= {MAX_NOTIFIED_IDS} THEN ids END,
+                        'edges', CASE WHEN array_length(edges, 1) <= {MAX_NOTIFIED_EDGES} THEN edges END,
+                        'edges_log', edges_log,
+                        'at', extract(epoch FROM clock_timestamp())
+                    )::text);
+                END IF;
+                RETURN NULL;
+            END
+            $function$
+            """
+        )
+
+        for label, kind, prefix in ((BUSINESS_LABEL, "vertex", "business"), (RELATIONSHIP_LABEL, "edge", "business_relationship")):
+            # A trigger with transition tables fires on a single event
+            for event, transition in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+                await cursor.execute(
+                    f"""
+                    CREATE OR REPLACE TRIGGER {prefix}_{event.lower()}_notify
+                    AFTER {event} ON {graph_name}."{label}"
+                    REFERENCING {transition} TABLE AS changed
+                    FOR EACH STATEMENT EXECUTE FUNCTION {graph_name}.notify_label_change('{kind}')
+                    """
+                )
+
+    logging.info(f"Change notifications of graph '{graph_name}' are in place")
+
+
+async def notify_change(conn, graph_name: str, label: str, op: str, ids: List[str], edges: List[tuple[str, str]] | None = None):
+    """Publish a change like the triggers do, delivered when the transaction of `conn` commits"""
+    payload = {
+        "label": label,
+        "op": op,
+        "ids": ids if len(ids) <= MAX_NOTIFIED_IDS else None,
+        "edges": edges if edges is not None and len(edges) <= MAX_NOTIFIED_EDGES else None,
+        "at": time.time()
+    }
+
+    async with conn.cursor() as cursor:
+        await cursor.execute("SELECT pg_notify(%s, %s)", [change_channel(graph_name), json.dumps(payload)])
+
+
+def parse_change(payload: str) -> dict:
+    """
+    Change notification: label, op (INSERT, UPDATE or DELETE), ids (None when everything of the label
+    may have changed), edges ([start, end] of created relationships, None when left out or not applicable)
+    and edges_log (the change log row holding the left out ones, if any, see read_change_log).
+    Records the invalidation latency, the caller is expected to act on the change right away.
+    """
+    change = json.loads(payload)
+    change.setdefault("edges_log", None)
+    INVALIDATION_LATENCY.observe(max(0.0, time.time() - change["at"]))
+    return change
+
+
+async def read_change_log(conn, graph_name: str, log_id: int) -> List[tuple[str, str]] | None:
+    """Created relationships of a change log row, None once it was purged"""
+    async with conn.cursor() as cursor:
+        await cursor.execute(f"SELECT edges FROM {change_log_table(graph_name)} WHERE id = %s", [log_id], prepare=True)
+        row = await cursor.fetchone()
+
+    if row is None:
+        return None
+    return [(start_id, end_id) for start_id, end_id in row[0]]
+
+
+async def purge_change_log(conn, graph_name: str, retention_seconds: float):
+    """Drop the change log rows older than `retention_seconds`, every listener has read them by then"""
+    async with conn.cursor() as cursor:
+        await cursor.execute(
+            f"DELETE FROM {change_log_table(graph_name)} WHERE created_at < now() - make_interval(secs => %s)",
+            [retention_seconds]
+        )
@@ -0,0 +1,274 @@
+import os
+import time
+import asyncio
+import logging
+import contextvars
+import numpy as np
+from typing import Dict, Iterable, List
+from ..metrics import REGISTRY
+from .change_feed import read_change_log, purge_change_log
+
+COMPONENT_INDEX_ENABLED = os.getenv("COMPONENT_INDEX_ENABLED", "true").lower() == "true"
+# Deletes (which may split components) are batched into one rebuild at most this often
+COMPONENT_INDEX_REBUILD_DELAY_SECONDS = float(os.getenv("COMPONENT_INDEX_REBUILD_DELAY_SECONDS", "30"))
+# Rows fetched per round trip while streaming the edge table
+COMPONENT_INDEX_LOAD_BATCH_SIZE = int(os.getenv("COMPONENT_INDEX_LOAD_BATCH_SIZE", "100000"))
+# Change log rows are read within moments of their notification, older ones are purged
+CHANGE_LOG_RETENTION_SECONDS = float(os.getenv("CHANGE_LOG_RETENTION_SECONDS", "3600"))
+
+BUILD_DURATION = REGISTRY.histogram("component_index_build_seconds", "Time to load the edge table and label its connected components", buckets=[0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0])
+CHANGE_LOG_READS = REGISTRY.counter("component_index_change_log_reads_total", "Created relationships too many for their notification, read from the change log")
+
+
+class ComponentIndex:
+    """
+    Connected components of the business graph (relationships are undirected, like paths),
+    as a union-find forest over the businesses.
+
+    Businesses of the edge table the index was built from are addressed by their position in
+    the sorted `business_ids` array, their parents live in a NumPy array. Businesses first seen
+    in a relationship created afterwards get positions past the end, with their parents in a list.
+    Businesses without any relationship are not in the index at all.
+    """
+
+    def __init__(self, business_ids: np.ndarray, parents: np.ndarray):
+        self.business_ids = business_ids
+        self._parents = parents
+        self._extra_positions: Dict[int, int] = {}
+        self._extra_parents: List[int] = []
+
+    @classmethod
+    def build(cls, start_ids: np.ndarray, end_ids: np.ndarray) -> "ComponentIndex":
+        """
+        Label the components of the given edges, vectorized: every round hooks the root of the
+        larger id of each edge to the smaller root, then compresses every business to its root,
+        until no edge joins two trees.
+        """
+        business_ids = np.unique(np.concatenate([start_ids, end_ids]).astype(np.int64))
+        starts = np.searchsorted(business_ids, start_ids)
+        ends = np.searchsorted(business_ids, end_ids)
+        parents = np.arange(len(business_ids), dtype=np.int64)
+
+        while True:
+            start_roots, end_roots = parents[starts], parents[ends]
+            joining = start_roots != end_roots
+            if not joining.any():
+                break
+
+            start_roots, end_roots = start_roots[joining], end_roots[joining]
+            # Roots only ever point to smaller roots, so no cycle can form
+            np.minimum.at(parents, np.maximum(start_roots, end_roots), np.minimum(start_roots, end_roots))
+            while True:
+                grandparents = parents[parents]
+                if np.array_equal(grandparents, parents):
+                    break
+                parents = grandparents
+
+            # Only edges that joined two trees can still do so
+            starts, ends = starts[joining], ends[joining]
+
+        return cls(business_ids, parents)
+
+    def _position(self, business_id: str, add: bool = False) -> int | None:
+        try:
+            graphid = int(business_id)
+        except (TypeError, ValueError):
+            return None
+
+        position = int(np.searchsorted(self.business_ids, graphid))
+        if position < len(self.business_ids) and self.business_ids[position] == graphid:
+            return position
+
+        position = self._extra_positions.get(graphid)
+        if position is None and add:
+            position = len(self.business_ids) + len(self._extra_parents)
+            self._extra_positions[graphid] = position
+            self._extra_parents.append(position)
+        return position
+
+    def _parent(self, position: int) -> int:
+        if position < len(self.business_ids):
+            return int(self._parents[position])
+        return self._extra_parents[position - len(self.business_ids)]
+
+    def _set_parent(self, position: int, parent: int):
+        if position < len(self.business_ids):
+            self._parents[position] = parent
+        else:
+            self._extra_parents[position - len(self.business_ids)] = parent
+
+    def _find(self, position: int) -> int:
+        root = position
+        while (parent := self._parent(root)) != root:
+            root = parent
+
+        # Path compression
+        while (parent := self._parent(position)) != root:
+            self._set_parent(position, root)
+            position = parent
+
+        return root
+
+    def union(self, source_business_id: str, target_business_id: str):
+        source = self._position(source_business_id, add=True)
+        target = self._position(target_business_id, add=True)
+        if source is None or target is None:
+            return
+
+        source_root, target_root = self._find(source), self._find(target)
+        if source_root != target_root:
+            self._set_parent(max(source_root, target_root), min(source_root, target_root))
+
+    def connected(self, source_business_id: str, target_business_id: str) -> bool | None:
+        """Whether a path exists between the businesses, None if one of them is not in the index"""
+        source = self._position(source_business_id)
+        target = self._position(target_business_id)
+        if source is None or target is None:
+            return None
+
+        return self._find(source) == self._find(target)
+
+
+class ComponentIndexManager:
+    """
+    Builds the component index from the edge table and keeps it current: relationships created
+    are unioned in as they are reported (read from the change log when too many for their
+    notification), and deletes (which may split a component) schedule a rebuild.
+    Until that rebuild, the index may still consider split businesses connected, which only costs
+    a search. What must never happen is a missed union, so whenever created relationships may have
+    been missed the index is stale, and answers nothing until rebuilt. It starts out stale: the
+    first build happens once the change feed is listened to, see mark_stale.
+    """
+
+    def __init__(self, graph_name: str, database_manager, rebuild_delay: float = COMPONENT_INDEX_REBUILD_DELAY_SECONDS, batch_size: int = COMPONENT_INDEX_LOAD_BATCH_SIZE):
+        self._graph_name = graph_name
+        self._database_manager = database_manager
+        self._rebuild_delay = rebuild_delay
+        self._batch_size = batch_size
+        self._index: ComponentIndex | None = None
+        self._stale = True
+        self._stale_marks = 0
+        # Unions reported while a rebuild runs, replayed onto the new index
+        self._journal: List[tuple[str, str]] | None = None
+        self._task = None
+        self._rebuild_requested = False
+        # Change log reads in flight, the index can not tell until their unions are in
+        self._log_reads = set()
+        self._last_purge = 0.0
+
+    def connected(self, source_business_id: str, target_business_id: str) -> bool | None:
+        """Whether a path exists between the businesses, None when the index can not tell"""
+        if self._stale or self._index is None or self._log_reads:
+            return None
+        return self._index.connected(source_business_id, target_business_id)
+
+    def add_relationships(self, relationships: Iterable[tuple[str, str]]):
+        """Union the endpoints of created relationships (committed ones, or the next rebuild may miss them)"""
+        for source_business_id, target_business_id in relationships:
+            if self._index is not None:
+                self._index.union(source_business_id, target_business_id)
+            if self._journal is not None:
+                self._journal.append((source_business_id, target_business_id))
+
+    def add_logged_relationships(self, log_id: int):
+        """Union the created relationships of a change log row, see change_feed"""
+        task = asyncio.create_task(self._read_change_log(log_id), context=contextvars.Context())
+        self._log_reads.add(task)
+
+    async def _read_change_log(self, log_id: int):
+        try:
+            async with self._database_manager.get_connection(read_only=True) as conn:
+                relationships = await read_change_log(conn, self._graph_name, log_id)
+        except Exception as ex:
+            logging.error(f"Could not read change log row {log_id}: {ex}")
+            relationships = None
+
+        # Every worker purges now and then, whichever comes first does the work
+        if time.monotonic() - self._last_purge > CHANGE_LOG_RETENTION_SECONDS / 4:
+            self._last_purge = time.monotonic()
+            try:
+                async with self._database_manager.get_connection(read_only=True) as conn:
+                    await purge_change_log(conn, self._graph_name, CHANGE_LOG_RETENTION_SECONDS)
+            except Exception as ex:
+                logging.error(f"Could not purge the change log: {ex}")
+
+        try:
+            if relationships is None:
+                # Purged (or unreadable), the unions are lost
+                self.mark_stale()
+            else:
+                CHANGE_LOG_READS.inc()
+                self.add_relationships(relationships)
+        finally:
+            self._log_reads.discard(asyncio.current_task())
+
+    def relationships_deleted(self):
+        self._schedule(delay=self._rebuild_delay)
+
+    def mark_stale(self):
+        """Relationships may have been created without being reported, stop answering until rebuilt"""
+        self._stale = True
+        self._stale_marks += 1
+        self._schedule(delay=0)
+
+    def _schedule(self, delay: float):
+        if self._task is not None:
+            # The running rebuild may have loaded the edge table already, run another one after it
+            self._rebuild_requested = True
+            return
+        self._task = asyncio.create_task(self._run(delay), context=contextvars.Context())
+
+    async def _run(self, delay: float):
+        try:
+            while True:
+                await asyncio.sleep(delay)
+                self._rebuild_requested = False
+                try:
+                    await self.rebuild()
+                except Exception as ex:
+                    logging.error(f"Could not build the component index: {ex}")
+                    self._rebuild_requested = True
+
+                if not self._rebuild_requested:
+                    break
+                delay = self._rebuild_delay
+        finally:
+            self._task = None
+
+    async def rebuild(self):
+        started = time.monotonic()
+        stale_marks = self._stale_marks
+        # Relationships committed after the edge table is read are reported after this point
+        self._journal = []
+        try:
+            async with self._database_manager.get_connection() as conn:
+                start_ids, end_ids = await self._load_relationships(conn)
+
+            index = await asyncio.to_thread(ComponentIndex.build, start_ids, end_ids)
+            for source_business_id, target_business_id in self._journal:
+                index.union(source_business_id, target_business_id)
+        finally:
+            self._journal = None
+
+        self._index = index
+        if self._stale_marks == stale_marks:
+            self._stale = False
+
+        BUILD_DURATION.observe(time.monotonic() - started)
+        logging.info(f"Component index built over {len(index.business_ids)} connected businesses in {time.monotonic() - started:.2f}s")
+
+    async def _load_relationships(self, conn) -> tuple[np.ndarray, np.ndarray]:
+        graph_name = self._graph_name
+        chunks = []
+
+        async with conn.cursor(name="component_index_relationships") as cursor:
+            await cursor.execute(f"""SELECT start_id::text::bigint, end_id::text::bigint FROM {graph_name}."BusinessRelationship" """)
+            while rows := await cursor.fetchmany(self._batch_size):
+                chunks.append(np.array(rows, dtype=np.int64))
+
+        if not chunks:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+
+        edges = np.concatenate(chunks)
+        return edges[:, 0], edges[:, 1]
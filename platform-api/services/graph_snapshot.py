@@ -0,0 +1,343 @@
+import os
+import time
+import asyncio
+import logging
+import contextvars
+import numpy as np
+from datetime import datetime, timezone
+from typing import List
+from ..dtos.business import RELATIONSHIP_TYPES
+from .path_finder import DEFAULT_MAX_HOPS, DEFAULT_MAX_VISITED, SearchBudgetExceeded
+from .landmarks import LandmarkIndex, LANDMARK_COUNT, NOT_CONNECTED
+
+SNAPSHOT_ENABLED = os.getenv("GRAPH_SNAPSHOT_ENABLED", "true").lower() == "true"
+# How often we check whether the label tables changed and the snapshot has to be rebuilt
+SNAPSHOT_REFRESH_SECONDS = int(os.getenv("GRAPH_SNAPSHOT_REFRESH_SECONDS", "300"))
+# Searches use the snapshot while the relationship changes it misses are at most this old,
+# a bit more than a refresh interval plus the time the rebuild takes
+SNAPSHOT_MAX_STALENESS_SECONDS = float(os.getenv("GRAPH_SNAPSHOT_MAX_STALENESS_SECONDS", "900"))
+# Rows fetched per round trip while streaming the label tables
+SNAPSHOT_LOAD_BATCH_SIZE = int(os.getenv("GRAPH_SNAPSHOT_LOAD_BATCH_SIZE", "100000"))
+
+UNVISITED = -1
+
+
+class GraphSnapshot:
+    """
+    Read-only compressed sparse row (CSR) adjacency of the business graph.
+
+    Businesses are addressed by their position in the sorted `business_ids` array
+    (AGE graphids). The relationships of business `i` are stored at
+    `targets[offsets[i]:offsets[i + 1]]`, with `weights` holding the transaction
+    volume and `types` the index of the relationship type in `type_names`.
+    Every relationship is stored in both directions since paths ignore direction.
+    `landmarks`, when built, bounds hop distances and prunes the searches.
+    """
+
+    def __init__(self, business_ids: np.ndarray, offsets: np.ndarray, targets: np.ndarray, weights: np.ndarray, types: np.ndarray, version: int, change_marker: int):
+        self.business_ids = business_ids
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.types = types
+        self.type_names = list(RELATIONSHIP_TYPES)
+        self.version = version
+        self.change_marker = change_marker
+        self.built_at = datetime.now(timezone.utc)
+        self.landmarks: LandmarkIndex | None = None
+
+    @classmethod
+    def from_edges(cls, business_ids: np.ndarray, start_ids: np.ndarray, end_ids: np.ndarray, weights: np.ndarray, types: np.ndarray, version: int = 0, change_marker: int = 0) -> "GraphSnapshot":
+        business_ids = np.unique(business_ids.astype(np.int64))
+        count = len(business_ids)
+
+        starts = cls._positions(business_ids, start_ids)
+        ends = cls._positions(business_ids, end_ids)
+        # Relationships pointing to businesses missing from the snapshot are dropped
+        known = (starts >= 0) & (ends >= 0)
+        starts, ends, weights, types = starts[known], ends[known], weights[known], types[known]
+
+        sources = np.concatenate([starts, ends])
+        order = np.argsort(sources, kind="stable")
+
+        offsets = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=count), out=offsets[1:])
+
+        index_type = np.int32 if count < np.iinfo(np.int32).max else np.int64
+        targets = np.concatenate([ends, starts])[order].astype(index_type)
+        weights = np.concatenate([weights, weights])[order].astype(np.int64)
+        types = np.concatenate([types, types])[order].astype(np.int8)
+
+        return cls(business_ids, offsets, targets, weights, types, version, change_marker)
+
+    @staticmethod
+    def _positions(business_ids: np.ndarray, ids: np.ndarray) -> np.ndarray:
+        """Map graphids to their position in `business_ids` (-1 when unknown)"""
+        if len(business_ids) == 0:
+            return np.full(len(ids), UNVISITED, dtype=np.int64)
+
+        positions = np.searchsorted(business_ids, ids)
+        positions[positions == len(business_ids)] = 0
+        return np.where(business_ids[positions] == ids, positions, UNVISITED)
+
+    @property
+    def business_count(self) -> int:
+        return len(self.business_ids)
+
+    @property
+    def relationship_count(self) -> int:
+        # Every relationship is stored once per direction
+        return len(self.targets) // 2
+
+    def index_of(self, business_id: str) -> int | None:
+        try:
+            graphid = int(business_id)
+        except (TypeError, ValueError):
+            return None
+
+        position = int(np.searchsorted(self.business_ids, graphid))
+        if position < self.business_count and self.business_ids[position] == graphid:
+            return position
+        return None
+
+    def contains(self, *business_ids: str) -> bool:
+        return all(self.index_of(business_id) is not None for business_id in business_ids)
+
+    def neighbours(self, positions: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Return (source position, neighbour position) pairs for every relationship of `positions`"""
+        starts = self.offsets[positions]
+        counts = self.offsets[positions + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        sources = np.repeat(positions, counts)
+        # Index of every neighbour slot: start of its run plus its rank inside the run
+        run_starts = np.repeat(np.cumsum(counts) - counts, counts)
+        slots = np.repeat(starts, counts) + (np.arange(total) - run_starts)
+        return sources, self.targets[slots].astype(np.int64)
+
+    def shortest_path(self, source_business_id: str, target_business_id: str, max_hops: int = DEFAULT_MAX_HOPS, max_visited: int = DEFAULT_MAX_VISITED, deadline: float | None = None) -> List[str] | None:
+        """
+        Bidirectional BFS over the snapshot, returning the business ids on the path
+        (both endpoints included) or None if the businesses are not connected.
+        Raises TimeoutError once past `deadline` (a time.monotonic() value): it runs in a
+        thread, which cancelling the awaiting task does not stop.
+        """
+        source = self.index_of(source_business_id)
+        target = self.index_of(target_business_id)
+        if source is None or target is None:
+            return None
+        if source == target:
+            return [source_business_id]
+
+        # Only businesses that can still be on a path no longer than the upper bound are expanded:
+        # d(source, v) + lower(v, target) <= upper
+        keep_forward = keep_backward = None
+        if self.landmarks is not None:
+            lower, upper = self.landmarks.bounds(source, target)
+            if lower >= NOT_CONNECTED:
+                return None
+            if lower > max_hops:
+                raise SearchBudgetExceeded(0, 0)
+
+            upper = NOT_CONNECTED - 1 if upper is None else upper
+            keep_forward = lambda neighbours, hops: hops + self.landmarks.lower_bounds(neighbours, target) <= upper
+            keep_backward = lambda neighbours, hops: hops + self.landmarks.lower_bounds(neighbours, source) <= upper
+
+        forward = np.full(self.business_count, UNVISITED, dtype=np.int64)
+        backward = np.full(self.business_count, UNVISITED, dtype=np.int64)
+        # Roots are their own parent
+        forward[source] = source
+        backward[target] = target
+        forward_frontier = np.array([source], dtype=np.int64)
+        backward_frontier = np.array([target], dtype=np.int64)
+        visited = 2
+        hops = 0
+        forward_hops = backward_hops = 0
+
+        while len(forward_frontier) and len(backward_frontier):
+            if hops >= max_hops or visited > max_visited:
+                raise SearchBudgetExceeded(hops, visited)
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"Snapshot path search past its deadline after {hops} hops")
+
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_hops += 1
+                forward_frontier, meeting = self._expand(forward_frontier, forward, backward, keep_forward, forward_hops)
+                visited += len(forward_frontier)
+            else:
+                backward_hops += 1
+                backward_frontier, meeting = self._expand(backward_frontier, backward, forward, keep_backward, backward_hops)
+                visited += len(backward_frontier)
+            hops += 1
+
+            if meeting is not None:
+                return [str(business_id) for business_id in self.business_ids[self._build_path(meeting, forward, backward)]]
+
+        return None
+
+    def _expand(self, frontier: np.ndarray, parents: np.ndarray, other_parents: np.ndarray, keep=None, hops: int = 0) -> tuple[np.ndarray, int | None]:
+        sources, neighbours = self.neighbours(frontier)
+        fresh = parents[neighbours] == UNVISITED
+        sources, neighbours = sources[fresh], neighbours[fresh]
+        if keep is not None:
+            kept = keep(neighbours, hops)
+            sources, neighbours = sources[kept], neighbours[kept]
+
+        # Keep one parent per newly discovered business
+        neighbours, first = np.unique(neighbours, return_index=True)
+        parents[neighbours] = sources[first]
+
+        met = neighbours[other_parents[neighbours] != UNVISITED]
+        return neighbours, (int(met[0]) if len(met) else None)
+
+    @staticmethod
+    def _build_path(meeting: int, forward: np.ndarray, backward: np.ndarray) -> List[int]:
+        path = [meeting]
+        while forward[path[-1]] != path[-1]:
+            path.append(int(forward[path[-1]]))
+        path.reverse()
+
+        position = meeting
+        while backward[position] != position:
+            position = int(backward[position])
+            path.append(position)
+
+        return path
+
+
+class GraphSnapshotManager:
+    """Loads the snapshot from the label tables and keeps it fresh in the background"""
+
+    def __init__(self, graph_name: str, database_manager, refresh_seconds: int = SNAPSHOT_REFRESH_SECONDS, batch_size: int = SNAPSHOT_LOAD_BATCH_SIZE, max_staleness: float = SNAPSHOT_MAX_STALENESS_SECONDS):
+        self._graph_name = graph_name
+        self._database_manager = database_manager
+        self._refresh_seconds = refresh_seconds
+        self._batch_size = batch_size
+        self._max_staleness = max_staleness
+        self._snapshot: GraphSnapshot | None = None
+        self._refresh_lock = asyncio.Lock()
+        self._task = None
+        self._version = 0
+        # Relationship changes reported so far, and the number of them the current snapshot was built after
+        self._changes = 0
+        self._built_changes = 0
+        # Monotonic time of the oldest change the snapshot may miss
+        self._dirty_since: float | None = None
+
+    @property
+    def snapshot(self) -> GraphSnapshot | None:
+        return self._snapshot
+
+    @property
+    def dirty(self) -> bool:
+        """Relationships changed since the snapshot was built, it may miss paths or hold removed ones"""
+        return self._changes != self._built_changes
+
+    @property
+    def fresh_snapshot(self) -> GraphSnapshot | None:
+        """
+        The snapshot, or None once it misses changes older than the staleness bound (searches go to
+        Postgres until the next scheduled rebuild). Paths it finds still have to be checked, see
+        RelationshipLookup.path_exists.
+        """
+        if self._dirty_since is not None and time.monotonic() - self._dirty_since > self._max_staleness:
+            return None
+        return self._snapshot
+
+    def mark_dirty(self):
+        self._changes += 1
+        if self._dirty_since is None:
+            self._dirty_since = time.monotonic()
+
+    def start(self):
+        """Start the background refresh loop, the first load happens right away"""
+        if self._task is None:
+            # Fresh context, the loop must not inherit the unit of work of the request that started it
+            self._task = asyncio.create_task(self._run(), context=contextvars.Context())
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as ex:
+                logging.error(f"Could not refresh graph snapshot: {ex}")
+            await asyncio.sleep(self._refresh_seconds)
+
+    async def refresh(self, force: bool = False) -> GraphSnapshot | None:
+        """Rebuild the snapshot if it is dirty or the label tables changed since it was built (or if forced)"""
+        async with self._refresh_lock:
+            # Changes reported from here on may not be visible to the load, they leave the snapshot dirty
+            changes = self._changes
+            loaded_at = time.monotonic()
+            async with self._database_manager.get_connection() as conn:
+                change_marker = await self._get_change_marker(conn)
+                if not force and not self.dirty and self._snapshot is not None and self._snapshot.change_marker == change_marker:
+                    return self._snapshot
+
+                started = time.monotonic()
+                business_ids = await self._load_business_ids(conn)
+                start_ids, end_ids, weights, types = await self._load_relationships(conn)
+
+            self._version += 1
+            snapshot = await asyncio.to_thread(self._build, business_ids, start_ids, end_ids, weights, types, self._version, change_marker)
+            # Swap the reference, readers holding the previous snapshot keep using it
+            self._snapshot = snapshot
+            self._built_changes = changes
+            self._dirty_since = None if self._changes == changes else loaded_at
+            logging.info(f"Graph snapshot v{snapshot.version} built with {snapshot.business_count} businesses and {snapshot.relationship_count} relationships in {time.monotonic() - started:.2f}s")
+            return snapshot
+
+    @staticmethod
+    def _build(business_ids: np.ndarray, start_ids: np.ndarray, end_ids: np.ndarray, weights: np.ndarray, types: np.ndarray, version: int, change_marker: int) -> GraphSnapshot:
+        snapshot = GraphSnapshot.from_edges(business_ids, start_ids, end_ids, weights, types, version, change_marker)
+        if LANDMARK_COUNT > 0:
+            snapshot.landmarks = LandmarkIndex.build(snapshot, LANDMARK_COUNT)
+        return snapshot
+
+    async def _get_change_marker(self, conn) -> int:
+        """Cumulative number of rows written to the label tables, as tracked by the statistics collector"""
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                """
+                SELECT COALESCE(sum(n_tup_ins + n_tup_upd + n_tup_del), 0) FROM pg_stat_user_tables
+                WHERE schemaname = %s AND relname IN ('Business', 'BusinessRelationship')
+                """,
+                [self._graph_name]
+            )
+            return int((await cursor.fetchone())[0])
+
+    async def _load_business_ids(self, conn) -> np.ndarray:
+        graph_name = self._graph_name
+        chunks = []
+
+        async with conn.cursor(name="graph_snapshot_businesses") as cursor:
+            await cursor.execute(f"""SELECT id::text::bigint FROM {graph_name}."Business" """)
+            while rows := await cursor.fetchmany(self._batch_size):
+                chunks.append(np.array([row[0] for row in rows], dtype=np.int64))
+
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+    async def _load_relationships(self, conn) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        graph_name = self._graph_name
+        type_cases = " ".join(f"""WHEN '"{name}"' THEN {code}""" for code, name in enumerate(RELATIONSHIP_TYPES))
+        chunks = []
+
+        async with conn.cursor(name="graph_snapshot_relationships") as cursor:
+            await cursor.execute(f"""
+                SELECT start_id::text::bigint,
+                    end_id::text::bigint,
+                    COALESCE(ag_catalog.agtype_access_operator(properties, '"transaction_volume"'::ag_catalog.agtype)::text::numeric, 0)::bigint,
+                    CASE ag_catalog.agtype_access_operator(properties, '"type"'::ag_catalog.agtype)::text {type_cases} ELSE -1 END
+                FROM {graph_name}."BusinessRelationship"
+            """)
+            while rows := await cursor.fetchmany(self._batch_size):
+                chunks.append(np.array(rows, dtype=np.int64))
+
+        if not chunks:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty, empty
+
+        edges = np.concatenate(chunks)
+        return edges[:, 0], edges[:, 1], edges[:, 2], edges[:, 3]
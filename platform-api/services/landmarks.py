@@ -0,0 +1,104 @@
+import os
+import numpy as np
+
+# Number of landmarks BFS distances are kept from, each costs one BFS per snapshot build
+# and one byte (two beyond 254 hops) per business
+LANDMARK_COUNT = int(os.getenv("LANDMARK_COUNT", "16"))
+
+# Lower bound between businesses proven not to be connected
+NOT_CONNECTED = 1 << 30
+
+
+class LandmarkIndex:
+    """
+    Hop distance bounds (ALT) from BFS distances to a few high-degree landmarks, over a graph snapshot.
+
+    For any landmark L, by the triangle inequality, |d(L, a) - d(L, b)| <= d(a, b) <= d(L, a) + d(L, b).
+    Taking the best landmark gives both bounds in O(landmarks), and a landmark reaching only one of
+    the two businesses proves they are not connected. Distances are stored as `distances[landmark, position]`,
+    in the smallest unsigned type that fits them, with the type's maximum meaning unreachable.
+
+    The bounds prune GraphSnapshot.shortest_path only. The Postgres BidirectionalPathFinder, used when the
+    snapshot is missing, too stale or does not know the businesses, searches without them.
+    """
+
+    def __init__(self, landmarks: np.ndarray, distances: np.ndarray):
+        self.landmarks = landmarks
+        self.distances = distances
+        self.unreachable = np.iinfo(distances.dtype).max
+
+    @classmethod
+    def build(cls, snapshot, count: int = LANDMARK_COUNT) -> "LandmarkIndex":
+        degrees = np.diff(snapshot.offsets)
+        count = min(count, snapshot.business_count)
+        # Highest degree first, their BFS trees reach the most of the graph in the fewest hops
+        landmarks = np.argsort(-degrees, kind="stable")[:count]
+
+        # Filled one BFS at a time, only ever one full width distance array alive. The maximum of the
+        # type is kept for unreachable, the matrix is widened when a BFS goes deeper than the type
+        distances = np.empty((count, snapshot.business_count), dtype=np.uint8)
+        for row, landmark in enumerate(landmarks):
+            hops = cls._bfs(snapshot, int(landmark))
+            longest = int(hops.max())
+            while longest >= np.iinfo(distances.dtype).max:
+                distances = cls._widen(distances, row)
+
+            unreachable = np.iinfo(distances.dtype).max
+            distances[row] = np.where(hops < 0, unreachable, hops)
+
+        return cls(landmarks, distances)
+
+    @staticmethod
+    def _widen(distances: np.ndarray, rows: int) -> np.ndarray:
+        """The next wider unsigned type, with the unreachable marker of the first `rows` rows kept"""
+        dtype = np.uint16 if distances.dtype == np.uint8 else np.uint32
+        widened = distances.astype(dtype)
+        widened[:rows][distances[:rows] == np.iinfo(distances.dtype).max] = np.iinfo(dtype).max
+        return widened
+
+    @staticmethod
+    def _bfs(snapshot, root: int) -> np.ndarray:
+        """Hops from `root` to every business of the snapshot, -1 when unreachable"""
+        distances = np.full(snapshot.business_count, -1, dtype=np.int64)
+        distances[root] = 0
+        frontier = np.array([root], dtype=np.int64)
+        hops = 0
+
+        while len(frontier):
+            hops += 1
+            _, neighbours = snapshot.neighbours(frontier)
+            neighbours = np.unique(neighbours[distances[neighbours] < 0])
+            distances[neighbours] = hops
+            frontier = neighbours
+
+        return distances
+
+    def bounds(self, source: int, target: int) -> tuple[int, int | None]:
+        """
+        (lower, upper) hop bounds between two snapshot positions. lower is NOT_CONNECTED when
+        there is provably no path, upper is None when no landmark reaches both businesses.
+        """
+        lower = int(self.lower_bounds(np.array([source]), target)[0])
+        if lower >= NOT_CONNECTED:
+            return lower, None
+
+        source_distances = self.distances[:, source].astype(np.int64)
+        target_distances = self.distances[:, target].astype(np.int64)
+        both = (source_distances != self.unreachable) & (target_distances != self.unreachable)
+        upper = int((source_distances + target_distances)[both].min()) if both.any() else None
+        return lower, upper
+
+    def lower_bounds(self, positions: np.ndarray, target: int) -> np.ndarray:
+        """Lower bound of the hop distance from each of `positions` to `target`, vectorized"""
+        if len(self.landmarks) == 0:
+            return np.zeros(len(positions), dtype=np.int64)
+
+        distances = self.distances[:, positions].astype(np.int64)
+        target_distances = self.distances[:, target].astype(np.int64)[:, None]
+        reached = distances != self.unreachable
+        target_reached = target_distances != self.unreachable
+
+        differences = np.where(reached & target_reached, np.abs(distances - target_distances), 0)
+        # Reached from a landmark that does not reach the target (or the other way around): different components
+        differences = np.where(reached != target_reached, NOT_CONNECTED, differences)
+        return differences.max(axis=0)
@@ -0,0 +1,285 @@
+import os
+from typing import Dict, List
+
+# Budgets for a single search. 200 hops is what we are willing to answer inline,
+# anything deeper should be handled outside of the request.
+DEFAULT_MAX_HOPS = int(os.getenv("PATH_SEARCH_MAX_HOPS", "200"))
+DEFAULT_MAX_VISITED = int(os.getenv("PATH_SEARCH_MAX_VISITED", "1000000"))
+# Maximum number of frontier ids sent to Postgres in a single query
+DEFAULT_BATCH_SIZE = int(os.getenv("PATH_SEARCH_BATCH_SIZE", "10000"))
+# Hop limit of the maximum cumulative transaction volume search, its cost grows linearly with it
+DEFAULT_MAX_VOLUME_HOPS = int(os.getenv("PATH_SEARCH_MAX_VOLUME_HOPS", "6"))
+
+# widest: path whose smallest transaction volume is the largest (max-bottleneck)
+# cumulative: path with the largest sum of transaction volumes within DEFAULT_MAX_VOLUME_HOPS hops
+VOLUME_STRATEGIES = ("widest", "cumulative")
+
+
+class SearchBudgetExceeded(Exception):
+    """Raised when a search runs out of budget before proving whether a path exists"""
+
+    def __init__(self, hops: int, visited: int):
+        self.hops = hops
+        self.visited = visited
+        super().__init__(f"Path search budget exceeded after {hops} hops and {visited} visited businesses")
+
+
+# Transaction volume of a relationship row, 0 when it is missing
+TRANSACTION_VOLUME_SQL = """COALESCE(ag_catalog.agtype_access_operator(properties, '"transaction_volume"'::ag_catalog.agtype)::text::numeric, 0)"""
+
+
+async def get_neighbours(conn, graph_name: str, business_ids: List[str], with_volume: bool = False) -> List[tuple]:
+    """
+    Return (business id, neighbour id, transaction volume) for every relationship of
+    the given businesses, in both directions. The volume is None unless requested.
+    """
+    volume = TRANSACTION_VOLUME_SQL if with_volume else "NULL"
+
+    async with conn.cursor() as cursor:
+        # Two index friendly branches instead of an OR over start_id/end_id
+        await cursor.execute(
+            f"""
+            SELECT start_id, end_id, {volume} FROM {graph_name}."BusinessRelationship" WHERE start_id = ANY(%(ids)s::graphid[])
+            UNION ALL
+            SELECT end_id, start_id, {volume} FROM {graph_name}."BusinessRelationship" WHERE end_id = ANY(%(ids)s::graphid[])
+            """,
+            {"ids": business_ids}
+        )
+        return [(str(row[0]), str(row[1]), None if row[2] is None else int(row[2])) for row in await cursor.fetchall()]
+
+
+class BidirectionalPathFinder:
+    """
+    Shortest path (fewest hops) search between two businesses.
+
+    Frontiers are expanded from both endpoints, always growing the smaller one,
+    and every hop is answered by a single batched query against the
+    BusinessRelationship edge table. Relationships are treated as undirected,
+    the same way the `-[r:BusinessRelationship*]-` Cypher pattern did.
+    """
+
+    def __init__(self, graph_name: str, max_hops: int | None = None, max_visited: int | None = None, batch_size: int | None = None):
+        self._graph_name = graph_name
+        self.max_hops = max_hops or DEFAULT_MAX_HOPS
+        self.max_visited = max_visited or DEFAULT_MAX_VISITED
+        self.batch_size = batch_size or DEFAULT_BATCH_SIZE
+
+    async def shortest_path(self, conn, source_business_id: str, target_business_id: str) -> List[str] | None:
+        """Return the business ids on the shortest path (both endpoints included) or None if there is no path"""
+        if source_business_id == target_business_id:
+            return [source_business_id]
+
+        # business id -> id of the business it was discovered from
+        forward: Dict[str, str | None] = {source_business_id: None}
+        backward: Dict[str, str | None] = {target_business_id: None}
+        forward_frontier = [source_business_id]
+        backward_frontier = [target_business_id]
+        hops = 0
+
+        while forward_frontier and backward_frontier:
+            if hops >= self.max_hops or len(forward) + len(backward) > self.max_visited:
+                raise SearchBudgetExceeded(hops, len(forward) + len(backward))
+
+            # Always grow the cheaper side
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_frontier, meeting = await self._expand(conn, forward_frontier, forward, backward)
+            else:
+                backward_frontier, meeting = await self._expand(conn, backward_frontier, backward, forward)
+            hops += 1
+
+            if meeting is not None:
+                return self._build_path(meeting, forward, backward)
+
+        # One side ran out of businesses to visit, the endpoints are not connected
+        return None
+
+    async def _expand(self, conn, frontier: List[str], visited: Dict[str, str | None], other_visited: Dict[str, str | None]) -> tuple[List[str], str | None]:
+        """Visit every neighbour of the frontier, returning the next frontier and a meeting business (if any)"""
+        next_frontier = []
+        meeting = None
+
+        for start in range(0, len(frontier), self.batch_size):
+            batch = frontier[start:start + self.batch_size]
+            for business_id, neighbour_id, _ in await get_neighbours(conn, self._graph_name, batch):
+                if neighbour_id in visited:
+                    continue
+                visited[neighbour_id] = business_id
+                next_frontier.append(neighbour_id)
+                if meeting is None and neighbour_id in other_visited:
+                    meeting = neighbour_id
+
+            # Every business of this level is at the same depth, so any meeting is a shortest one
+            if meeting is not None:
+                break
+
+        return next_frontier, meeting
+
+    @staticmethod
+    def _build_path(meeting: str, forward: Dict[str, str | None], backward: Dict[str, str | None]) -> List[str]:
+        path = []
+        business_id = meeting
+        while business_id is not None:
+            path.append(business_id)
+            business_id = forward[business_id]
+        path.reverse()
+
+        business_id = backward[meeting]
+        while business_id is not None:
+            path.append(business_id)
+            business_id = backward[business_id]
+
+        return path
+
+
+class TransactionVolumePathFinder:
+    """
+    Path searches that rank paths by transaction volume instead of hop count.
+
+    Both searches are level synchronous: every round relaxes the relationships of
+    the businesses that improved in the previous round with one batched query
+    against the BusinessRelationship edge table, so memory is bounded by the
+    number of visited businesses rather than by the number of paths.
+    """
+
+    def __init__(self, graph_name: str, max_hops: int | None = None, max_volume_hops: int | None = None, max_visited: int | None = None, batch_size: int | None = None):
+        self._graph_name = graph_name
+        self.max_hops = max_hops or DEFAULT_MAX_HOPS
+        self.max_volume_hops = max_volume_hops or DEFAULT_MAX_VOLUME_HOPS
+        self.max_visited = max_visited or DEFAULT_MAX_VISITED
+        self.batch_size = batch_size or DEFAULT_BATCH_SIZE
+
+    async def find(self, conn, source_business_id: str, target_business_id: str, strategy: str = "cumulative") -> tuple[List[str], int] | None:
+        """Return the business ids on the best path and its transaction volume, or None if there is no path"""
+        if strategy == "widest":
+            return await self.widest_path(conn, source_business_id, target_business_id)
+        return await self.max_cumulative_path(conn, source_business_id, target_business_id)
+
+    async def _relationships(self, conn, business_ids: List[str]) -> List[tuple]:
+        rows = []
+        for start in range(0, len(business_ids), self.batch_size):
+            rows.extend(await get_neighbours(conn, self._graph_name, business_ids[start:start + self.batch_size], with_volume=True))
+        return rows
+
+    async def widest_path(self, conn, source_business_id: str, target_business_id: str) -> tuple[List[str], int] | None:
+        """
+        Maximum bottleneck path: the path whose smallest transaction volume is the largest,
+        ties broken by fewer hops. This is Dijkstra's algorithm with (min, max) in place of
+        (+, min), run as rounds of batched relaxations (at most `max_hops` of them).
+        """
+        if source_business_id == target_business_id:
+            return None
+
+        # business id -> (bottleneck volume, hops) of the best path found so far
+        best: Dict[str, tuple[float, int]] = {source_business_id: (float("inf"), 0)}
+        parents: Dict[str, str | None] = {source_business_id: None}
+        frontier = [source_business_id]
+
+        for rounds in range(self.max_hops):
+            if not frontier:
+                break
+            if len(best) > self.max_visited:
+                raise SearchBudgetExceeded(rounds, len(best))
+
+            improved = {}
+            for business_id, neighbour_id, volume in await self._relationships(conn, frontier):
+                width, hops = best[business_id]
+                candidate = (min(width, volume), hops + 1)
+                current = best.get(neighbour_id)
+                # Larger bottleneck first, then fewer hops
+                if current is None or candidate[0] > current[0] or (candidate[0] == current[0] and candidate[1] < current[1]):
+                    best[neighbour_id] = candidate
+                    parents[neighbour_id] = business_id
+                    improved[neighbour_id] = True
+
+            # Bottlenecks only shrink along a path, so businesses that cannot beat the current
+            # best path to the target are not worth expanding
+            target_width = best[target_business_id][0] if target_business_id in best else None
+            frontier = [
+                business_id for business_id in improved
+                if business_id != target_business_id and (target_width is None or best[business_id][0] > target_width)
+            ]
+
+        # Businesses left to expand could still reach the target, or improve the path found to it
+        if frontier:
+            raise SearchBudgetExceeded(self.max_hops, len(best))
+        if target_business_id not in best:
+            return None
+
+        return self._build_path(target_business_id, parents), int(best[target_business_id][0])
+
+    async def max_cumulative_path(self, conn, source_business_id: str, target_business_id: str) -> tuple[List[str], int] | None:
+        """
+        Path with the largest sum of transaction volumes using at most `max_volume_hops` hops.
+        Raises SearchBudgetExceeded when no path was found within them but the last layer could
+        still be extended, the target may be further away.
+
+        The result is an approximation, not necessarily the heaviest path. Finding the heaviest
+        simple path is NP-hard in general, so this is a hop-layered dynamic program: layer h keeps,
+        for every business, only the heaviest path of exactly h hops reaching it, extending only
+        paths that do not revisit a business. When that path cannot be extended to a neighbour
+        because it already went through it, a lighter path of the same hops that could is not
+        kept, and a heavier path to the target through it can be missed.
+        """
+        if source_business_id == target_business_id:
+            return None
+
+        # One dict per layer: business id -> (cumulative volume, business id it came from in the previous layer)
+        layers: List[Dict[str, tuple[int, str | None]]] = [{source_business_id: (0, None)}]
+        visited = 1
+        best_layer = None
+
+        for hops in range(1, self.max_volume_hops + 1):
+            previous = layers[-1]
+            # Paths reaching the target are complete, they are not extended any further
+            expandable = [business_id for business_id in previous if business_id != target_business_id]
+            if not expandable:
+                break
+
+            layer: Dict[str, tuple[int, str | None]] = {}
+            for business_id, neighbour_id, volume in await self._relationships(conn, expandable):
+                total = previous[business_id][0] + volume
+                if neighbour_id in layer and layer[neighbour_id][0] >= total:
+                    continue
+                if self._on_path(neighbour_id, business_id, hops - 1, layers):
+                    continue
+                layer[neighbour_id] = (total, business_id)
+
+            visited += len(layer)
+            if visited > self.max_visited:
+                raise SearchBudgetExceeded(hops, visited)
+
+            layers.append(layer)
+            if target_business_id in layer and (best_layer is None or layer[target_business_id][0] > layers[best_layer][target_business_id][0]):
+                best_layer = hops
+
+        if best_layer is None:
+            if any(business_id != target_business_id for business_id in layers[-1]):
+                raise SearchBudgetExceeded(self.max_volume_hops, visited)
+            return None
+
+        path = [target_business_id]
+        for hops in range(best_layer, 0, -1):
+            path.append(layers[hops][path[-1]][1])
+        path.reverse()
+
+        return path, layers[best_layer][target_business_id][0]
+
+    @staticmethod
+    def _on_path(business_id: str, last_business_id: str, last_hops: int, layers: List[Dict[str, tuple[int, str | None]]]) -> bool:
+        """Whether `business_id` is already on the path ending at `last_business_id` in layer `last_hops`"""
+        current = last_business_id
+        for hops in range(last_hops, -1, -1):
+            if current == business_id:
+                return True
+            current = layers[hops][current][1]
+        return False
+
+    @staticmethod
+    def _build_path(target_business_id: str, parents: Dict[str, str | None]) -> List[str]:
+        path = []
+        business_id = target_business_id
+        while business_id is not None:
+            path.append(business_id)
+            business_id = parents[business_id]
+        path.reverse()
+        return path
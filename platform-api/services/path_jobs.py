@@ -0,0 +1,291 @@
+import os
+import time
+import asyncio
+import logging
+import contextvars
+from typing import Awaitable, Callable, Dict
+from psycopg.types.json import Jsonb
+from ..metrics import REGISTRY
+from ..db.postgres.connection import APP_SCHEMA
+
+# Budgets of the background searches. They run in the API process, with a few hundred bytes of
+# Python objects per visited business: 2M visited businesses take around 500 MB
+PATH_JOB_MAX_HOPS = int(os.getenv("PATH_JOB_MAX_HOPS", "10000"))
+PATH_JOB_MAX_VISITED = int(os.getenv("PATH_JOB_MAX_VISITED", "2000000"))
+# Hop limit of the background maximum cumulative transaction volume searches
+PATH_JOB_MAX_VOLUME_HOPS = int(os.getenv("PATH_JOB_MAX_VOLUME_HOPS", "24"))
+# Worker tasks per process running queued searches, 0 only enqueues (other processes run them)
+PATH_JOB_WORKERS = int(os.getenv("PATH_JOB_WORKERS", "1"))
+# Workers are woken up by NOTIFY, and look for work at least this often anyway
+PATH_JOB_POLL_SECONDS = float(os.getenv("PATH_JOB_POLL_SECONDS", "5"))
+# A job running for longer than this is considered abandoned (its process died) and runs again
+PATH_JOB_TIMEOUT_SECONDS = int(os.getenv("PATH_JOB_TIMEOUT_SECONDS", "900"))
+PATH_JOB_MAX_ATTEMPTS = int(os.getenv("PATH_JOB_MAX_ATTEMPTS", "3"))
+# Results of finished jobs answer the same pair for this long
+PATH_JOB_RESULT_TTL_SECONDS = int(os.getenv("PATH_JOB_RESULT_TTL_SECONDS", "3600"))
+
+JOB_COLUMNS = "id, status, result, error, created_at, finished_at"
+
+JOBS_QUEUED = REGISTRY.counter("path_search_jobs_queued_total", "Path searches sent to the background queue")
+JOBS_FINISHED = REGISTRY.counter("path_search_jobs_finished_total", "Background path searches finished (done or failed)")
+JOB_DURATION = REGISTRY.histogram("path_search_job_seconds", "Run time of background path searches", buckets=[1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0])
+
+
+class PathSearchJobQueue:
+    """
+    Durable queue of the path searches too deep to answer within a request, in a Postgres table.
+
+    Any process can enqueue, and the workers of every process claim jobs with FOR UPDATE SKIP LOCKED,
+    so each job runs once. A pending job is shared by every request of the same pair (and mode),
+    and a finished one answers it for PATH_JOB_RESULT_TTL_SECONDS. Jobs of a process that died
+    are run again after PATH_JOB_TIMEOUT_SECONDS, up to PATH_JOB_MAX_ATTEMPTS times.
+    """
+
+    def __init__(self, graph_name: str, database_manager, search: Callable[[str, str, bool, str, float], Awaitable[dict | None]], workers: int = PATH_JOB_WORKERS):
+        self._graph_name = graph_name
+        self._database_manager = database_manager
+        self._search = search
+        self._workers = workers
+        self._table = f'{APP_SCHEMA}."{graph_name}_path_search_jobs"'
+        self._queued_channel = f"{graph_name}_path_jobs"
+        self._done_channel = f"{graph_name}_path_jobs_done"
+        self._wakeup = asyncio.Event()
+        # job id -> event set when the job finishes, for long polls
+        self._waiters: Dict[int, asyncio.Event] = {}
+        self._tasks = []
+
+    async def start(self):
+        await self._ensure_table()
+        self._database_manager.subscribe(self._queued_channel, self._on_queued)
+        self._database_manager.subscribe(self._done_channel, self._on_done)
+        for _ in range(self._workers):
+            self._tasks.append(asyncio.create_task(self._work(), context=contextvars.Context()))
+
+    async def _ensure_table(self):
+        table = self._table
+
+        try:
+            async with self._database_manager.get_connection() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(f"""
+                        CREATE TABLE IF NOT EXISTS {table} (
+                            id bigserial PRIMARY KEY,
+                            source_business_id text NOT NULL,
+                            target_business_id text NOT NULL,
+                            based_on_max_transaction_volume boolean NOT NULL,
+                            volume_strategy text NOT NULL,
+                            status text NOT NULL DEFAULT 'queued',
+                            result jsonb,
+                            error text,
+                            attempts int NOT NULL DEFAULT 0,
+                            created_at timestamptz NOT NULL DEFAULT now(),
+                            started_at timestamptz,
+                            finished_at timestamptz
+                        )
+                    """)
+                    # At most one pending job per pair and mode, later requests join it
+                    await cursor.execute(f"""
+                        CREATE UNIQUE INDEX IF NOT EXISTS {self._graph_name}_path_search_jobs_pending_idx
+                        ON {table} (source_business_id, target_business_id, based_on_max_transaction_volume, volume_strategy)
+                        WHERE status IN ('queued', 'running')
+                    """)
+                    await cursor.execute(f"""
+                        CREATE INDEX IF NOT EXISTS {self._graph_name}_path_search_jobs_done_idx
+                        ON {table} (source_business_id, target_business_id, based_on_max_transaction_volume, volume_strategy, finished_at)
+                        WHERE status = 'done'
+                    """)
+        except Exception as ex:
+            # Another process creating the table at the same time, it is there now
+            logging.error(f"Could not create the path search job table: {ex}")
+
+    async def submit(self, source_business_id: str, target_business_id: str, based_on_max_transaction_volume: bool, volume_strategy: str) -> dict:
+        """
+        The job answering a path query: a recently finished one (with its result), the pending one,
+        or a new one. Returned as a dict of JOB_COLUMNS.
+        """
+        table = self._table
+        pair = {
+            "source": source_business_id,
+            "target": target_business_id,
+            "volume": based_on_max_transaction_volume,
+            "strategy": volume_strategy,
+            "ttl": PATH_JOB_RESULT_TTL_SECONDS
+        }
+
+        async with self._database_manager.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    f"""
+                    SELECT {JOB_COLUMNS} FROM {table}
+                    WHERE source_business_id = %(source)s AND target_business_id = %(target)s
+                    AND based_on_max_transaction_volume = %(volume)s AND volume_strategy = %(strategy)s
+                    AND status = 'done' AND finished_at > now() - make_interval(secs => %(ttl)s)
+                    ORDER BY finished_at DESC
+                    LIMIT 1
+                    """,
+                    pair,
+                    prepare=True
+                )
+                row = await cursor.fetchone()
+                if row:
+                    return self._to_job(row)
+
+                # The no-op update returns the pending job, when there is one
+                await cursor.execute(
+                    f"""
+                    INSERT INTO {table} AS job (source_business_id, target_business_id, based_on_max_transaction_volume, volume_strategy)
+                    VALUES (%(source)s, %(target)s, %(volume)s, %(strategy)s)
+                    ON CONFLICT (source_business_id, target_business_id, based_on_max_transaction_volume, volume_strategy)
+                    WHERE status IN ('queued', 'running')
+                    DO UPDATE SET status = job.status
+                    RETURNING {JOB_COLUMNS}, xmax = 0
+                    """,
+                    pair,
+                    prepare=True
+                )
+                row = await cursor.fetchone()
+                if row[-1]:
+                    JOBS_QUEUED.inc()
+                    await cursor.execute("SELECT pg_notify(%s, %s)", [self._queued_channel, str(row[0])])
+
+        return self._to_job(row)
+
+    async def get(self, job_id: int, wait: float = 0) -> dict | None:
+        """The job, waiting up to `wait` seconds for it to finish (long poll)"""
+        deadline = asyncio.get_running_loop().time() + wait
+
+        while True:
+            job = await self._load(job_id)
+            remaining = deadline - asyncio.get_running_loop().time()
+            if job is None or job["status"] in ("done", "failed") or remaining <= 0:
+                return job
+
+            event = self._waiters.setdefault(job_id, asyncio.Event())
+            try:
+                # Finishing is NOTIFYed, checking again now and then covers a missed notification
+                await asyncio.wait_for(event.wait(), min(remaining, PATH_JOB_POLL_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _load(self, job_id: int) -> dict | None:
+        async with self._database_manager.get_connection(read_only=True) as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(f"SELECT {JOB_COLUMNS} FROM {self._table} WHERE id = %s", [job_id], prepare=True)
+                row = await cursor.fetchone()
+
+        return self._to_job(row) if row else None
+
+    @staticmethod
+    def _to_job(row) -> dict:
+        return {
+            "id": str(row[0]),
+            "status": row[1],
+            "result": row[2],
+            "error": row[3],
+            "created_at": row[4],
+            "finished_at": row[5]
+        }
+
+    def _on_queued(self, payload: str | None):
+        # None after the listener (re)connected, jobs may have been queued meanwhile
+        self._wakeup.set()
+
+    def _on_done(self, payload: str | None):
+        if payload is None:
+            # Finishes may have been missed, let every long poll check
+            waiters, self._waiters = self._waiters, {}
+            for event in waiters.values():
+                event.set()
+            return
+
+        event = self._waiters.pop(int(payload), None)
+        if event is not None:
+            event.set()
+
+    async def _work(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await self._claim()
+            except Exception as ex:
+                logging.error(f"Could not claim a path search job: {ex}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), PATH_JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(*job)
+
+    async def _claim(self) -> tuple | None:
+        table = self._table
+
+        async with self._database_manager.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                # Abandoned too many times, give up on them (which also lets the pair be queued again).
+                # Finishing them is notified like any other, for the long polls waiting on them
+                await cursor.execute(
+                    f"""
+                    UPDATE {table} SET status = 'failed', error = 'abandoned', finished_at = now()
+                    WHERE status = 'running' AND started_at < now() - make_interval(secs => %(timeout)s) AND attempts >= %(attempts)s
+                    RETURNING id
+                    """,
+                    {"timeout": PATH_JOB_TIMEOUT_SECONDS, "attempts": PATH_JOB_MAX_ATTEMPTS}
+                )
+                for (job_id,) in await cursor.fetchall():
+                    await cursor.execute("SELECT pg_notify(%s, %s)", [self._done_channel, str(job_id)])
+                await cursor.execute(
+                    f"""
+                    UPDATE {table} SET status = 'running', started_at = now(), attempts = attempts + 1
+                    WHERE id = (
+                        SELECT id FROM {table}
+                        WHERE status = 'queued' OR (status = 'running' AND started_at < now() - make_interval(secs => %(timeout)s))
+                        ORDER BY id
+                        LIMIT 1
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING id, source_business_id, target_business_id, based_on_max_transaction_volume, volume_strategy
+                    """,
+                    {"timeout": PATH_JOB_TIMEOUT_SECONDS}
+                )
+                return await cursor.fetchone()
+
+    async def _run(self, job_id: int, source_business_id: str, target_business_id: str, based_on_max_transaction_volume: bool, volume_strategy: str):
+        started = asyncio.get_running_loop().time()
+        status, result, error = "done", None, None
+        try:
+            # Past the timeout another worker would claim the job again, running it twice. Cancelling does not
+            # stop a search running in a thread, the search checks the deadline itself
+            deadline = time.monotonic() + PATH_JOB_TIMEOUT_SECONDS
+            result = await asyncio.wait_for(
+                self._search(source_business_id, target_business_id, based_on_max_transaction_volume, volume_strategy, deadline),
+                PATH_JOB_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            logging.warning(f"Path search job {job_id} between {source_business_id} and {target_business_id} timed out")
+            status, error = "failed", f"timed out after {PATH_JOB_TIMEOUT_SECONDS} seconds"
+        except Exception as ex:
+            logging.warning(f"Path search job {job_id} between {source_business_id} and {target_business_id} failed: {ex}")
+            status, error = "failed", str(ex)
+
+        try:
+            async with self._database_manager.get_connection() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(
+                        f"""
+                        UPDATE {self._table} SET status = %s, result = %s, error = %s, finished_at = now()
+                        WHERE id = %s AND status = 'running'
+                        """,
+                        [status, None if result is None else Jsonb(result), error, job_id]
+                    )
+                    await cursor.execute("SELECT pg_notify(%s, %s)", [self._done_channel, str(job_id)])
+        except Exception as ex:
+            # The job runs again once it times out
+            logging.error(f"Could not record the result of path search job {job_id}: {ex}")
+            return
+
+        JOBS_FINISHED.inc()
+        JOB_DURATION.observe(asyncio.get_running_loop().time() - started)
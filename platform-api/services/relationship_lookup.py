@@ -0,0 +1,261 @@
+import logging
+from typing import List
+from age.models import Edge
+
+RELATIONSHIP_LABEL = "BusinessRelationship"
+BUSINESS_LABEL = "Business"
+
+def business_key(properties: str = "properties") -> str:
+    """
+    Normalized identity of a business: its name and category, case insensitive.
+    `properties` is the (qualified) properties column the key is computed from.
+    """
+    return (
+        f"""lower(ag_catalog.agtype_access_operator({properties}, '"name"'::ag_catalog.agtype)::text), """
+        f"""lower(ag_catalog.agtype_access_operator({properties}, '"category"'::ag_catalog.agtype)::text)"""
+    )
+
+# The unique index on the key is the arbiter of INSERT ... ON CONFLICT, statements must spell it exactly like this
+BUSINESS_KEY = business_key()
+BUSINESS_KEY_INDEX = "business_key_idx"
+
+# Properties of a business to find or create, from the %(name)s and %(category)s parameters
+NEW_BUSINESS_PROPERTIES = "ag_catalog.agtype_build_map('name', %(name)s::text, 'category', %(category)s::text)"
+
+
+def insert_business_sql(graph_name: str) -> str:
+    """
+    Insert of a new business, arbitrated by the unique key index. DO UPDATE ... WHERE false (rather than
+    DO NOTHING) locks the business of the same key, also when it was inserted by a transaction that
+    committed after the statement started, without writing a new version of it (or a change notification).
+    Only an inserted row is returned, find_business_sql then finds the existing one.
+    """
+    return f"""
+        INSERT INTO {graph_name}."{BUSINESS_LABEL}" (properties)
+        VALUES ({NEW_BUSINESS_PROPERTIES})
+        ON CONFLICT ({BUSINESS_KEY}) DO UPDATE SET properties = {graph_name}."{BUSINESS_LABEL}".properties WHERE false
+        RETURNING id
+        """
+
+
+def find_business_sql(graph_name: str) -> str:
+    """The business with the key of the %(name)s and %(category)s parameters"""
+    return f"""SELECT id FROM {graph_name}."{BUSINESS_LABEL}" WHERE ({BUSINESS_KEY}) = ({business_key(NEW_BUSINESS_PROPERTIES)}) ORDER BY id LIMIT 1"""
+
+
+def lock_business_keys_sql(graph_name: str) -> str:
+    """
+    Transaction lock serializing the creates of businesses while the unique key index can not arbitrate
+    them (it is missing or INVALID). A single lock for every key, so concurrent bulk creates can not deadlock.
+    """
+    return f"""SELECT pg_advisory_xact_lock(hashtextextended('{graph_name}.{BUSINESS_KEY_INDEX}', 0))"""
+
+# AGE does not index the label tables, every lookup by id, start_id or end_id is a sequential scan
+# without these. (index name, label table, columns, unique)
+LABEL_INDEXES = [
+    ("business_id_idx", BUSINESS_LABEL, "id", False),
+    (BUSINESS_KEY_INDEX, BUSINESS_LABEL, BUSINESS_KEY, True),
+    ("business_relationship_id_idx", RELATIONSHIP_LABEL, "id", False),
+    ("business_relationship_start_end_idx", RELATIONSHIP_LABEL, "start_id, end_id", False),
+    ("business_relationship_end_idx", RELATIONSHIP_LABEL, "end_id", False),
+    # Keyset pages of a business's outgoing relationships, in edge id order
+    ("business_relationship_start_id_idx", RELATIONSHIP_LABEL, "start_id, id", False),
+]
+
+
+class RelationshipLookup:
+    """
+    Point lookups of relationships, and pages of a business's outgoing relationships, answered
+    with plain SQL over the start_id/end_id/id columns of the BusinessRelationship label table.
+    A cypher() MATCH on (a)-[r]->(b) joins the three label tables for the same answer, so Cypher
+    is kept for queries that need more than the relationship itself.
+    """
+
+    def __init__(self, graph_name: str):
+        self._graph_name = graph_name
+
+    async def ensure_indexes(self, conn):
+        """
+        Create the labels (if the graph is still empty) and their btree indexes.
+        CREATE INDEX CONCURRENTLY does not block writes but can not run in a transaction,
+        so `conn` must be in autocommit mode.
+        """
+        graph_name = self._graph_name
+
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                """
+                SELECT label.name FROM ag_catalog.ag_label label
+                JOIN ag_catalog.ag_graph graph ON graph.graphid = label.graph
+                WHERE graph.name = %s
+                """,
+                [graph_name]
+            )
+            labels = {row[0] for row in await cursor.fetchall()}
+
+            if BUSINESS_LABEL not in labels:
+                await cursor.execute("SELECT ag_catalog.create_vlabel(%s, %s);", [graph_name, BUSINESS_LABEL])
+            if RELATIONSHIP_LABEL not in labels:
+                await cursor.execute("SELECT ag_catalog.create_elabel(%s, %s);", [graph_name, RELATIONSHIP_LABEL])
+
+            for index_name, label, columns, unique in LABEL_INDEXES:
+                # An interrupted or failed build leaves an INVALID index, which IF NOT EXISTS would skip
+                await self._drop_invalid_index(cursor, index_name)
+                try:
+                    await cursor.execute(f'CREATE {"UNIQUE " if unique else ""}INDEX CONCURRENTLY IF NOT EXISTS {index_name} ON {graph_name}."{label}" USING btree ({columns})')
+                except Exception as ex:
+                    # A unique index fails on existing duplicates. Left INVALID it would still reject some
+                    # writes, the duplicates have to be merged before the next attempt
+                    logging.error(f"Could not create index {index_name}: {ex}")
+                    await self._drop_invalid_index(cursor, index_name)
+
+        logging.info(f"Label indexes of graph '{graph_name}' are in place")
+
+    async def _index_valid(self, cursor, index_name: str) -> bool | None:
+        """Whether the index of the graph schema is valid, None when there is no such index"""
+        await cursor.execute(
+            """
+            SELECT index.indisvalid FROM pg_index index
+            JOIN pg_class class ON class.oid = index.indexrelid
+            JOIN pg_namespace namespace ON namespace.oid = class.relnamespace
+            WHERE namespace.nspname = %s AND class.relname = %s
+            """,
+            [self._graph_name, index_name]
+        )
+        row = await cursor.fetchone()
+        return None if row is None else row[0]
+
+    async def _drop_invalid_index(self, cursor, index_name: str):
+        if await self._index_valid(cursor, index_name) is False:
+            logging.warning(f"Dropping INVALID index {index_name}")
+            await cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {self._graph_name}.{index_name}")
+
+    async def business_key_ready(self, conn) -> bool:
+        """Whether the unique key index exists and is valid, so INSERT ... ON CONFLICT can use it"""
+        async with conn.cursor() as cursor:
+            return bool(await self._index_valid(cursor, BUSINESS_KEY_INDEX))
+
+    async def get(self, conn, source_business_id: str, target_business_id: str, relationship_type: str | None = None) -> Edge | None:
+        """Relationship from source to target (of the given type, if any)"""
+        graph_name = self._graph_name
+        type_filter = """AND ag_catalog.agtype_access_operator(properties, '"type"'::ag_catalog.agtype)::text = %(type)s""" if relationship_type else ""
+
+        async with conn.cursor() as cursor:
+            # The two variants are distinct statements, each prepared once per connection
+            await cursor.execute(
+                f"""
+                SELECT id, start_id, end_id, properties FROM {graph_name}."{RELATIONSHIP_LABEL}"
+                WHERE start_id = %(source)s::graphid AND end_id = %(target)s::graphid
+                {type_filter}
+                LIMIT 1
+                """,
+                # agtype strings are compared with their quotes
+                {"source": source_business_id, "target": target_business_id, "type": f'"{relationship_type}"'},
+                prepare=True
+            )
+            row = await cursor.fetchone()
+
+        if not row:
+            return None
+
+        return self._to_edge(row)
+
+    async def path_exists(self, conn, business_ids: List[str]) -> bool:
+        """Whether every consecutive pair of businesses is joined by a relationship, in either direction"""
+        graph_name = self._graph_name
+        hops = list(zip(business_ids, business_ids[1:]))
+        if not hops:
+            return True
+
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                f"""
+                SELECT count(*) FROM unnest(%(sources)s::text[], %(targets)s::text[]) hop(source, target)
+                WHERE EXISTS (
+                    SELECT 1 FROM {graph_name}."{RELATIONSHIP_LABEL}"
+                    WHERE start_id = hop.source::graphid AND end_id = hop.target::graphid
+                ) OR EXISTS (
+                    SELECT 1 FROM {graph_name}."{RELATIONSHIP_LABEL}"
+                    WHERE start_id = hop.target::graphid AND end_id = hop.source::graphid
+                )
+                """,
+                {"sources": [source for source, _ in hops], "targets": [target for _, target in hops]},
+                prepare=True
+            )
+            return (await cursor.fetchone())[0] == len(hops)
+
+    async def delete(self, conn, relationship_id: str) -> List[str]:
+        """Delete a relationship by id, returning the source business ids of the deleted rows"""
+        graph_name = self._graph_name
+
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                f"""DELETE FROM {graph_name}."{RELATIONSHIP_LABEL}" WHERE id = %s::graphid RETURNING start_id::text""",
+                [relationship_id],
+                prepare=True
+            )
+            return [row[0] for row in await cursor.fetchall()]
+
+    def _outgoing_query(self, relationship_type: str | None, min_volume: int | None, after: str | None, limit: int | None) -> str:
+        """
+        Outgoing relationships of %(business_id)s with their target business, in edge id order.
+        Only the filters in use are part of the statement, so each combination gets its own plan.
+        """
+        graph_name = self._graph_name
+        filters = ""
+        if after:
+            filters += " AND relationship.id > %(after)s::graphid"
+        if relationship_type:
+            filters += """ AND ag_catalog.agtype_access_operator(relationship.properties, '"type"'::ag_catalog.agtype)::text = %(type)s"""
+        if min_volume is not None:
+            filters += """ AND ag_catalog.agtype_access_operator(relationship.properties, '"transaction_volume"'::ag_catalog.agtype) >= %(min_volume)s::ag_catalog.agtype"""
+
+        return f"""
+            SELECT relationship.id, relationship.properties, target.id, target.properties
+            FROM {graph_name}."{RELATIONSHIP_LABEL}" relationship
+            JOIN {graph_name}."{BUSINESS_LABEL}" target ON target.id = relationship.end_id
+            WHERE relationship.start_id = %(business_id)s::graphid{filters}
+            ORDER BY relationship.id
+            {"LIMIT %(limit)s" if limit else ""}
+            """
+
+    @staticmethod
+    def _outgoing_params(business_id: str, relationship_type: str | None, min_volume: int | None, after: str | None, limit: int | None) -> dict:
+        # agtype strings are compared with their quotes
+        return {"business_id": business_id, "after": after, "type": f'"{relationship_type}"', "min_volume": str(min_volume), "limit": limit}
+
+    async def outgoing(self, conn, business_id: str, limit: int, relationship_type: str | None = None, min_volume: int | None = None, after: str | None = None) -> list:
+        """
+        One page of the outgoing relationships of a business, after the edge id `after` (the keyset cursor).
+        Rows are (edge id, edge properties, target id, target properties).
+        """
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                self._outgoing_query(relationship_type, min_volume, after, limit),
+                self._outgoing_params(business_id, relationship_type, min_volume, after, limit),
+                prepare=True
+            )
+            return await cursor.fetchall()
+
+    async def stream_outgoing(self, conn, business_id: str, relationship_type: str | None = None, min_volume: int | None = None, after: str | None = None, batch_size: int = 1000):
+        """
+        Every outgoing relationship of a business, read through a server-side cursor `batch_size` rows
+        at a time, so neither the client nor the database builds the whole result up front.
+        Named cursors only live in a transaction, the caller has to open one.
+        """
+        async with conn.cursor(name="outgoing_relationships") as cursor:
+            cursor.itersize = batch_size
+            await cursor.execute(
+                self._outgoing_query(relationship_type, min_volume, after, None),
+                self._outgoing_params(business_id, relationship_type, min_volume, after, None)
+            )
+            async for row in cursor:
+                yield row
+
+    @staticmethod
+    def _to_edge(row) -> Edge:
+        # Same shape as the Edge cypher() returns
+        edge = Edge(int(row[0]), RELATIONSHIP_LABEL, row[3])
+        edge.start_id = int(row[1])
+        edge.end_id = int(row[2])
+        return edge
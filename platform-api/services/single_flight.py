@@ -0,0 +1,57 @@
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from ..metrics import REGISTRY
+from .cache import LookupCache, MISSING
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller starts the computation,
+    the ones arriving while it runs wait for the same result instead of starting their own
+    (and taking their own pool connection).
+
+    With a TTL, results are also retained for that long and returned to later callers.
+    The computation runs in its own task, so a caller going away (e.g. a client disconnecting)
+    does not cancel it for the others.
+    """
+
+    def __init__(self, name: str, ttl: float = 0.0):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._results = LookupCache(name, ttl=ttl, enabled=ttl > 0)
+        self._executions = REGISTRY.counter(f"{name}_executions_total", f"Computations started by {name} callers")
+        self._coalesced = REGISTRY.counter(f"{name}_coalesced_total", f"{name} callers that waited for a computation already in flight")
+
+    async def do(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        result = self._results.get(key)
+        if result is not MISSING:
+            return result
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run(key, compute, self._results.version), context=contextvars.Context())
+            self._inflight[key] = task
+            self._executions.inc()
+        else:
+            self._coalesced.inc()
+
+        return await asyncio.shield(task)
+
+    def clear(self):
+        """
+        Forget retained results and computations in flight: later callers start a new computation.
+        The running ones still finish for the callers already waiting, but are not retained.
+        """
+        self._results.clear()
+        self._inflight.clear()
+
+    async def _run(self, key: Hashable, compute: Callable[[], Awaitable[Any]], version: int) -> Any:
+        try:
+            result = await compute()
+            self._results.set(key, result, version)
+            return result
+        finally:
+            # Unless cleared meanwhile, and maybe replaced by a later computation
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
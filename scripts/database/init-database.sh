@@ -63,6 +63,14 @@ psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" <<-E
 		(ag_catalog.agtype_access_operator(properties, '"category"'::ag_catalog.agtype)::text) gin_trgm_ops
 	);
 
+	-- Unique normalized (name, category) key, the arbiter of the create upsert
+	CREATE UNIQUE INDEX IF NOT EXISTS business_key_idx
+	ON business_graph."Business"
+	USING btree (
+		lower(ag_catalog.agtype_access_operator(properties, '"name"'::ag_catalog.agtype)::text),
+		lower(ag_catalog.agtype_access_operator(properties, '"category"'::ag_catalog.agtype)::text)
+	);
+
 	-- Test the trigram index for fuzzy matching
 	SELECT *
 	FROM business_graph."Business"